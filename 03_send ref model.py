@@ -1,18 +1,105 @@
+import json
+
 from main import get_client
-from specklepy.api.operations import receive, send
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.transports.abstract_transport import AbstractTransport
 from specklepy.transports.server import ServerTransport
-from specklepy.api.client import SpeckleClient
 from specklepy.core.api.inputs.version_inputs import CreateVersionInput
 
-PROJECT_ID       = "128262a20c"
-SOURCE_MODEL_ID  = "a1014e4b32"
-DEST_MODEL_ID    = "0763ad7d28"
+SOURCE_PROJECT_ID = "128262a20c"
+DEST_PROJECT_ID   = "128262a20c"
+SOURCE_MODEL_ID   = "a1014e4b32"
+DEST_MODEL_ID     = "0763ad7d28"
+
+# Number of object ids checked against the destination per diff request
+DIFF_BATCH_SIZE = 1000
+
+
+class RawCopyTarget(AbstractTransport):
+    """
+    Destination side of a raw copy: asks the destination server which objects
+    it already has, and forwards the serialized strings of the rest to its
+    ServerTransport in batches. No Base objects are ever built.
+
+    It is only meant to be the `target_transport` of a copy: reads go to the
+    destination server, and it cannot itself be the source of a copy.
+    """
+
+    def __init__(self, dest: ServerTransport):
+        super().__init__()
+        self.dest = dest
+        self.objects_copied = 0
+        self.bytes_copied = 0
+        self.objects_skipped = 0
+
+    @property
+    def name(self):
+        return "RawCopyTarget"
+
+    def has_objects(self, id_list):
+        found = {}
+        for i in range(0, len(id_list), DIFF_BATCH_SIZE):
+            batch = id_list[i:i + DIFF_BATCH_SIZE]
+            r = self.dest.session.post(
+                f"{self.dest.url}/api/diff/{self.dest.stream_id}",
+                data={"objects": json.dumps(batch)},
+            )
+            r.raise_for_status()
+            found.update(r.json())
+        self.objects_skipped = sum(1 for v in found.values() if v)
+        return found
+
+    def begin_write(self):
+        self.dest.begin_write()
+
+    def end_write(self):
+        self.dest.end_write()
+
+    def save_object(self, id, serialized_object):
+        self.objects_copied += 1
+        self.bytes_copied += len(serialized_object)
+        self.dest.save_object(id, serialized_object)
+
+    def save_object_from_transport(self, id, source_transport):
+        self.save_object(id, source_transport.get_object(id))
+
+    def get_object(self, id):
+        """The serialized object from the destination server, or None if it is not there."""
+        r = self.dest.session.get(f"{self.dest.url}/objects/{self.dest.stream_id}/{id}/single")
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        r.encoding = "utf-8"
+        return r.text
+
+    def copy_object_and_children(self, id, target_transport):
+        raise SpeckleException(
+            "RawCopyTarget only receives objects during a copy; copy from the"
+            f" destination's ServerTransport ({self.dest.stream_id}) instead."
+        )
+
+
+def stream_copy(client, object_id: str) -> str:
+    """
+    Copy an object closure between projects as raw JSON: children stream from
+    the source and are uploaded in batches while they arrive.
+    """
+    source_transport = ServerTransport(client=client, stream_id=SOURCE_PROJECT_ID)
+    dest_transport   = ServerTransport(client=client, stream_id=DEST_PROJECT_ID)
+    target = RawCopyTarget(dest_transport)
+
+    source_transport.copy_object_and_children(id=object_id, target_transport=target)
+
+    print(f"📤 Streamed {target.objects_copied} objects ({target.bytes_copied / 1e6:.1f} MB), "
+          f"{target.objects_skipped} already on the destination")
+    return object_id
+
 
 def copy_model_data():
     client = get_client()
 
     # 🔹 Get latest version from source model using API helper
-    versions = client.version.get_versions(model_id=SOURCE_MODEL_ID, project_id=PROJECT_ID, limit=1)
+    versions = client.version.get_versions(model_id=SOURCE_MODEL_ID, project_id=SOURCE_PROJECT_ID, limit=1)
     if not versions.items:
         print("❌ No versions found in source model")
         return
@@ -20,22 +107,21 @@ def copy_model_data():
     latest_version = versions.items[0]
     ref_object = getattr(latest_version, "referenced_object", None) or getattr(latest_version, "referencedObject", None)
 
-    print(f"📥 Receiving version {latest_version.id}: {getattr(latest_version, 'message', '')}")
-
-    source_transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    dest_transport   = ServerTransport(client=client, stream_id=PROJECT_ID)
-
-    obj = receive(ref_object, source_transport)
-
-    print("📤 Sending to destination...")
+    print(f"📥 Copying version {latest_version.id}: {getattr(latest_version, 'message', '')}")
 
-    new_obj_id = send(obj, [dest_transport])
+    if SOURCE_PROJECT_ID == DEST_PROJECT_ID:
+        # Objects are stored per project, so the destination model can point at
+        # the very same root object: nothing to download or upload
+        print("⚡ Same project: reusing the referenced object, no data transferred")
+        new_obj_id = ref_object
+    else:
+        new_obj_id = stream_copy(client, ref_object)
 
-    print(f"✅ Object sent with ID: {new_obj_id}")
+    print(f"✅ Object ready with ID: {new_obj_id}")
 
     # 🔹 Create version using API helper
     version = client.version.create(CreateVersionInput(
-        projectId=PROJECT_ID,
+        projectId=DEST_PROJECT_ID,
         modelId=DEST_MODEL_ID,
         objectId=new_obj_id,
         message="Model copied from homework/session02/_ref-geo"
@@ -44,4 +130,4 @@ def copy_model_data():
     print(f"✅ Model copied successfully! Version ID: {version.id}")
 
 if __name__ == "__main__":
-    copy_model_data()
\ No newline at end of file
+    copy_model_data()
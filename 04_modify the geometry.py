@@ -9,11 +9,21 @@ Use the "two blocks" model. Copy the applicationId of the blocks's floor B.
 Use this model: https://app.speckle.systems/projects/YOUR_PROJECT_ID/models/YOUR_MODEL_ID
 """
 
-import copy
 from main import get_client
+from cloning import clone_with_offsets
+from delta_send import ChangeTracker, delta_send
+from instancing import place_instances
+from lazy_receive import LazyReceiver
+from mesh_buffers import pack_meshes
+from object_cache import default_cache
+from query import QueryEngine
+from spatial import SpatialIndex
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects import Base
+from tree_index import TreeIndex
+from tree_walk import find_first, iter_elements
+from version_history import VersionHistory
+from transform import transform_meshes, transform_node, translation
 
 
 # TODO: Replace with your project and model IDs
@@ -27,6 +37,20 @@ TARGET_APPLICATION_ID = "17cc627f-f5df-44d2-908e-1cdaf96fe76c"
 # Note: The model uses millimeters, so 16 meters = 16000 mm
 OFFSET_Z = 16000.0
 
+# Number of copies to stack; copy n is placed n * OFFSET_Z above the original
+COPY_COUNT = 1
+
+# Place the copies as instances of one shared definition instead of copying
+# the geometry; the upload stays about the same size however many copies
+AS_INSTANCES = False
+
+# Report the elements each copy would overlap before committing; this reads
+# the displayValue of every element, so the whole model geometry is downloaded
+CHECK_CLASHES = False
+
+# Boxes that overlap by less than this (model units) only touch, e.g. stacked floors
+CLASH_TOLERANCE = 1.0
+
 # TODO: Configure top-level properties you want to modify (optional)
 # Leave empty {} to keep all original properties
 NEW_TOP_LEVEL_PROPERTIES = {
@@ -45,57 +69,13 @@ NEW_NESTED_PROPERTIES = {
 
 def find_object_by_application_id(obj, target_id: str):
     """
-    Recursively search for an object with the given applicationId.
-    """
-    if not isinstance(obj, Base):
-        return None
-    
-    app_id = getattr(obj, "applicationId", None)
-    if app_id == target_id:
-        return obj
-    
-    # Search in child elements
-    elements = getattr(obj, "@elements", None) or getattr(obj, "elements", [])
-    for element in elements or []:
-        found = find_object_by_application_id(element, target_id)
-        if found:
-            return found
-    
-    return None
-
-
-def deep_copy_base_object(obj):
+    Search for an object with the given applicationId, stopping at the first hit.
     """
-    Create a deep copy of a Speckle Base object, preserving all nested structures.
-    """
-    new_obj = Base()
-    
-    # Copy all properties including nested ones
-    for key in obj.get_member_names():
-        value = getattr(obj, key, None)
-        if value is not None:
-            try:
-                # Deep copy to preserve nested structures
-                if isinstance(value, Base):
-                    # Recursively copy Base objects
-                    new_obj[key] = deep_copy_base_object(value)
-                elif isinstance(value, list):
-                    # Deep copy lists
-                    new_obj[key] = copy.deepcopy(value)
-                elif isinstance(value, dict):
-                    # Deep copy dicts
-                    new_obj[key] = copy.deepcopy(value)
-                else:
-                    # Copy primitives and other types
-                    new_obj[key] = copy.deepcopy(value)
-            except Exception as e:
-                print(f"  Warning: Could not deep copy {key}: {e}")
-                try:
-                    new_obj[key] = value
-                except:
-                    pass
-    
-    return new_obj
+    return find_first(
+        obj,
+        lambda node: getattr(node, "applicationId", None) == target_id,
+        children=iter_elements,
+    )
 
 
 def apply_nested_properties(obj, nested_props: dict):
@@ -134,60 +114,45 @@ def apply_top_level_properties(obj, props: dict):
 
 def deep_copy_and_offset(obj, offset_z: float, top_level_props: dict = None, nested_props: dict = None):
     """
-    Create a deep copy of a Speckle object, offset its geometry, and apply custom properties.
+    Create a copy of a Speckle object, offset its geometry, and apply custom properties.
     Preserves all nested structures including 'properties' with Module, Designer, etc.
     """
-    # Create a deep copy preserving all nested structures
-    new_obj = deep_copy_base_object(obj)
-    
-    # Clear the id so a new one is generated
-    new_obj.id = None
-    
-    # Generate a new applicationId for the copy
+    return stacked_copies(obj, offset_z, 1, top_level_props, nested_props)[0]
+
+
+def stacked_copies(obj, offset_z: float, count: int, top_level_props: dict = None, nested_props: dict = None):
+    """
+    Create `count` copies of a Speckle object, copy n offset by n * offset_z.
+    The copies share faces, colors and untouched properties with the original;
+    only the moved vertices are new.
+    """
+    copies = clone_with_offsets(obj, [(0.0, 0.0, offset_z * n) for n in range(1, count + 1)])
+
     import uuid
-    new_obj.applicationId = str(uuid.uuid4())
-    
-    # Apply custom top-level properties if provided
-    if top_level_props:
-        apply_top_level_properties(new_obj, top_level_props)
-    
-    # Apply custom nested properties if provided (preserves existing ones)
-    if nested_props:
-        apply_nested_properties(new_obj, nested_props)
-    
-    # Offset geometry
-    offset_geometry(new_obj, offset_z)
-    
-    return new_obj
+    for new_obj in copies:
+        # Clear the id so a new one is generated
+        new_obj.id = None
+
+        # Generate a new applicationId for the copy
+        new_obj.applicationId = str(uuid.uuid4())
+
+        # Apply custom top-level properties if provided
+        if top_level_props:
+            apply_top_level_properties(new_obj, top_level_props)
+
+        # Apply custom nested properties if provided (preserves existing ones)
+        if nested_props:
+            apply_nested_properties(new_obj, nested_props)
+
+    return copies
 
 
 def offset_geometry(obj, offset_z: float):
     """
-    Offset geometry in the Z direction for various geometry types.
+    Offset geometry in the Z direction: all displayValue / mesh vertices
+    (in one batched pass) plus basePoint and location.
     """
-    # Handle displayValue (common in Revit objects)
-    display_value = getattr(obj, "displayValue", None) or getattr(obj, "@displayValue", None)
-    if display_value:
-        if isinstance(display_value, list):
-            for mesh in display_value:
-                offset_mesh_vertices(mesh, offset_z)
-        else:
-            offset_mesh_vertices(display_value, offset_z)
-    
-    # Handle direct vertices (for Mesh objects)
-    if hasattr(obj, "vertices") and obj.vertices:
-        offset_mesh_vertices(obj, offset_z)
-    
-    # Handle base point / location
-    if hasattr(obj, "basePoint"):
-        bp = obj.basePoint
-        if hasattr(bp, "z"):
-            bp.z += offset_z
-    
-    if hasattr(obj, "location"):
-        loc = obj.location
-        if hasattr(loc, "z"):
-            loc.z += offset_z
+    transform_node(obj, translation(z=offset_z))
 
 
 def offset_mesh_vertices(mesh, offset_z: float):
@@ -195,13 +160,7 @@ def offset_mesh_vertices(mesh, offset_z: float):
     Offset mesh vertices in the Z direction.
     Vertices are stored as flat list: [x1, y1, z1, x2, y2, z2, ...]
     """
-    if hasattr(mesh, "vertices") and mesh.vertices:
-        new_vertices = []
-        for i in range(0, len(mesh.vertices), 3):
-            new_vertices.append(mesh.vertices[i])              # x
-            new_vertices.append(mesh.vertices[i + 1])          # y
-            new_vertices.append(mesh.vertices[i + 2] + offset_z)  # z + offset
-        mesh.vertices = new_vertices
+    transform_meshes([mesh], translation(z=offset_z))
 
 
 def print_object_info(obj, title="Object Information"):
@@ -238,23 +197,70 @@ def print_object_info(obj, title="Object Information"):
     print(f"{'='*60}\n")
 
 
+def report_clashes(data, target_obj, offsets: list) -> int:
+    """
+    Print the elements each copy of the target (moved by one of `offsets`)
+    would overlap, using a spatial index over all element bounding boxes.
+    Returns the number of clashing copies.
+    """
+    elements = QueryEngine(TreeIndex(data)).select("*[displayValue | @displayValue]:not(Collection)").nodes
+    index = SpatialIndex(elements)
+    clashing = 0
+    for n, offset in enumerate(offsets, start=1):
+        hits = index.clashes(target_obj, offset, CLASH_TOLERANCE)
+        if hits:
+            clashing += 1
+            names = ", ".join(str(getattr(e, "name", None) or getattr(e, "applicationId", "?")) for e in hits[:5])
+            print(f"  ✗ Copy {n} at {offset} overlaps {len(hits)} elements: {names}")
+    if not clashing:
+        print(f"✓ No clashes for {len(offsets)} copies ({len(elements)} elements checked)")
+    return clashing
+
+
+def commit(client, transport, data, tracker, message: str):
+    """
+    Send the changed parts of the tree and create a new version.
+    """
+    # Send the modified data back
+    print(f"\n--- Committing to Speckle ---")
+    object_id, report = delta_send(data, [transport], tracker)
+    print(f"✓ Sent changes only: {report}")
+    print(f"✓ Sent object: {object_id}")
+    
+    # Create a new version
+    from specklepy.core.api.inputs.version_inputs import CreateVersionInput
+    
+    version = client.version.create(CreateVersionInput(
+        projectId=PROJECT_ID,
+        modelId=MODEL_ID,
+        objectId=object_id,
+        message=message
+    ))
+    
+    print(f"✓ Created version: {version.id}")
+    return version
+
+
 def main():
     # Authenticate
     client = get_client()
     
-    # Get the first version (the original with 2 objects)
-    versions = client.version.get_versions(MODEL_ID, PROJECT_ID, limit=100)
-    if not versions.items:
+    # Use the first version to ensure we start with only 2 original objects
+    first_version = VersionHistory(client, PROJECT_ID, MODEL_ID).oldest()
+    if first_version is None:
         print("No versions found.")
         return
-    
-    # Use the first version to ensure we start with only 2 original objects
-    first_version = versions.items[-1]  # Get the oldest version
     print(f"✓ Fetching first version: {first_version.id}")
     
-    # Receive the full data tree
+    # Receive the tree; only the duplicated object's geometry is downloaded
     transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    data = operations.receive(first_version.referenced_object, transport)
+    receiver = LazyReceiver(transport)
+    data = receiver.receive(first_version.referenced_object)
+    tracker = ChangeTracker(data)
+    # Loaded geometry is packed into compact buffers before it is tracked
+    receiver.on_load(pack_meshes)
+    receiver.on_load(tracker.track)
+    print(f"✓ Object cache: {default_cache().stats}")
     
     # Find the target object
     print(f"\n--- Searching for object {TARGET_APPLICATION_ID} ---")
@@ -269,22 +275,41 @@ def main():
     # Print original object information
     print_object_info(target_obj, "ORIGINAL OBJECT")
     
-    # Create a copy with offset and preserve nested properties
+    if CHECK_CLASHES:
+        print(f"--- Checking Clashes ---")
+        report_clashes(data, target_obj, [(0.0, 0.0, OFFSET_Z * n) for n in range(1, COPY_COUNT + 1)])
+    
+    if AS_INSTANCES:
+        print(f"--- Placing {COPY_COUNT} Instances ---")
+        instances = place_instances(
+            data,
+            target_obj,
+            [translation(z=OFFSET_Z * n) for n in range(1, COPY_COUNT + 1)],
+            collection="new_module",
+        )
+        for instance in instances:
+            apply_nested_properties(instance, NEW_NESTED_PROPERTIES)
+        print(f"✓ Placed {len(instances)} instances of definition {instances[0].definitionId}")
+        commit(client, transport, data, tracker, f"Placed {len(instances)} instances with Z offset {OFFSET_Z}")
+        return
+    
+    # Create the copies with offset and preserve nested properties
     print(f"--- Creating Duplicated Object ---")
-    print(f"  Offset Z: {OFFSET_Z} mm")
+    print(f"  Offset Z: {OFFSET_Z} mm, copies: {COPY_COUNT}")
     
-    copied_obj = deep_copy_and_offset(
+    copies = stacked_copies(
         target_obj, 
         OFFSET_Z,
+        COPY_COUNT,
         top_level_props=NEW_TOP_LEVEL_PROPERTIES if NEW_TOP_LEVEL_PROPERTIES else None,
         nested_props=NEW_NESTED_PROPERTIES if NEW_NESTED_PROPERTIES else None
     )
     
-    print(f"✓ Created copy with Z offset of {OFFSET_Z}")
+    print(f"✓ Created {len(copies)} copies with Z offset of {OFFSET_Z}")
     print(f"✓ Preserved all nested properties (Module, Designer, etc.)")
     
     # Print duplicated object information
-    print_object_info(copied_obj, "DUPLICATED OBJECT")
+    print_object_info(copies[0], "DUPLICATED OBJECT")
     
     # Create a new collection for the duplicated object
     new_collection = Base()
@@ -293,7 +318,7 @@ def main():
     new_collection._speckle_type = "Speckle.Core.Models.Collection"
     new_collection["speckle_type"] = "Speckle.Core.Models.Collection"
     new_collection.name = "new_module"
-    new_collection.elements = [copied_obj]
+    new_collection.elements = copies
     
     print(f"✓ Created collection: '{new_collection.name}'")
     print("✓ Added duplicated object to collection")
@@ -315,22 +340,8 @@ def main():
         data["@elements"] = [new_collection]
         print(f"✓ Created new elements list")
     
-    # Send the modified data back
-    print(f"\n--- Committing to Speckle ---")
-    object_id = operations.send(data, [transport])
-    print(f"✓ Sent object: {object_id}")
-    
-    # Create a new version
-    from specklepy.core.api.inputs.version_inputs import CreateVersionInput
-    
-    version = client.version.create(CreateVersionInput(
-        projectId=PROJECT_ID,
-        modelId=MODEL_ID,
-        objectId=object_id,
-        message=f"Duplicated object with nested properties (Module, Designer) preserved and Z offset {OFFSET_Z}"
-    ))
-    
-    print(f"✓ Created version: {version.id}")
+    commit(client, transport, data, tracker,
+           f"Duplicated object with nested properties (Module, Designer) preserved and Z offset {OFFSET_Z}")
     print(f"\n{'='*60}")
     print(f"✅ SUCCESS!")
     print(f"{'='*60}")
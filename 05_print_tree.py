@@ -1,33 +1,39 @@
+import io
+
 from main import get_client
+from lazy_receive import LazyReceiver
+from object_cache import cached_receive, default_cache
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects import Base
+from tree_walk import walk
+from version_diff import diff_objects
 
 PROJECT_ID = "128262a20c"
 MODEL_ID = "0763ad7d28"
 
 
-def walk_tree_print(root: Base, depth: int = 0):
-    if not isinstance(root, Base):
-        return
-    indent = "  " * depth
-    name = getattr(root, "name", "(no name)")
-    s_type = getattr(root, "speckle_type", getattr(root, "_speckle_type", "(no type)"))
-    app_id = getattr(root, "applicationId", None)
-    print(f"{indent}- name: {name!s} | type: {s_type!s} | appId: {app_id}")
+def walk_tree_print(root: Base, depth: int = 0, file=None):
+    # Received trees are acyclic; a subtree referenced twice is printed twice
+    for node, node_depth, _, _ in walk(root, unique=False, depth=depth):
+        indent = "  " * node_depth
+        name = getattr(node, "name", "(no name)")
+        s_type = getattr(node, "speckle_type", getattr(node, "_speckle_type", "(no type)"))
+        app_id = getattr(node, "applicationId", None)
+        print(f"{indent}- name: {name!s} | type: {s_type!s} | appId: {app_id}", file=file)
 
-    elements = getattr(root, "@elements", None) or getattr(root, "elements", None) or []
-    for el in elements or []:
-        if isinstance(el, Base):
-            walk_tree_print(el, depth + 1)
 
-    for key in getattr(root, "get_member_names", lambda: [])():
-        try:
-            val = getattr(root, key)
-        except Exception:
-            val = None
-        if isinstance(val, Base):
-            walk_tree_print(val, depth + 1)
+def tree_text(client, project_id: str, model_id: str, version=None) -> str:
+    """Return the printed tree of a version (the latest if none is given)."""
+    if version is None:
+        versions = client.version.get_versions(model_id, project_id, limit=1)
+        if not versions.items:
+            raise ValueError(f"No versions found in model {model_id}")
+        version = versions.items[0]
+    transport = ServerTransport(client=client, stream_id=project_id)
+    data = cached_receive(version.referenced_object, transport)
+    out = io.StringIO()
+    walk_tree_print(data, file=out)
+    return out.getvalue()
 
 
 if __name__ == '__main__':
@@ -43,7 +49,13 @@ if __name__ == '__main__':
     latest = versions.items[0]
     print(f"\nUsing latest version: {latest.id}\n")
     transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    data = operations.receive(latest.referenced_object, transport)
+    data = cached_receive(latest.referenced_object, transport)
+    print(f"✓ Object cache: {default_cache().stats}")
+
+    if len(versions.items) > 1:
+        previous = versions.items[1]
+        diff_objects(previous.referenced_object, latest.referenced_object, LazyReceiver(transport)).print_report()
+        print()
 
     print("--- Model tree (latest) ---")
     walk_tree_print(data)
@@ -1,6 +1,8 @@
 from main import get_client
+from lazy_receive import LazyReceiver
+from object_cache import default_cache
+from delta_send import ChangeTracker, delta_send
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects import Base
 from specklepy.core.api.inputs.version_inputs import CreateVersionInput
 
@@ -17,12 +19,18 @@ if not versions.items:
 latest = versions.items[0]
 print(f"Using latest version: {latest.id}")
 transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-root = operations.receive(latest.referenced_object, transport)
+# Only names change: leave the geometry on the server
+receiver = LazyReceiver(transport)
+root = receiver.receive(latest.referenced_object)
+tracker = ChangeTracker(root)
+receiver.on_load(tracker.track)
+print(f"✓ Object cache: {default_cache().stats}")
 
 print(f"Current root name: {getattr(root,'name',None)}")
 root.name = NEW_ROOT_NAME
 
-object_id = operations.send(root, [transport])
+object_id, report = delta_send(root, [transport], tracker)
+print(f"Sent changes only: {report}")
 version = client.version.create(CreateVersionInput(
     projectId=PROJECT_ID,
     modelId=MODEL_ID,
@@ -1,78 +1,42 @@
 from main import get_client
+from lazy_receive import LazyReceiver
+from object_cache import default_cache
+from delta_send import ChangeTracker, delta_send
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects import Base
 from specklepy.core.api.inputs.version_inputs import CreateVersionInput
+from query import QueryEngine, quote
+from tree_index import TreeIndex
 
 PROJECT_ID = "128262a20c"
 MODEL_ID = "0763ad7d28"
 TARGET_APPID = "7173a954-412b-4606-b14c-c2bdb579af98"  # node currently named 'Collection'
 
 
-def find_by_appid(root: Base, appid: str):
-    if not isinstance(root, Base):
-        return None
-    if getattr(root, "applicationId", None) == appid:
-        return root
-    elements = getattr(root, "@elements", None) or getattr(root, "elements", None) or []
-    for el in elements or []:
-        if isinstance(el, Base):
-            found = find_by_appid(el, appid)
-            if found:
-                return found
-    for key in getattr(root, "get_member_names", lambda: [])():
-        try:
-            val = getattr(root, key)
-        except Exception:
-            val = None
-        if isinstance(val, Base):
-            found = find_by_appid(val, appid)
-            if found:
-                return found
-    return None
-
-
-def rename_member_by_name(root: Base, target_name: str, new_name: str):
-    if not isinstance(root, Base):
+def run_query(engine: QueryEngine, selector: str):
+    result = engine.select(selector)
+    print(result.explain())
+    return result
+
+
+def find_by_appid(engine: QueryEngine, appid: str):
+    return run_query(engine, f"[applicationId == {quote(appid)}]").first()
+
+
+def rename_member_by_name(engine: QueryEngine, target_name: str, new_name: str):
+    node = run_query(engine, f"[name == {quote(target_name)}]").first()
+    if node is None:
         return False
-    if getattr(root, "name", None) == target_name:
-        root.name = new_name
-        return True
-    elements = getattr(root, "@elements", None) or getattr(root, "elements", None) or []
-    for el in elements or []:
-        if isinstance(el, Base) and rename_member_by_name(el, target_name, new_name):
-            return True
-    for key in getattr(root, "get_member_names", lambda: [])():
-        try:
-            val = getattr(root, key)
-        except Exception:
-            val = None
-        if isinstance(val, Base) and rename_member_by_name(val, target_name, new_name):
-            return True
-    return False
-
-
-def rename_child_under_parent(root: Base, parent_name: str, child_name: str, new_child_name: str):
-    if not isinstance(root, Base):
+    engine.index.rename(node, new_name)
+    return True
+
+
+def rename_child_under_parent(engine: QueryEngine, parent_name: str, child_name: str, new_child_name: str):
+    child = run_query(engine, f"[name == {quote(parent_name)}] > [name == {quote(child_name)}]").first()
+    if child is None:
         return False
-    if getattr(root, "name", None) == parent_name:
-        elements = getattr(root, "@elements", None) or getattr(root, "elements", None) or []
-        for el in elements or []:
-            if isinstance(el, Base) and getattr(el, "name", None) == child_name:
-                el.name = new_child_name
-                return True
-    elements = getattr(root, "@elements", None) or getattr(root, "elements", None) or []
-    for el in elements or []:
-        if isinstance(el, Base) and rename_child_under_parent(el, parent_name, child_name, new_child_name):
-            return True
-    for key in getattr(root, "get_member_names", lambda: [])():
-        try:
-            val = getattr(root, key)
-        except Exception:
-            val = None
-        if isinstance(val, Base) and rename_child_under_parent(val, parent_name, child_name, new_child_name):
-            return True
-    return False
+    engine.index.rename(child, new_child_name)
+    return True
 
 
 if __name__ == '__main__':
@@ -85,31 +49,39 @@ if __name__ == '__main__':
     print(f"Using latest version: {latest.id}")
 
     transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    root = operations.receive(latest.referenced_object, transport)
+    # Only names and types change: leave the geometry on the server
+    receiver = LazyReceiver(transport)
+    root = receiver.receive(latest.referenced_object)
+    tracker = ChangeTracker(root)
+    receiver.on_load(tracker.track)
+    print(f"✓ Object cache: {default_cache().stats}")
 
     print("\n--- Applying renames: root -> 'Specklypy model', 'Layer 01' -> 'old', child 'Layer' -> 'Collection' ---")
-    root.name = "Specklypy model"
-    renamed = rename_member_by_name(root, "Layer 01", "old")
+    # Index the tree once; every query below is served from its lookup tables
+    index = TreeIndex(root)
+    engine = QueryEngine(index)
+    index.rename(root, "Specklypy model")
+    renamed = rename_member_by_name(engine, "Layer 01", "old")
     print(f"  ✓ Renamed 'Layer 01' -> 'old': {renamed}")
-    child_renamed = rename_child_under_parent(root, "old", "Layer", "old")
+    child_renamed = rename_child_under_parent(engine, "old", "Layer", "old")
     print(f"  ✓ Renamed child 'Layer' under 'old' -> 'old': {child_renamed}")
 
-    node = find_by_appid(root, TARGET_APPID)
+    node = find_by_appid(engine, TARGET_APPID)
     if not node:
         print(f"Could not find node with applicationId {TARGET_APPID}")
         raise SystemExit(1)
 
     print(f"Found node: current name={getattr(node,'name',None)} type={getattr(node,'speckle_type',None)}")
-    node.name = "old_modules"
-    node.speckle_type = "Speckle.Core.Models.Collection"
+    index.rename(node, "old_modules")
     node._speckle_type = "Speckle.Core.Models.Collection"
     try:
-        node["speckle_type"] = "Speckle.Core.Models.Collection"
+        index.retype(node, "Speckle.Core.Models.Collection")
     except Exception:
         pass
 
     # send
-    object_id = operations.send(root, [transport])
+    object_id, report = delta_send(root, [transport], tracker)
+    print(f"Sent changes only: {report}")
     version = client.version.create(CreateVersionInput(
         projectId=PROJECT_ID,
         modelId=MODEL_ID,
@@ -9,9 +9,18 @@ Use this model: https://app.speckle.systems/projects/YOUR_PROJECT_ID/models/YOUR
 """
 
 from main import get_client
+from object_cache import cached_receive, default_cache
+from delta_send import ChangeTracker, delta_send
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects.base import Base
+from query import QueryEngine
+from tree_index import TreeIndex
+from tree_walk import iter_elements
+from banding import assign_bands, band_cuts, z_extents
+from mesh_buffers import pack_meshes
+from spatial import SpatialIndex
+from specklepy.core.api.inputs.version_inputs import CreateVersionInput
+from instrument import span
 
 
 # TODO: Replace with your project, model, and version IDs
@@ -26,139 +35,124 @@ ELEMENT_PROPERTIES = [
     {"Module": "03", "Designer": "Marina"}      # Top elements
 ]
 
+# How elements are split into the groups above:
+#   "equal"    - equal-width Z bands between the lowest and highest element
+#   "quantile" - the same number of elements in each band
+#   "cuts"     - explicit Z levels from Z_CUTS (one fewer than the number of groups)
+BANDING_MODE = "equal"
+Z_CUTS = []
+
+
+# Elements to band: nodes with geometry that are not collections
+ELEMENT_SELECTOR = "*[displayValue | @displayValue | basePoint | location | vertices]:not(Collection)"
+
+# Print the query plan of the element search
+EXPLAIN_QUERIES = False
+
 
 def find_all_elements(obj, elements=None):
     """
-    Recursively find all objects/elements in the tree.
+    Find all objects/elements in the tree with an indexed query. Only the
+    element / collection hierarchy is searched, so display meshes and other
+    members of an element are not returned as elements themselves.
     """
     if elements is None:
         elements = []
-    
-    if not isinstance(obj, Base):
-        return elements
-    
-    # Check if this object has geometric properties (likely an element)
-    has_geometry = (
-        hasattr(obj, "displayValue") or 
-        hasattr(obj, "@displayValue") or
-        hasattr(obj, "basePoint") or
-        hasattr(obj, "location") or
-        hasattr(obj, "vertices")
-    )
-    
-    # Add if it's not a Collection but has geometric properties
-    speckle_type = getattr(obj, "speckle_type", "")
-    if has_geometry and "rCollection" not in speckle_type:
-        elements.append(obj)
-    
-    # Search in child elements
-    child_elements = getattr(obj, "@elements", None) or getattr(obj, "elements", [])
-    for element in child_elements or []:
-        find_all_elements(element, elements)
-    
-    # Also check for collections property and search within them
-    colls = getattr(obj, "collections", None)
-    if colls:
-        for coll in colls:
-            find_all_elements(coll, elements)
-    
+
+    with span("traverse.elements") as s:
+        result = QueryEngine(TreeIndex(obj, children=iter_elements)).select(ELEMENT_SELECTOR)
+        elements.extend(result.nodes)
+        s.set(elements=len(elements))
+    if EXPLAIN_QUERIES:
+        print(result.explain())
     return elements
 
 
 def get_z_position(obj):
-    """Extract Z coordinate from object for sorting"""
-    # Try direct properties first
-    if hasattr(obj, "basePoint") and hasattr(obj.basePoint, "z"):
-        return obj.basePoint.z
-    if hasattr(obj, "location") and hasattr(obj.location, "z"):
-        return obj.location.z
-    
-    # Try to get from displayValue mesh vertices
-    display_value = getattr(obj, "displayValue", None) or getattr(obj, "@displayValue", None)
-    if display_value:
-        meshes = display_value if isinstance(display_value, list) else [display_value]
-        for mesh in meshes:
-            if hasattr(mesh, "vertices") and mesh.vertices and len(mesh.vertices) >= 3:
-                # Get Z coordinates (every 3rd value starting from index 2)
-                z_coords = [mesh.vertices[i] for i in range(2, min(len(mesh.vertices), 30), 3)]
-                if z_coords:
-                    return sum(z_coords) / len(z_coords)
-    
-    return 0  # Default if no Z found
+    """Extract the centroid Z of an object (mean of all its vertices) for sorting"""
+    return float(z_extents([obj]).centroid[0])
 
 
 def assign_properties_by_z_ranges(elements):
     """
     Assign properties to elements based on their Z-position.
-    Divides elements into equal groups based on Z-height.
+    Z extents of all elements are computed in one pass and every element is
+    put into its band with a single sorted search.
     """
     if not elements:
         return
-    
-    # Get Z positions for all elements
-    element_z_pairs = [(elem, get_z_position(elem)) for elem in elements]
-    
-    # Find min and max Z values
-    z_values = [z for _, z in element_z_pairs]
-    min_z = min(z_values)
-    max_z = max(z_values)
-    
-    # Calculate Z-range boundaries for each group
-    z_range = max_z - min_z
+
+    # Get the true Z extent of every element
+    with span("banding.extents", elements=len(elements)):
+        extents = z_extents(elements)
+    min_z = float(min(extents.zmin))
+    max_z = float(max(extents.zmax))
+    print(f"✓ Z-range (element extents): {min_z:.2f} to {max_z:.2f}")
+
+    # Calculate Z-range boundaries for each group and band the centroids
     num_groups = len(ELEMENT_PROPERTIES)
-    
-    print(f"✓ Z-range: {min_z:.2f} to {max_z:.2f}")
-    
-    # Assign properties based on Z-position
-    property_counts = [0] * num_groups
+    cuts = [float(c) for c in band_cuts(extents.centroid, num_groups, BANDING_MODE, Z_CUTS)]
+    lowest = float(min(extents.centroid))
+    highest = float(max(extents.centroid))
+    group_indices = assign_bands(extents.centroid, cuts)
 
-    for element, z_pos in element_z_pairs:
-        if z_range == 0:
-            group_index = 0
-        else:
-            # Calculate which third (or group) the element falls into
-            normalized_z = (z_pos - min_z) / z_range
-            group_index = min(int(normalized_z * num_groups), num_groups - 1)
-        
+    property_counts = [0] * num_groups
+    for element, group_index in zip(elements, group_indices):
         # Overwrite properties with a plain dict (keeps only Module and Designer)
         element.properties = {
             "Module": ELEMENT_PROPERTIES[group_index]["Module"],
             "Designer": ELEMENT_PROPERTIES[group_index]["Designer"],
         }
-        
         property_counts[group_index] += 1
 
-    # Print summary
+    # Print summary: bands are bounded by the cuts and, at the ends, by the
+    # lowest and highest centroid (the values that were banded)
+    print(f"✓ Banded element centroids: Z {lowest:.2f} to {highest:.2f}")
+    # Explicit cuts may lie outside the centroids; the outer bands then end there
+    low = min([lowest] + cuts)
+    high = max([highest] + cuts)
+    levels = [low] + cuts + [high]
+    levels += [high] * (num_groups + 1 - len(levels))
     for i, count in enumerate(property_counts):
-        z_start = min_z + (i * z_range / num_groups)
-        z_end = min_z + ((i + 1) * z_range / num_groups)
-        print(f"  ✓ Group {i+1} (Z: {z_start:.2f} to {z_end:.2f}): {count} elements - Module={ELEMENT_PROPERTIES[i]['Module']}, Designer={ELEMENT_PROPERTIES[i]['Designer']}")
+        print(f"  ✓ Group {i+1} (centroid Z: {levels[i]:.2f} to {levels[i + 1]:.2f}): {count} elements - Module={ELEMENT_PROPERTIES[i]['Module']}, Designer={ELEMENT_PROPERTIES[i]['Designer']}")
 
+    # Elements are banded by centroid; a slab query also finds those that
+    # reach into a band from a neighbouring one (columns, shafts, ...)
+    with span("banding.slabs", elements=len(elements)):
+        index = SpatialIndex(elements)
+        for i in range(num_groups):
+            inside = index.slab_ids(levels[i], levels[i + 1])
+            spanning = sum(1 for j in inside if group_indices[j] != i)
+            if spanning:
+                print(f"  ✓ Group {i+1}: {spanning} elements from other groups also reach into this Z range")
 
-def main():
-    # Authenticate
-    client = get_client()
 
-    # Get the latest version
-    versions = client.version.get_versions(MODEL_ID, PROJECT_ID, limit=1)
-    if not versions.items:
-        print("No versions found.")
-        return
-    
-    latest_version = versions.items[0]
-    print(f"✓ Fetching version: {latest_version.id}")
+def add_properties(client, project_id: str, model_id: str, version=None) -> str:
+    """
+    Add the Z-banded element properties and the root properties to a version
+    (the latest if none is given) and create a new version. Returns its id.
+    """
+    if version is None:
+        versions = client.version.get_versions(model_id, project_id, limit=1)
+        if not versions.items:
+            raise ValueError(f"No versions found in model {model_id}")
+        version = versions.items[0]
+    print(f"✓ Fetching version: {version.id}")
 
     # Receive the data
-    transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    data = operations.receive(latest_version.referenced_object, transport)
+    transport = ServerTransport(client=client, stream_id=project_id)
+    data = cached_receive(version.referenced_object, transport)
+    packed = pack_meshes(data)
+    tracker = ChangeTracker(data)
+    print(f"✓ Object cache: {default_cache().stats}")
+    print(f"✓ Packed {packed['values']} mesh values into {packed['bytes'] / 1e6:.1f} MB of buffers")
 
     # Find all elements in the model
     elements = find_all_elements(data)
-    
+
     if not elements:
-        print("✗ No elements found in the model")
-        return
-    
+        raise ValueError("No elements found in the model")
+
     print(f"✓ Found {len(elements)} elements")
 
     # Assign properties to elements based on their Z-position
@@ -172,21 +166,31 @@ def main():
     data["Tower"] = "Team_02.3"
 
     # Send the modified data back to Speckle
-    object_id = operations.send(data, [transport])
+    object_id, report = delta_send(data, [transport], tracker)
+    print(f"✓ Sent changes only: {report}")
     print(f"✓ Sent object: {object_id}")
 
     # Create a new version with the modified data
-    from specklepy.core.api.inputs.version_inputs import CreateVersionInput
-
-    version = client.version.create(CreateVersionInput(
-        projectId=PROJECT_ID,
-        modelId=MODEL_ID,
+    new_version = client.version.create(CreateVersionInput(
+        projectId=project_id,
+        modelId=model_id,
         objectId=object_id,
         message="Added Module and Designer properties to individual elements based on Z-position"
     ))
 
-    print(f"✓ Created version: {version.id}")
+    print(f"✓ Created version: {new_version.id}")
+    return new_version.id
+
+
+def main():
+    # Authenticate
+    client = get_client()
+
+    try:
+        add_properties(client, PROJECT_ID, MODEL_ID)
+    except ValueError as e:
+        print(f"✗ {e}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -10,15 +10,40 @@ Use this model: https://app.speckle.systems/projects/YOUR_PROJECT_ID/models/YOUR
 import json
 import os
 from main import get_client
+from incremental_export import CHILD_MEMBERS, ExportStore
+from lazy_receive import HEAVY_MEMBERS, LazyReceiver
+from object_records import ObjectRecord, json_default
+from object_cache import cached_receive, default_cache
 from specklepy.transports.server import ServerTransport
-from specklepy.api import operations
 from specklepy.objects.base import Base
+from tree_walk import iter_elements, walk
+from columnar import write_columnar
+from instrument import span
 
 
 # TODO: Replace with your project and model IDs
 PROJECT_ID = "128262a20c"
 MODEL_ID = "0763ad7d28"
 
+# Output format:
+#   "json"        - one pretty-printed JSON document, built in memory (original behaviour)
+#   "json-stream" - the same document shape, written object by object
+#   "ndjson"      - one JSON object per line: a header line, then one line per object
+#   "columnar"    - typed column arrays in a memory-mappable binary file (see columnar.py)
+EXPORT_FORMAT = "json"
+EXPORT_FORMATS = ("json", "json-stream", "ndjson", "columnar")
+
+# Incremental export: keep a store of the exported records next to the output
+# (model_objects.store/, see incremental_export.py) and update it with only the
+# records that changed since the last run. The output file (in EXPORT_FORMAT) is
+# then written from the store, without receiving the unchanged objects again
+INCREMENTAL = False
+
+# Streaming writers use a buffered file and flush every FLUSH_EVERY objects,
+# so a consumer can start reading before the export finishes
+WRITE_BUFFER_SIZE = 1024 * 1024
+FLUSH_EVERY = 1000
+
 
 def query_objects_graphql(client, project_id: str, version_id: str) -> dict:
     """
@@ -53,89 +78,210 @@ def query_objects_graphql(client, project_id: str, version_id: str) -> dict:
 
 def collect_all_objects(obj, collected=None, depth=0) -> list:
     """
-    Recursively collect all objects and their properties from the Speckle data tree.
+    Collect the record (see object_records.py) of every object in the Speckle data tree.
     """
     if collected is None:
         collected = []
-    
-    if not isinstance(obj, Base):
-        return collected
-    
-    # Convert object to dictionary
-    obj_dict = {
-        "id": getattr(obj, "id", None),
-        "speckle_type": getattr(obj, "speckle_type", None),
-        "applicationId": getattr(obj, "applicationId", None),
-        "name": getattr(obj, "name", None),
-        "depth": depth,
-        "properties": {}
-    }
-    
-    # Collect all properties
-    for key in obj.get_member_names():
-        if key.startswith("_"):
-            continue
-        value = getattr(obj, key, None)
-        if value is not None and not isinstance(value, Base) and not isinstance(value, list):
-            obj_dict["properties"][key] = value
-        elif isinstance(value, list) and len(value) > 0 and not isinstance(value[0], Base):
-            obj_dict["properties"][key] = value
-    
-    collected.append(obj_dict)
-    
-    # Recursively process child objects
-    elements = getattr(obj, "@elements", None) or getattr(obj, "elements", [])
-    for element in elements or []:
-        collect_all_objects(element, collected, depth + 1)
-    
+
+    collected.extend(iter_all_objects(obj, depth))
     return collected
 
 
-def main():
-    # Authenticate
-    client = get_client()
-    
-    # Get the latest version
-    versions = client.version.get_versions(MODEL_ID, PROJECT_ID, limit=1)
-    if not versions.items:
-        print("No versions found.")
-        return
-    
-    latest_version = versions.items[0]
-    print(f"✓ Fetching version: {latest_version.id}")
-    
+def iter_all_objects(obj, depth=0):
+    """
+    Lazily yield the record of each object as the tree is walked.
+    """
+    # Received trees are acyclic; a subtree referenced twice is exported twice
+    for node, node_depth, _, _ in walk(obj, children=iter_elements, unique=False, depth=depth):
+        yield ObjectRecord.from_node(node, node_depth)
+
+
+def object_to_dict(obj: Base, depth: int) -> dict:
+    """
+    Convert a single object to a dictionary with its plain (non-Base) properties.
+    """
+    return ObjectRecord.from_node(obj, depth).to_dict()
+
+
+def write_ndjson(output_file: str, header: dict, objects) -> int:
+    """
+    Write a header line followed by one line per object. Returns the object count.
+    """
+    count = 0
+    with open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(json.dumps({"header": header}, default=str))
+        f.write("\n")
+        for obj in objects:
+            f.write(json.dumps(obj, default=json_default))
+            f.write("\n")
+            count += 1
+            if count % FLUSH_EVERY == 0:
+                f.flush()
+    return count
+
+
+def write_json_stream(output_file: str, header: dict, objects) -> int:
+    """
+    Write the same document as the "json" format, but emit the "objects"
+    array incrementally instead of building it in memory first.
+    """
+    count = 0
+    with open(output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as f:
+        # Header keys first, then open the objects array (an empty header
+        # must not leave a stray comma)
+        f.write(json.dumps(dict(header, objects=[]), default=str)[:-2])
+        f.write("\n")
+        for obj in objects:
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(obj, default=json_default))
+            count += 1
+            if count % FLUSH_EVERY == 0:
+                f.flush()
+        f.write("\n]}\n")
+    return count
+
+
+def latest_version(client, project_id: str, model_id: str):
+    """Return the latest version of a model, or None if it has none."""
+    versions = client.version.get_versions(model_id, project_id, limit=1)
+    return versions.items[0] if versions.items else None
+
+
+def export_version(client, project_id: str, model_id: str, version=None,
+                   output_file: str = None, export_format: str = None, incremental: bool = None) -> dict:
+    """
+    Export one version (the latest if none is given) of a model.
+    Returns the output file, the object count and the version id.
+    """
+    export_format = check_format(export_format or EXPORT_FORMAT)
+    incremental = INCREMENTAL if incremental is None else incremental
+    if version is None:
+        version = latest_version(client, project_id, model_id)
+        if version is None:
+            raise ValueError(f"No versions found in model {model_id}")
+    print(f"✓ Fetching version: {version.id}")
+
     # Query project info via GraphQL
     try:
-        graphql_result = query_objects_graphql(client, PROJECT_ID, latest_version.id)
+        graphql_result = query_objects_graphql(client, project_id, version.id)
         print(f"✓ GraphQL query executed successfully")
     except Exception as e:
         print(f"⚠ GraphQL query failed: {e}")
         graphql_result = None
-    
+
+    header = {
+        "project_id": project_id,
+        "model_id": model_id,
+        "version_id": version.id,
+        "version_message": version.message,
+        "graphql_info": graphql_result,
+    }
+    transport = ServerTransport(client=client, stream_id=project_id)
+
+    if incremental:
+        output_file = output_file or _default_output(export_format)
+        with span("export", format="incremental") as s:
+            store = _update_store(transport, version, header, output_file)
+            # The export file is rewritten from the store's records, without
+            # receiving the unchanged objects again
+            result = _write_export(store.iter_records(), header, export_format, output_file)
+            s.set(objects=result["count"])
+        result["store"] = store.path
+        result["version_id"] = version.id
+        return result
+
     # Receive the full data tree
-    transport = ServerTransport(client=client, stream_id=PROJECT_ID)
-    data = operations.receive(latest_version.referenced_object, transport)
-    
+    data = cached_receive(version.referenced_object, transport)
+    print(f"✓ Object cache: {default_cache().stats}")
+
+    with span("export", format=export_format) as s:
+        result = _write_export(iter_all_objects(data), header, export_format, output_file)
+        s.set(objects=result["count"])
+    result["version_id"] = version.id
+    return result
+
+
+def check_format(export_format: str) -> str:
+    """Return `export_format`, or raise ValueError if it is not one of EXPORT_FORMATS."""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+
+def _default_output(export_format: str) -> str:
+    # Save next to this script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    extension = {"ndjson": "ndjson", "columnar": "spkcol"}.get(export_format, "json")
+    return os.path.join(script_dir, f"model_objects.{extension}")
+
+
+def _update_store(transport, version, header: dict, output_file: str) -> ExportStore:
+    """
+    Update the incremental store next to `output_file` to this version and
+    return it.
+    Only objects whose id changed since the last run are received.
+    """
+    store = ExportStore(os.path.splitext(output_file)[0] + ".store")
+    if store.version_id == version.id:
+        print(f"✓ Export store is already at version {version.id}")
+    else:
+        # Element children stay on the server until the walk reaches them
+        receiver = LazyReceiver(transport, skip=HEAVY_MEMBERS | CHILD_MEMBERS)
+        changes = store.update(receiver, version.referenced_object, header, object_to_dict)
+        print(f"✓ Updated export store: {changes['added']} added, {changes['removed']} removed, "
+              f"{changes['reused']} unchanged")
+    if store.needs_compaction():
+        print(f"✓ Compacted export store to {store.compact()} records")
+    return store
+
+
+def _write_export(objects, header: dict, export_format: str, output_file: str = None) -> dict:
+    check_format(export_format)
+    output_file = output_file or _default_output(export_format)
+    result = {"output_file": output_file}
+
+    if export_format == "ndjson":
+        result["count"] = write_ndjson(output_file, header, objects)
+        print(f"✓ Streamed {result['count']} objects to {output_file}")
+        return result
+
+    if export_format == "columnar":
+        result["count"] = write_columnar(output_file, objects, meta=header)
+        print(f"✓ Wrote {result['count']} objects as columns to {output_file}")
+        return result
+
+    if export_format == "json-stream":
+        result["count"] = write_json_stream(output_file, header, objects)
+        print(f"✓ Streamed {result['count']} objects to {output_file}")
+        return result
+
     # Collect all objects with their properties
-    all_objects = collect_all_objects(data)
+    all_objects = list(objects)
     print(f"✓ Collected {len(all_objects)} objects from the model")
-    
+
     # Create output dictionary
-    output = {
-        "project_id": PROJECT_ID,
-        "model_id": MODEL_ID,
-        "version_id": latest_version.id,
-        "version_message": latest_version.message,
-        "graphql_info": graphql_result,
-        "objects": all_objects
-    }
-    
-    # Save to JSON file (in the same directory as this script)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_file = os.path.join(script_dir, "model_objects.json")
+    output = dict(header, objects=all_objects)
+
+    # Save to JSON file
     with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, default=str)
+        json.dump(output, f, indent=2, default=json_default)
     print(f"✓ Saved all objects to {output_file}")
+    result["count"] = len(all_objects)
+    return result
+
+
+def main():
+    # Authenticate
+    client = get_client()
+
+    # Get the latest version
+    version = latest_version(client, PROJECT_ID, MODEL_ID)
+    if version is None:
+        print("No versions found.")
+        return
+
+    export_version(client, PROJECT_ID, MODEL_ID, version)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+"""
+Z-banding of model elements.
+
+Computes every element's true vertical extent (min / max / centroid Z) from
+all of its displayValue vertices in one vectorized pass, then sorts elements
+into bands using equal-width bands, quantile bands or explicit cut levels.
+Band assignment is a single sorted search over all elements.
+
+Uses NumPy when it is installed (`pip install .[fast]`) and the standard
+library otherwise.
+
+Usage:
+    from banding import z_extents, equal_width_cuts, assign_bands
+    extents = z_extents(elements)
+    cuts = equal_width_cuts(extents.centroid, 3)
+    bands = assign_bands(extents.centroid, cuts)
+"""
+
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path is used instead
+    np = None
+
+
+class ZExtents:
+    """Per-element Z statistics, index-aligned with the element list."""
+
+    def __init__(self, zmin, zmax, centroid):
+        self.zmin = zmin
+        self.zmax = zmax
+        self.centroid = centroid
+
+    def __len__(self) -> int:
+        return len(self.centroid)
+
+
+def element_meshes(obj) -> list:
+    """Return the displayValue meshes of an element (or the element if it is a mesh)."""
+    display_value = getattr(obj, "displayValue", None) or getattr(obj, "@displayValue", None)
+    if display_value:
+        meshes = display_value if isinstance(display_value, list) else [display_value]
+    else:
+        meshes = [obj]
+    return [m for m in meshes if len(getattr(m, "vertices", None) or []) >= 3]
+
+
+def _point_z(obj):
+    for attr in ("basePoint", "location"):
+        point = getattr(obj, attr, None)
+        if point is not None and hasattr(point, "z"):
+            return point.z
+    return 0.0
+
+
+def z_extents(elements) -> ZExtents:
+    """
+    Compute min / max / centroid Z of each element from all its vertices.
+    Elements without vertices use their basePoint / location Z (or 0).
+    The centroid is the mean Z of the element's vertices.
+    """
+    groups = []
+    for obj in elements:
+        meshes = element_meshes(obj)
+        if meshes:
+            groups.append([mesh.vertices for mesh in meshes])
+        else:
+            groups.append([[0.0, 0.0, _point_z(obj)]])
+
+    if not groups:
+        return ZExtents([], [], [])
+
+    if np is not None:
+        # One flat Z buffer for all elements, reduced per element segment
+        parts = [np.asarray(b, dtype=float)[2::3] for group in groups for b in group]
+        counts = np.asarray([sum(len(b) // 3 for b in group) for group in groups])
+        z = np.concatenate(parts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        zmin = np.minimum.reduceat(z, starts)
+        zmax = np.maximum.reduceat(z, starts)
+        centroid = np.add.reduceat(z, starts) / counts
+        return ZExtents(zmin, zmax, centroid)
+
+    zmin, zmax, centroid = [], [], []
+    for group in groups:
+        zs = [z for b in group for z in b[2::3]]
+        zmin.append(min(zs))
+        zmax.append(max(zs))
+        centroid.append(sum(zs) / len(zs))
+    return ZExtents(zmin, zmax, centroid)
+
+
+def equal_width_cuts(values, bands: int) -> list:
+    """Cut levels splitting the value range into `bands` equal-width bands."""
+    low, high = float(min(values)), float(max(values))
+    step = (high - low) / bands
+    return [low + step * i for i in range(1, bands)] if step else []
+
+
+def quantile_cuts(values, bands: int) -> list:
+    """Cut levels putting (about) the same number of values in each band."""
+    if np is not None:
+        return list(np.quantile(np.asarray(values, dtype=float), [i / bands for i in range(1, bands)]))
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    cuts = []
+    for i in range(1, bands):
+        # Linear interpolation, matching NumPy's default quantile method
+        position = last * i / bands
+        lower = int(position)
+        upper = min(lower + 1, last)
+        cuts.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return cuts
+
+
+def assign_bands(values, cuts) -> list:
+    """
+    Band index of each value: 0 below the first cut, len(cuts) at or above the
+    last. A value exactly on a cut goes to the upper band.
+    """
+    cuts = sorted(cuts)
+    if np is not None:
+        return np.searchsorted(np.asarray(cuts, dtype=float), np.asarray(values, dtype=float), side="right").tolist()
+    return [bisect_right(cuts, v) for v in values]
+
+
+def band_cuts(values, bands: int, mode: str = "equal", cuts=None) -> list:
+    """Cut levels for a banding mode: "equal", "quantile" or "cuts" (explicit)."""
+    if mode == "equal":
+        return equal_width_cuts(values, bands)
+    if mode == "quantile":
+        return quantile_cuts(values, bands)
+    if mode == "cuts":
+        if cuts is None or len(cuts) != bands - 1:
+            raise ValueError(f"Explicit banding needs {bands - 1} cut levels")
+        return sorted(cuts)
+    raise ValueError(f"Unknown banding mode: {mode}")
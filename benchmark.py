@@ -0,0 +1,330 @@
+"""
+Benchmark suite for the model scripts.
+
+Generates a synthetic model (see synthetic_model.py) and times the shared
+building blocks the scripts use: traversal and indexing, copy/offset,
+Z-banding, the spatial index, export, and send/receive against in-memory and SQLite transports
+(plus the cached / delta / lazy paths). No server or real data is needed.
+
+Results can be saved as a baseline and later runs compared against it; a
+case whose median time grows by more than the threshold is flagged as a
+regression and the run exits with status 1.
+
+Usage:
+    python benchmark.py                          # medium model, print results
+    python benchmark.py --size large --repeat 3
+    python benchmark.py --save-baseline          # write benchmark_baseline.json
+    python benchmark.py --compare                # flag regressions against it
+    python benchmark.py --only send_memory receive_memory --elements 5000 --vertices 50
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from specklepy.api import operations
+from specklepy.logging import metrics
+from specklepy.transports.memory import MemoryTransport
+from specklepy.transports.sqlite import SQLiteTransport
+
+from banding import assign_bands, band_cuts, z_extents
+from cloning import clone_with_offsets, deep_copy_base_object
+from columnar import write_columnar
+from delta_send import ChangeTracker, delta_send
+from lazy_receive import LazyReceiver
+from mesh_buffers import pack_meshes
+from object_cache import ObjectCache, cached_receive
+from runner import load_script
+from spatial import SpatialIndex
+from synthetic_model import generate_model, model_size
+from transform import transform_node, translation
+from tree_index import TreeIndex
+from tree_walk import find_first, iter_elements, iter_nodes
+
+SIZES = {
+    "small": dict(depth=2, fan_out=3, elements=200, vertices=50, properties=4),
+    "medium": dict(depth=3, fan_out=3, elements=2000, vertices=100, properties=8),
+    "large": dict(depth=3, fan_out=4, elements=20000, vertices=200, properties=16),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.20
+
+# Differences below this many seconds are treated as noise
+NOISE_FLOOR = 0.002
+
+# Elements copied and moved by the copy/offset cases
+COPY_COUNT = 100
+
+# Copies made of one element by the stacking case
+STACK_COUNT = 20
+
+
+class Context:
+    """Model and scratch space shared by the benchmark cases."""
+
+    def __init__(self, config: dict, workdir: str):
+        self.config = config
+        self.workdir = workdir
+        self.root = generate_model(**config)
+        self.elements = [n for n in iter_nodes(self.root, children=iter_elements)
+                         if getattr(n, "applicationId", None)]
+        self.export = load_script("09_export_json.py")
+
+        self.memory = MemoryTransport()
+        self.object_id = operations.send(self.root, [self.memory], use_default_cache=False)
+        self.sqlite = SQLiteTransport(base_path=workdir, scope="bench_receive")
+        operations.send(self.root, [self.sqlite], use_default_cache=False)
+        self.cache = ObjectCache(base_path=workdir, scope="bench_cache")
+        operations.send(self.root, [self.cache], use_default_cache=False)
+
+
+# Each case is (setup, run): setup(ctx) prepares untimed state, run(state) is timed
+
+def _walk(ctx):
+    return ctx.root, lambda root: sum(1 for _ in iter_nodes(root))
+
+
+def _index(ctx):
+    return ctx.root, TreeIndex
+
+
+def _find(ctx):
+    target = ctx.elements[-1].applicationId
+    return ctx.root, lambda root: find_first(
+        root, lambda n: getattr(n, "applicationId", None) == target, children=iter_elements)
+
+
+def _copy_offset(ctx):
+    m = translation(z=16000.0)
+
+    def run(elements):
+        for element in elements:
+            transform_node(deep_copy_base_object(element), m)
+
+    return ctx.elements[:COPY_COUNT], run
+
+
+def _clone_offset(ctx):
+    def run(elements):
+        for element in elements:
+            clone_with_offsets(element, [(0.0, 0.0, 16000.0)])
+
+    return ctx.elements[:COPY_COUNT], run
+
+
+def _stack_copies(ctx):
+    offsets = [(0.0, 0.0, 4000.0 * n) for n in range(1, STACK_COUNT + 1)]
+    return ctx.elements[0], lambda element: clone_with_offsets(element, offsets)
+
+
+def _banding(ctx):
+    def run(elements):
+        extents = z_extents(elements)
+        assign_bands(extents.centroid, band_cuts(extents.centroid, 3))
+
+    return ctx.elements, run
+
+
+def _spatial_index(ctx):
+    return ctx.elements, SpatialIndex
+
+
+def _spatial_query(ctx):
+    index = SpatialIndex(ctx.elements)
+    lo, hi = index.bounds_of(ctx.elements[len(ctx.elements) // 2])
+
+    def run(index):
+        index.box(lo, hi)
+        index.slab(lo[2], hi[2])
+        index.nearest(lo, k=5)
+
+    return index, run
+
+
+def _export_ndjson(ctx):
+    path = os.path.join(ctx.workdir, "bench.ndjson")
+    return ctx.root, lambda root: ctx.export.write_ndjson(path, {}, ctx.export.iter_all_objects(root))
+
+
+def _export_columnar(ctx):
+    path = os.path.join(ctx.workdir, "bench.spkcol")
+    return ctx.root, lambda root: write_columnar(path, ctx.export.iter_all_objects(root))
+
+
+def _send_memory(ctx):
+    return ctx.root, lambda root: operations.send(root, [MemoryTransport()], use_default_cache=False)
+
+
+def _receive_memory(ctx):
+    return ctx.object_id, lambda obj_id: operations.receive(obj_id, local_transport=ctx.memory)
+
+
+def _send_sqlite(ctx):
+    transport = SQLiteTransport(base_path=tempfile.mkdtemp(dir=ctx.workdir), scope="bench_send")
+    return transport, lambda t: operations.send(ctx.root, [t], use_default_cache=False)
+
+
+def _receive_sqlite(ctx):
+    return ctx.object_id, lambda obj_id: operations.receive(obj_id, local_transport=ctx.sqlite)
+
+
+def _receive_cached(ctx):
+    return ctx.object_id, lambda obj_id: cached_receive(obj_id, cache=ctx.cache)
+
+
+def _receive_lazy(ctx):
+    return ctx.object_id, lambda obj_id: LazyReceiver(cache=ctx.cache).receive(obj_id)
+
+
+def _pack_meshes(ctx):
+    return cached_receive(ctx.object_id, cache=ctx.cache), pack_meshes
+
+
+def _delta_send(ctx):
+    root = cached_receive(ctx.object_id, cache=ctx.cache)
+    tracker = ChangeTracker(root)
+    root.name = f"Renamed {time.perf_counter_ns()}"
+    # Sent back to where the model came from, as the scripts do
+    return (root, tracker), lambda state: delta_send(state[0], [ctx.memory], state[1], cache=ctx.cache)
+
+
+CASES = {
+    "walk": _walk,
+    "tree_index": _index,
+    "find_first": _find,
+    "copy_offset": _copy_offset,
+    "clone_offset": _clone_offset,
+    "stack_copies": _stack_copies,
+    "banding": _banding,
+    "spatial_index": _spatial_index,
+    "spatial_query": _spatial_query,
+    "export_ndjson": _export_ndjson,
+    "export_columnar": _export_columnar,
+    "send_memory": _send_memory,
+    "receive_memory": _receive_memory,
+    "send_sqlite": _send_sqlite,
+    "receive_sqlite": _receive_sqlite,
+    "receive_cached": _receive_cached,
+    "receive_lazy": _receive_lazy,
+    "pack_meshes": _pack_meshes,
+    "delta_send": _delta_send,
+}
+
+
+def run_case(ctx: Context, name: str, repeat: int, memory: bool = False) -> dict:
+    """Time one case `repeat` times (setup excluded) and summarise."""
+    times = []
+    for _ in range(repeat):
+        state, run = CASES[name](ctx)
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    result = {"median": statistics.median(times), "min": min(times), "runs": repeat}
+    if memory:
+        state, run = CASES[name](ctx)
+        tracemalloc.start()
+        run(state)
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(config: dict, names=None, repeat: int = 5, memory: bool = False) -> dict:
+    """Run the selected cases on a model built from `config`."""
+    names = names or list(CASES)
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        ctx = Context(config, workdir)
+        setup = time.perf_counter() - start
+        results = {}
+        for name in names:
+            results[name] = run_case(ctx, name, repeat, memory)
+            print(f"  ✓ {name:16s} {_format(results[name])}")
+        ctx.cache.close()
+    return {
+        "config": config,
+        "model": model_size(ctx.root),
+        "setup_seconds": setup,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Return (name, baseline median, new median) for every regressed case."""
+    regressions = []
+    if baseline.get("config") != report["config"]:
+        print("⚠ Baseline was recorded with a different model config; comparing anyway")
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            continue
+        new_median, old_median = result["median"], old["median"]
+        if new_median > old_median * (1 + threshold) and new_median - old_median > NOISE_FLOOR:
+            regressions.append((name, old_median, new_median))
+    return regressions
+
+
+def _format(result: dict) -> str:
+    text = f"median {result['median'] * 1000:9.2f} ms   min {result['min'] * 1000:9.2f} ms"
+    if "peak_bytes" in result:
+        text += f"   peak {result['peak_bytes'] / 1e6:8.1f} MB"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model scripts on a synthetic model.")
+    parser.add_argument("--size", choices=list(SIZES), default="medium")
+    for key in ("depth", "fan_out", "elements", "vertices", "properties"):
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, help=f"override the preset {key}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="run only these cases")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--memory", action="store_true", help="also record peak Python memory per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="save this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="flag regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression (default 0.2)")
+    args = parser.parse_args()
+
+    metrics.disable()
+    config = dict(SIZES[args.size], seed=args.seed)
+    for key in ("depth", "fan_out", "elements", "vertices", "properties"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    print(f"--- Benchmark ({args.size}: {config}) ---")
+    report = run_benchmarks(config, args.only, args.repeat, args.memory)
+    print(f"✓ Model: {report['model']}, built and stored in {report['setup_seconds']:.1f} s")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Saved baseline to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"✗ No baseline at {args.baseline}; run with --save-baseline first")
+            raise SystemExit(2)
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, old, new in regressions:
+                print(f"  ✗ {name:16s} {old * 1000:9.2f} ms -> {new * 1000:9.2f} ms ({new / old - 1:+.0%})")
+            raise SystemExit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Copying of received Speckle objects.
+
+Shared by the geometry script (04) and the edit session, which both duplicate
+elements before moving them.
+
+clone() copies on write: only the Base nodes of a tree (and the lists that
+hold them) are copied, while vertex / face / color buffers, property dicts
+and other plain values are shared with the original. Moving a copy replaces
+its vertex lists rather than changing them, so the original is untouched.
+clone_with_offsets() makes N moved copies in one call, gathering the vertex
+buffers once; stacking 20 floors costs 20 vertex buffers, not 20 full trees.
+
+Usage:
+    from cloning import clone, clone_with_offsets
+    copy = clone(element)
+    floors = clone_with_offsets(floor, [(0, 0, 4000 * i) for i in range(1, 21)])
+"""
+
+import copy
+
+from specklepy.objects import Base
+
+from lazy_receive import LazyReference
+from mesh_buffers import set_buffer
+from transform import iter_meshes, transform_anchor_points, transform_meshes, translation
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path is used instead
+    np = None
+
+# Values that may hold Base objects and are looked into when cloning
+_CONTAINERS = (Base, LazyReference, list, dict)
+
+
+def clone(obj: Base) -> Base:
+    """
+    Copy a tree, sharing everything that is not a Base node.
+
+    Shared members (buffers, dicts) must be replaced on the copy, not changed
+    in place, or the change shows up in the original as well.
+    """
+    return _clone_value(obj, {})
+
+
+def _clone_value(value, memo: dict):
+    if isinstance(value, LazyReference):
+        value = value.resolve()
+    if isinstance(value, Base):
+        return _clone_base(value, memo)
+    if isinstance(value, list):
+        # Buffers of numbers are shared without looking at every item
+        if not value or not isinstance(value[0], _CONTAINERS):
+            return value
+        items = [_clone_value(item, memo) for item in value]
+        return items if any(a is not b for a, b in zip(items, value)) else value
+    if isinstance(value, dict):
+        items = {key: _clone_value(item, memo) for key, item in value.items()}
+        return items if any(items[key] is not item for key, item in value.items()) else value
+    return value
+
+
+def _clone_base(base: Base, memo: dict) -> Base:
+    new = memo.get(id(base))
+    if new is not None:
+        return new
+    new = copy.copy(base)
+    memo[id(base)] = new
+    members = new.__dict__
+    for key, member in list(members.items()):
+        cloned = _clone_value(member, memo)
+        if cloned is not member:
+            # Written to __dict__ directly, as typed members are already valid
+            members[key] = cloned
+    return new
+
+
+def clone_with_offsets(obj: Base, offsets) -> list:
+    """
+    Return one copy of `obj` per (x, y, z) offset, each moved by its offset.
+    """
+    offsets = [tuple(float(v) for v in offset) for offset in offsets]
+    copies = [clone(obj) for _ in offsets]
+    if not copies:
+        return copies
+
+    # Copies have the same shape as the original, so their meshes line up
+    sources = [mesh.vertices for mesh in iter_meshes(copies[0])]
+    lengths = [len(vertices) for vertices in sources]
+    buffer = None
+    if np is not None and sources:
+        buffer = np.concatenate([np.asarray(v, dtype=float) for v in sources]).reshape(-1, 3)
+
+    for new_obj, offset in zip(copies, offsets):
+        matrix = translation(*offset)
+        meshes = list(iter_meshes(new_obj))
+        if buffer is None:
+            transform_meshes(meshes, matrix)
+        else:
+            moved = (buffer + offset).ravel()
+            start = 0
+            for mesh, length in zip(meshes, lengths):
+                set_buffer(mesh, "vertices", moved[start:start + length])
+                start += length
+        transform_anchor_points(new_obj, matrix)
+    return copies
+
+
+def deep_copy_base_object(obj):
+    """
+    Create a deep copy of a Speckle Base object, preserving all nested structures.
+    Nothing is shared with the original; see clone() for the cheaper copy.
+    """
+    new_obj = Base()
+
+    # Copy all properties including nested ones
+    for key in obj.get_member_names():
+        value = getattr(obj, key, None)
+        if value is not None:
+            try:
+                # Deep copy to preserve nested structures
+                if isinstance(value, Base):
+                    # Recursively copy Base objects
+                    new_obj[key] = deep_copy_base_object(value)
+                else:
+                    # Lists, dicts, primitives and other types
+                    new_obj[key] = copy.deepcopy(value)
+            except Exception as e:
+                print(f"  Warning: Could not deep copy {key}: {e}")
+                try:
+                    new_obj[key] = value
+                except Exception:
+                    pass
+
+    return new_obj
@@ -0,0 +1,343 @@
+"""
+Columnar export format for model objects.
+
+Stores exported objects as typed column arrays in one binary file so that
+dashboards can filter or aggregate by a single property (e.g. Module) without
+parsing every object. Columns are read through a memory map, so only the
+pages of the columns actually used are loaded.
+
+File layout (little-endian):
+    b"SPKCOL1\\n"                    magic
+    uint64                           length of the JSON header
+    JSON header                      row count, column list, string table location, metadata
+    8-byte aligned blocks            one per column, then the string table
+
+Column kinds:
+    "float64" -- numbers, NaN for missing values
+    "int32"   -- integers (depth)
+    "string"  -- int32 codes into a shared string table, -1 for missing values
+
+The string table is dictionary-encoded once for all string columns: an int64
+offsets array followed by UTF-8 bytes.
+
+Usage:
+    from columnar import write_columnar, ColumnarTable
+    write_columnar("model_objects.spkcol", records, meta={"version_id": "..."})
+
+    table = ColumnarTable("model_objects.spkcol")
+    rows = table.where("properties.properties.Module", "02")
+    print(table.sum("properties.area", rows), table.group_count("properties.properties.Designer"))
+
+Column names are the dotted path of the value inside the record: a member
+`area` is "properties.area" and the Module key of the nested Speckle
+`properties` dict is "properties.properties.Module", so no two values can
+share a column.
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b"SPKCOL1\n"
+
+# Fixed leading columns; every flattened `properties.*` key follows them
+BASE_COLUMNS = [
+    ("id", "string"),
+    ("speckle_type", "string"),
+    ("applicationId", "string"),
+    ("name", "string"),
+    ("depth", "int32"),
+]
+
+_TYPECODES = {"float64": "d", "int32": "i", "string": "i"}
+
+
+def flatten_properties(properties: dict, prefix: str = "properties") -> dict:
+    """
+    Flatten a record's properties into dotted column names. Nested dicts keep
+    their full path, so the Module key of a nested Speckle `properties` member
+    becomes "properties.properties.Module" and never overwrites a top-level
+    member called Module.
+    """
+    flat = {}
+    stack = [(prefix, properties)]
+    while stack:
+        path, values = stack.pop()
+        for key, value in values.items():
+            name = f"{path}.{key}"
+            if isinstance(value, dict):
+                stack.append((name, value))
+            else:
+                flat[name] = value
+    return flat
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _as_string(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class _StringTable:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value) -> int:
+        if value is None:
+            return -1
+        value = sys.intern(_as_string(value))
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def write_columnar(path: str, records, meta: dict = None) -> int:
+    """
+    Write records (dicts shaped like 09's export) to a columnar file.
+    Returns the number of rows written.
+    """
+    columns = {name: [] for name, _ in BASE_COLUMNS}
+    rows = 0
+    for record in records:
+        values = {
+            "id": record.get("id"),
+            "speckle_type": record.get("speckle_type"),
+            "applicationId": record.get("applicationId"),
+            "name": record.get("name"),
+            "depth": record.get("depth", 0),
+        }
+        values.update(flatten_properties(record.get("properties") or {}))
+        for name, value in values.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * rows
+            column.append(value)
+        rows += 1
+        for column in columns.values():
+            if len(column) < rows:
+                column.append(None)
+
+    kinds = dict(BASE_COLUMNS)
+    for name, values in columns.items():
+        if name not in kinds:
+            numeric = all(v is None or _is_number(v) for v in values)
+            kinds[name] = "float64" if numeric else "string"
+
+    strings = _StringTable()
+    blocks = []
+    for name, values in columns.items():
+        kind = kinds[name]
+        if kind == "float64":
+            data = array("d", (math.nan if v is None else float(v) for v in values))
+        elif kind == "int32":
+            data = array("i", (0 if v is None else int(v) for v in values))
+        else:
+            data = array("i", (strings.encode(v) for v in values))
+        blocks.append((name, kind, data))
+
+    encoded = [s.encode("utf-8") for s in strings.values]
+    offsets = array("q", [0])
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    blob = b"".join(encoded)
+
+    # Lay out blocks relative to the end of the header, then fix up once the
+    # header size is known
+    layout, position = [], 0
+    for name, kind, data in blocks:
+        size = len(data) * data.itemsize
+        layout.append({"name": name, "kind": kind, "offset": position, "length": size})
+        position = _align(position + size)
+    string_offsets = {"offset": position, "length": len(offsets) * offsets.itemsize}
+    position = _align(position + string_offsets["length"])
+    string_blob = {"offset": position, "length": len(blob)}
+
+    header = {
+        "rows": rows,
+        "byteorder": "little",
+        "columns": layout,
+        "string_offsets": string_offsets,
+        "string_blob": string_blob,
+        "string_count": len(encoded),
+        "meta": meta or {},
+    }
+    header_bytes = json.dumps(header, default=str).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for (_, _, data), entry in zip(blocks, layout):
+            _pad_to(f, data_start + entry["offset"])
+            f.write(_little_endian(data).tobytes())
+        _pad_to(f, data_start + string_offsets["offset"])
+        f.write(_little_endian(offsets).tobytes())
+        _pad_to(f, data_start + string_blob["offset"])
+        f.write(blob)
+    return rows
+
+
+def _align(position: int, boundary: int = 8) -> int:
+    return (position + boundary - 1) // boundary * boundary
+
+
+def _pad_to(f, position: int):
+    f.write(b"\0" * (position - f.tell()))
+
+
+def _little_endian(data: array) -> array:
+    if sys.byteorder == "little":
+        return data
+    swapped = array(data.typecode, data)
+    swapped.byteswap()
+    return swapped
+
+
+class ColumnarTable:
+    """
+    Read-only, memory-mapped view of a columnar file. Column data is exposed as
+    memoryviews over the mapping; nothing is copied until it is used.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar model export")
+        (header_len,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._map[start:start + header_len])
+        if sys.byteorder != self.header["byteorder"]:
+            self.close()
+            raise ValueError("Columnar files can only be memory-mapped on little-endian machines")
+        self._data_start = _align(start + header_len)
+        self._columns = {c["name"]: c for c in self.header["columns"]}
+        self._strings = {}
+        self._string_codes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+        Unmap the file. Views returned by `column()` must be released first: an
+        mmap cannot close while they exist, so BufferError is raised and the
+        table stays open until they are gone.
+        """
+        self._strings = {}
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    @property
+    def rows(self) -> int:
+        return self.header["rows"]
+
+    @property
+    def meta(self) -> dict:
+        return self.header["meta"]
+
+    @property
+    def columns(self) -> list:
+        return list(self._columns)
+
+    def kind(self, name: str) -> str:
+        return self._columns[name]["kind"]
+
+    def _view(self, offset: int, length: int, typecode: str) -> memoryview:
+        start = self._data_start + offset
+        return memoryview(self._map)[start:start + length].cast(typecode)
+
+    def column(self, name: str) -> memoryview:
+        """Raw column data: float64 values, int32 values, or int32 string codes."""
+        entry = self._columns[name]
+        return self._view(entry["offset"], entry["length"], _TYPECODES[entry["kind"]])
+
+    def string(self, code: int):
+        """Decode one entry of the string table (-1 is a missing value)."""
+        if code < 0:
+            return None
+        value = self._strings.get(code)
+        if value is None:
+            offsets = self._view(self.header["string_offsets"]["offset"],
+                                 self.header["string_offsets"]["length"], "q")
+            blob = self.header["string_blob"]["offset"]
+            start = self._data_start + blob + offsets[code]
+            end = self._data_start + blob + offsets[code + 1]
+            value = self._strings[code] = self._map[start:end].decode("utf-8")
+        return value
+
+    def code(self, value: str) -> int:
+        """Return the string table code of a value, or -1 if it never occurs."""
+        if self._string_codes is None:
+            self._string_codes = {self.string(i): i for i in range(self.header["string_count"])}
+        return self._string_codes.get(value, -1)
+
+    def values(self, name: str) -> list:
+        """Decoded values of a column (None for missing values)."""
+        data = self.column(name)
+        kind = self.kind(name)
+        if kind == "string":
+            return [self.string(c) for c in data]
+        if kind == "float64":
+            return [None if math.isnan(v) else v for v in data]
+        return list(data)
+
+    def where(self, name: str, value, rows=None) -> list:
+        """Row indices where column `name` equals `value` (reads only that column)."""
+        data = self.column(name)
+        if self.kind(name) == "string":
+            value = self.code(value)
+            if value < 0:
+                return []
+        if rows is None:
+            return [i for i, v in enumerate(data) if v == value]
+        return [i for i in rows if data[i] == value]
+
+    def sum(self, name: str, rows=None) -> float:
+        """Sum of a numeric column over all rows or the given row indices."""
+        data = self.column(name)
+        values = data if rows is None else (data[i] for i in rows)
+        return math.fsum(v for v in values if not math.isnan(v))
+
+    def group_count(self, name: str, rows=None) -> dict:
+        """Number of rows per value of a column."""
+        data = self.column(name)
+        counts = {}
+        for v in (data if rows is None else (data[i] for i in rows)):
+            counts[v] = counts.get(v, 0) + 1
+        return self._decode_keys(name, counts)
+
+    def group_sum(self, by: str, name: str, rows=None) -> dict:
+        """Sum of numeric column `name` per value of column `by`."""
+        keys, data = self.column(by), self.column(name)
+        totals = {}
+        for i in (range(self.rows) if rows is None else rows):
+            v = data[i]
+            if not math.isnan(v):
+                totals[keys[i]] = totals.get(keys[i], 0.0) + v
+        return self._decode_keys(by, totals)
+
+    def _decode_keys(self, name: str, table: dict) -> dict:
+        if self.kind(name) == "string":
+            return {self.string(k): v for k, v in table.items()}
+        return table
@@ -0,0 +1,365 @@
+"""
+Delta send for edited Speckle models.
+
+`operations.send` re-serializes and re-hashes the whole tree even when only one
+name changed. A ChangeTracker snapshots the tree right after it is received;
+`delta_send()` then re-serializes only the nodes on a changed path up to the
+root and references every unchanged subtree by its existing id, so its
+children are never hashed or uploaded again. Objects that are re-serialized
+still go through ServerTransport, which skips anything the server already has.
+
+A reference is only valid if the target stores the subtree. After the send
+each target is asked (one /api/diff request for servers) which reused
+subtrees it is missing, e.g. when a tree received from one project is sent
+to another, and those objects are copied to it from the local cache.
+Objects that are not cached either are downloaded by the lazy receiver they
+came from, or from `source` (the transport the tree was received from).
+
+Change detection is shallow and cheap: for each node it compares primitive
+members, which Base objects / lists are attached (by identity and length) and
+the contents of plain dicts. Editing a number inside an existing list in place
+(e.g. `mesh.vertices[5] += 1`) is not detected - replace the list, as the
+transform helpers do, or call `tracker.mark_dirty(mesh)`.
+
+Usage:
+    from delta_send import ChangeTracker, delta_send
+    root = cached_receive(version.referenced_object, transport)
+    tracker = ChangeTracker(root)
+    root.name = "Renamed"
+    object_id, report = delta_send(root, [transport], tracker)
+    print(report)
+"""
+
+import json
+
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.objects import Base
+from specklepy.serialization.base_object_serializer import BaseObjectSerializer
+from specklepy.transports.abstract_transport import AbstractTransport
+
+import instrument
+from lazy_receive import LazyReceiver, LazyReference
+from mesh_buffers import is_buffer
+from object_cache import closure_ids, default_cache
+from parallel_fetch import stored_objects
+
+PRIMITIVES = (int, float, str, bool)
+
+
+def base_children(node: Base):
+    """Yield every Base object directly held by a node (members, lists, dicts)."""
+    for key, val in vars(node).items():
+        if key.startswith("_"):
+            continue
+        if isinstance(val, Base):
+            yield val
+        elif isinstance(val, (list, tuple)):
+            if val and not isinstance(val[0], PRIMITIVES):
+                for item in val:
+                    if isinstance(item, Base):
+                        yield item
+        elif isinstance(val, dict):
+            for item in val.values():
+                if isinstance(item, Base):
+                    yield item
+
+
+def _value_signature(val):
+    if val is None or isinstance(val, PRIMITIVES):
+        return val
+    if isinstance(val, Base):
+        return ("base", id(val))
+    if isinstance(val, (list, tuple)):
+        if val and not isinstance(val[0], PRIMITIVES):
+            # Lists of objects (or lazy proxies) compare by their items
+            return ("bases", id(val), tuple(id(item) for item in val))
+        # Large numeric buffers are compared by identity and length only
+        return ("list", id(val), len(val))
+    if isinstance(val, dict):
+        return ("dict", tuple((k, _value_signature(v)) for k, v in val.items()))
+    return ("value", id(val))
+
+
+def signature(node: Base) -> tuple:
+    """Shallow fingerprint of a node's own members."""
+    return tuple(
+        (key, _value_signature(val))
+        for key, val in vars(node).items()
+        if not key.startswith("_") and key != "id"
+    )
+
+
+class ChangeTracker:
+    """Remembers the state of a received tree so changed subtrees can be found."""
+
+    def __init__(self, root: Base):
+        self.root = root
+        self.reset()
+
+    def reset(self):
+        """Take a new snapshot (e.g. after a successful send)."""
+        self._snapshot = {}
+        self._marked = set()
+        self.track(self.root)
+
+    def track(self, node: Base):
+        """
+        Snapshot a subtree that was attached unchanged after the tracker was
+        created, e.g. an object loaded by a lazy receive proxy.
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if id(node) in self._snapshot:
+                continue
+            self._snapshot[id(node)] = (node, getattr(node, "id", None), signature(node))
+            stack.extend(base_children(node))
+
+    def mark_dirty(self, node: Base):
+        """Flag a node as modified when the change cannot be seen shallowly."""
+        self._marked.add(id(node))
+
+    def _node_changed(self, node: Base) -> bool:
+        entry = self._snapshot.get(id(node))
+        if entry is None or entry[0] is not node or id(node) in self._marked:
+            return True
+        _, obj_id, sig = entry
+        return not obj_id or getattr(node, "id", None) != obj_id or signature(node) != sig
+
+    def clean_nodes(self) -> set:
+        """
+        Return the identities of nodes whose whole subtree is unchanged since
+        the snapshot. One pass over the tree, children before parents.
+        """
+        dirty = set()
+        clean = set()
+        visited = set()
+        stack = [(self.root, False)]
+        while stack:
+            node, children_done = stack.pop()
+            key = id(node)
+            if children_done:
+                children = list(base_children(node))
+                if self._node_changed(node) or any(id(c) in dirty for c in children):
+                    dirty.add(key)
+                else:
+                    clean.add(key)
+                continue
+            if key in visited:
+                continue
+            visited.add(key)
+            stack.append((node, True))
+            stack.extend((child, False) for child in base_children(node))
+        return clean
+
+
+class SendReport:
+    """What a delta send actually serialized and handed to the transports."""
+
+    def __init__(self):
+        self.objects_written = 0
+        self.bytes_written = 0
+        self.subtrees_reused = 0
+        self.objects_copied = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "objects_written": self.objects_written,
+            "bytes_written": self.bytes_written,
+            "subtrees_reused": self.subtrees_reused,
+            "objects_copied": self.objects_copied,
+        }
+
+    def __str__(self) -> str:
+        text = (
+            f"{self.objects_written} objects / {self.bytes_written / 1e3:.1f} kB written, "
+            f"{self.subtrees_reused} unchanged subtrees reused"
+        )
+        if self.objects_copied:
+            text += f", {self.objects_copied} reused objects copied to targets that lacked them"
+        return text
+
+
+class CountingTransport(AbstractTransport):
+    """Pass-through transport that counts what is written to the wrapped one."""
+
+    def __init__(self, inner: AbstractTransport, report: SendReport):
+        super().__init__()
+        self.inner = inner
+        self.report = report
+
+    @property
+    def name(self):
+        return self.inner.name
+
+    def begin_write(self):
+        self.inner.begin_write()
+
+    def end_write(self):
+        self.inner.end_write()
+
+    def save_object(self, id: str, serialized_object: str):
+        self.report.objects_written += 1
+        self.report.bytes_written += len(serialized_object)
+        self.inner.save_object(id, serialized_object)
+
+    def save_object_from_transport(self, id, source_transport):
+        self.inner.save_object_from_transport(id, source_transport)
+
+    def get_object(self, id: str):
+        return self.inner.get_object(id)
+
+    def has_objects(self, id_list):
+        return self.inner.has_objects(id_list)
+
+    def copy_object_and_children(self, id, target_transport):
+        return self.inner.copy_object_and_children(id, target_transport)
+
+
+class DeltaSerializer(BaseObjectSerializer):
+    """
+    Serializer that emits a reference for detached subtrees known to be
+    unchanged instead of traversing them. Their closure is read from the
+    stored copy of the object so the parent's `__closure` stays complete.
+    Unloaded lazy receive proxies are referenced the same way.
+    """
+
+    def __init__(self, write_transports, clean: set, lookup, report: SendReport):
+        super().__init__(write_transports=write_transports)
+        self.clean = clean
+        self.lookup = lookup
+        self.report = report
+        # Ids of the referenced subtrees -> LazyReceiver for unloaded proxies
+        self.reused = {}
+
+    def _traverse_base(self, base: Base):
+        if (self.write_transports and self.detach_lineage and self.detach_lineage[-1]
+                and id(base) in self.clean):
+            stored = self.lookup(base.id)
+            if stored is not None:
+                return self._reuse(base.id, stored)
+
+        obj_id, obj = super()._traverse_base(base)
+        # Keep the in-memory id in step with what was written, so the next
+        # delta send can reuse this object
+        base.__dict__["id"] = obj_id
+        return obj_id, obj
+
+    def traverse_value(self, obj, detach: bool = False):
+        # A lazy receive proxy that was never loaded still points at its
+        # stored object: reference it without downloading the payload
+        if isinstance(obj, LazyReference):
+            if obj.loaded:
+                return super().traverse_value(obj.resolve(), detach)
+            self._merge_closure(obj.object_string())
+            self.report.subtrees_reused += 1
+            self.reused[obj.referenced_id] = obj.receiver
+            return self.detach_helper(ref_id=obj.referenced_id)
+        # Packed mesh buffers are written as the lists they replaced
+        if is_buffer(obj):
+            return obj.tolist()
+        return super().traverse_value(obj, detach)
+
+    def _reuse(self, obj_id: str, stored: str):
+        self.detach_lineage.pop()
+        self._merge_closure(stored)
+        self.report.subtrees_reused += 1
+        self.reused.setdefault(obj_id, None)
+        return obj_id, {"id": obj_id, "speckle_type": "reference"}
+
+    def _merge_closure(self, stored: str):
+        # Children of a referenced object sit below it in every open parent
+        closure = json.loads(stored).get("__closure") or {}
+        depth = len(self.detach_lineage)
+        for parent in self.lineage:
+            tree = self.family_tree.setdefault(parent, {})
+            for ref, relative in closure.items():
+                absolute = depth + relative
+                if ref not in tree or tree[ref] > absolute:
+                    tree[ref] = absolute
+
+
+def delta_send(root: Base, transports: list, tracker: ChangeTracker, cache=None, source=None):
+    """
+    Send only what changed since `tracker` was created.
+
+    Unchanged subtrees that are in the local object cache are referenced by
+    id; everything else is serialized as usual and written to the cache and
+    the given transports. Reused subtrees a transport does not have yet are
+    copied to it (see the module docstring); `source` is where objects that
+    are not cached can be downloaded from. Returns (object_id, SendReport).
+    """
+    cache = cache or default_cache()
+    report = SendReport()
+    targets = [cache] + [CountingTransport(t, report) for t in transports]
+
+    with instrument.span("send.scan"):
+        clean = tracker.clean_nodes()
+    with instrument.span("send") as s:
+        serializer = DeltaSerializer(targets, clean, cache.get_object, report)
+        obj_id, _ = serializer.traverse_base(root)
+        s.set(**report.as_dict())
+    with instrument.span("send.complete", subtrees=len(serializer.reused)) as s:
+        fetchers = [r for r in serializer.reused.values() if r is not None]
+        if source is not None:
+            fetchers.append(LazyReceiver(source, cache=cache))
+        for transport in transports:
+            report.objects_copied += _copy_missing(serializer.reused, transport, cache, fetchers)
+        s.set(objects_copied=report.objects_copied)
+
+    tracker.reset()
+    return obj_id, report
+
+
+def _copy_missing(reused: dict, transport: AbstractTransport, cache, fetchers: list) -> int:
+    """
+    Copy the reused subtrees a transport does not store from the cache to it.
+    Returns the number of objects copied.
+    """
+    roots = list(reused)
+    if not roots:
+        return 0
+    found = stored_objects(transport, roots)
+    missing_roots = [obj_id for obj_id in roots if not found[obj_id]]
+    if not missing_roots:
+        return 0
+
+    ids = set(missing_roots)
+    for obj_id in missing_roots:
+        ids.update(closure_ids(_cached(obj_id, cache, fetchers)))
+    ids = list(ids)
+    found = stored_objects(transport, ids)
+    missing = [obj_id for obj_id in ids if not found[obj_id]]
+
+    _fetch(missing, cache, fetchers)
+    transport.begin_write()
+    try:
+        for obj_id in missing:
+            transport.save_object(obj_id, cache.get_object(obj_id))
+    finally:
+        transport.end_write()
+    return len(missing)
+
+
+def _cached(obj_id: str, cache, fetchers: list) -> str:
+    _fetch([obj_id], cache, fetchers)
+    return cache.get_object(obj_id)
+
+
+def _fetch(ids: list, cache, fetchers: list):
+    """Make sure the objects are in the cache, downloading them if a fetcher can."""
+    found = cache.has_objects(ids)
+    absent = [obj_id for obj_id in ids if not found[obj_id]]
+    for fetcher in fetchers:
+        if not absent:
+            return
+        if fetcher.remote is None:
+            continue
+        fetcher.prefetch(absent)
+        found = cache.has_objects(absent)
+        absent = [obj_id for obj_id in absent if not found[obj_id]]
+    if absent:
+        raise SpeckleException(
+            f"{len(absent)} objects of unchanged subtrees are missing from the target and"
+            " from the local cache. Pass source= (the transport the tree was received from)."
+        )
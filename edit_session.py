@@ -0,0 +1,313 @@
+"""
+Edit session: one receive, many edits, one send.
+
+Renaming the root (06), renaming collections (07) and assigning properties
+(08) each receive the model, send it and create a version on their own. An
+EditSession receives a version once, applies an ordered list of edits to the
+same tree, then sends only what changed and creates a single version. Every
+step is timed.
+
+Operations (as Python calls or as JSON objects with an "op" key):
+    rename        target, name
+    set_property  target, key, value       ("properties.Module" sets a nested key)
+    offset        target, x, y, z          (moves the target in place)
+    duplicate     target, x, y, z, collection, properties
+                                           (copies the target, moves the copy and
+                                            adds it to the root in a new collection)
+    retype        target, speckle_type     (defaults to Collection)
+    instance      target, x, y, z, count, collection
+                                           (places `count` instances of one shared
+                                            definition, instance n moved n * (x, y, z))
+    expand                                 (turns all instances back into geometry)
+
+A target is "root" or an object with one of "applicationId", "id", "name",
+"type", "parent" + "name" (a named child of a named node) or "select" (a
+selector, see query.py). Name, type and selector targets may match several
+nodes; an edit that matches nothing aborts the session before anything is
+sent.
+
+Usage:
+    python edit_session.py edits.json --project 128262a20c --model 0763ad7d28
+
+    from edit_session import EditSession
+    session = EditSession(PROJECT_ID, MODEL_ID)
+    session.open()
+    session.rename("root", "Specklepy")
+    session.set_property({"name": "Layer 01"}, "properties.Module", "01")
+    session.commit("Rename root and set modules")
+    session.print_timings()
+"""
+
+import argparse
+import json
+import time
+import uuid
+from contextlib import contextmanager
+
+from specklepy.core.api.inputs.version_inputs import CreateVersionInput
+from specklepy.objects import Base
+from specklepy.transports.server import ServerTransport
+
+import instrument
+from cloning import clone_with_offsets
+from delta_send import ChangeTracker, delta_send
+from instancing import expand_instances, place_instances
+from main import get_client
+from mesh_buffers import pack_meshes
+from object_cache import cached_receive, default_cache
+from query import QueryEngine
+from transform import transform_node, translation
+from tree_index import TreeIndex
+
+COLLECTION_TYPE = "Speckle.Core.Models.Collection"
+
+
+class EditSession:
+    """A received model version plus the edits applied to it before one send."""
+
+    def __init__(self, project_id: str, model_id: str, version_id: str = None, client=None):
+        self.project_id = project_id
+        self.model_id = model_id
+        self.version_id = version_id
+        self.client = client
+        self.transport = None
+        self.root = None
+        self.index = None
+        self.query = None
+        self.tracker = None
+        self.timings = []
+
+    @contextmanager
+    def step(self, label: str):
+        """Time a block and record it under `label`."""
+        start = time.perf_counter()
+        try:
+            with instrument.span(f"edit.{label}"):
+                yield
+        finally:
+            self.timings.append((label, time.perf_counter() - start))
+
+    def open(self) -> Base:
+        """Fetch the version (latest unless one was given) and receive its tree."""
+        with self.step("authenticate"):
+            self.client = self.client or get_client()
+
+        with self.step("get version"):
+            if self.version_id:
+                version = self.client.version.get(self.version_id, self.project_id)
+            else:
+                versions = self.client.version.get_versions(self.model_id, self.project_id, limit=1)
+                if not versions.items:
+                    raise ValueError(f"No versions found in model {self.model_id}")
+                version = versions.items[0]
+            self.version_id = version.id
+
+        with self.step("receive"):
+            self.transport = ServerTransport(client=self.client, stream_id=self.project_id)
+            self.root = cached_receive(version.referenced_object, self.transport)
+            pack_meshes(self.root)
+            self.tracker = ChangeTracker(self.root)
+
+        with self.step("index"):
+            self.index = TreeIndex(self.root)
+            self.query = QueryEngine(self.index)
+        return self.root
+
+    # -- targets -----------------------------------------------------------
+
+    def resolve(self, target) -> list:
+        """Return the nodes a target refers to, in tree order."""
+        index = self.index
+        if target == "root":
+            return [self.root]
+        if not isinstance(target, dict):
+            raise ValueError(f"Unsupported target: {target!r}")
+        if "applicationId" in target:
+            node = index.by_application_id(target["applicationId"])
+            nodes = [node] if node is not None else []
+        elif "id" in target:
+            node = index.by_id(target["id"])
+            nodes = [node] if node is not None else []
+        elif "parent" in target:
+            nodes = []
+            for parent in index.by_name(target["parent"]):
+                child = index.child_by_name(parent, target["name"])
+                if child is not None:
+                    nodes.append(child)
+        elif "name" in target:
+            nodes = index.by_name(target["name"])
+        elif "type" in target:
+            nodes = index.by_type(target["type"])
+        elif "select" in target:
+            result = self.query.select(target["select"])
+            print(result.explain())
+            nodes = result.nodes
+        else:
+            raise ValueError(f"Unsupported target: {target!r}")
+        if not nodes:
+            raise ValueError(f"No node matches {target!r}")
+        return nodes
+
+    # -- operations --------------------------------------------------------
+
+    def rename(self, target, name: str) -> int:
+        nodes = self.resolve(target)
+        for node in nodes:
+            self.index.rename(node, name)
+        return len(nodes)
+
+    def set_property(self, target, key: str, value) -> int:
+        nodes = self.resolve(target)
+        for node in nodes:
+            _set_member(node, key, value)
+        return len(nodes)
+
+    def offset(self, target, x: float = 0.0, y: float = 0.0, z: float = 0.0) -> int:
+        nodes = self.resolve(target)
+        m = translation(x, y, z)
+        for node in nodes:
+            transform_node(node, m)
+        return len(nodes)
+
+    def duplicate(self, target, x: float = 0.0, y: float = 0.0, z: float = 0.0,
+                  collection: str = "new_module", properties: dict = None) -> int:
+        nodes = self.resolve(target)
+        copies = []
+        for node in nodes:
+            new_obj, = clone_with_offsets(node, [(x, y, z)])
+            new_obj.id = None
+            new_obj.applicationId = str(uuid.uuid4())
+            if properties:
+                new_obj.properties = dict(properties)
+            copies.append(new_obj)
+
+        new_collection = Base()
+        new_collection["speckle_type"] = COLLECTION_TYPE
+        new_collection.name = collection
+        new_collection.elements = copies
+
+        members = vars(self.root)
+        key = "@elements" if "@elements" in members else "elements"
+        # Replace the list rather than appending, so the change tracker sees it
+        self.root[key] = list(members.get(key) or []) + [new_collection]
+        self.index.add(new_collection, self.root)
+        return len(copies)
+
+    def retype(self, target, speckle_type: str = COLLECTION_TYPE) -> int:
+        nodes = self.resolve(target)
+        for node in nodes:
+            self.index.retype(node, speckle_type)
+        return len(nodes)
+
+    def instance(self, target, x: float = 0.0, y: float = 0.0, z: float = 0.0,
+                 count: int = 1, collection: str = "instances") -> int:
+        nodes = self.resolve(target)
+        placed = 0
+        for node in nodes:
+            matrices = [translation(x * n, y * n, z * n) for n in range(1, count + 1)]
+            placed += len(place_instances(self.root, node, matrices, collection=collection))
+        self.index.reindex()
+        return placed
+
+    def expand(self) -> int:
+        return expand_instances(self.root, self.index)
+
+    def apply(self, operations: list):
+        """Apply edits given as dicts, e.g. {"op": "rename", "target": "root", "name": "X"}."""
+        for number, operation in enumerate(operations, 1):
+            kwargs = dict(operation)
+            name = kwargs.pop("op", None)
+            method = OPERATIONS.get(name)
+            if method is None:
+                raise ValueError(f"Edit {number}: unknown operation {name!r}")
+            with self.step(f"{number}. {name}"):
+                count = method(self, **kwargs)
+                # Property and geometry edits bypass the index's own bookkeeping
+                self.query.invalidate()
+            print(f"  ✓ {number}. {name} {kwargs.get('target')!r}: {count} node(s)")
+
+    # -- commit ------------------------------------------------------------
+
+    def commit(self, message: str):
+        """Send the changed parts of the tree and create one version."""
+        with self.step("send"):
+            object_id, report = delta_send(self.root, [self.transport], self.tracker)
+        print(f"✓ Sent changes only: {report}")
+
+        with self.step("create version"):
+            version = self.client.version.create(CreateVersionInput(
+                projectId=self.project_id,
+                modelId=self.model_id,
+                objectId=object_id,
+                message=message,
+            ))
+        print(f"✓ Created version: {version.id}")
+        return version
+
+    def print_timings(self):
+        total = sum(seconds for _, seconds in self.timings)
+        print("\n--- Timings ---")
+        for label, seconds in self.timings:
+            print(f"  {label:30s} {seconds * 1000:9.1f} ms")
+        print(f"  {'total':30s} {total * 1000:9.1f} ms")
+
+
+OPERATIONS = {
+    "rename": EditSession.rename,
+    "set_property": EditSession.set_property,
+    "offset": EditSession.offset,
+    "duplicate": EditSession.duplicate,
+    "retype": EditSession.retype,
+    "instance": EditSession.instance,
+    "expand": EditSession.expand,
+}
+
+
+def _set_member(node: Base, key: str, value):
+    """Set a member, or a key inside the node's `properties` for "properties.X"."""
+    if not key.startswith("properties."):
+        node[key] = value
+        return
+    name = key[len("properties."):]
+    properties = getattr(node, "properties", None)
+    if isinstance(properties, Base):
+        properties[name] = value
+    else:
+        node.properties = {**(properties or {}), name: value}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply several edits to a model version and send them once.")
+    parser.add_argument("edits", help="JSON file with a list of edits, or {\"message\": ..., \"operations\": [...]}")
+    parser.add_argument("--project", required=True, help="project id")
+    parser.add_argument("--model", required=True, help="model id")
+    parser.add_argument("--version", help="version id to start from (defaults to the latest)")
+    parser.add_argument("--message", help="message of the new version")
+    parser.add_argument("--dry-run", action="store_true", help="apply the edits but do not send")
+    args = parser.parse_args()
+
+    with open(args.edits, encoding="utf-8") as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {"operations": spec}
+    operations = spec["operations"]
+    message = args.message or spec.get("message") or f"Applied {len(operations)} edits"
+
+    session = EditSession(args.project, args.model, args.version)
+    session.open()
+    print(f"✓ Received version {session.version_id} ({len(session.index)} nodes)")
+    print(f"✓ Object cache: {default_cache().stats}")
+
+    print(f"\n--- Applying {len(operations)} edits ---")
+    session.apply(operations)
+
+    if args.dry_run:
+        print("\n✓ Dry run: nothing sent")
+    else:
+        print("\n--- Committing to Speckle ---")
+        session.commit(message)
+    session.print_timings()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Incremental export store, keyed by object id.
+
+A full export rebuilds every record even when the new version differs by one
+renamed node. An ExportStore keeps the records of the last export in an
+append-only log, plus a manifest of the exported tree (version id and, per
+node, "objectId:depth" keys of its children). Updating the store walks the
+new version from the root and stops at every node whose key is already in
+the manifest: an object id is a hash of the whole subtree, so nothing below
+it can have changed. Only the changed nodes are downloaded and deserialized.
+Only their records are appended, together with removal entries for nodes
+that are gone.
+
+Store layout (a folder, e.g. model_objects.store/):
+    manifest.json   -- version id, header, root key, children per key, counters
+    records.ndjson  -- {"op": "add", "key": ..., "record": {...}} and
+                       {"op": "remove", "key": ...} lines, oldest first
+
+The manifest says which keys are live; the log may hold superseded lines
+until compact() rewrites it with the live records only (done automatically
+once the log is COMPACT_RATIO times larger than the live set).
+
+Usage:
+    python incremental_export.py model_objects.store --compact
+    python incremental_export.py model_objects.store --ndjson model_objects.ndjson
+
+    store = ExportStore("model_objects.store")
+    changes = store.update(receiver, version.referenced_object, header, object_to_dict)
+    for record in store.iter_records():
+        ...
+"""
+
+import argparse
+import json
+import os
+
+from specklepy.objects import Base
+
+import instrument
+from lazy_receive import LazyReference
+
+MANIFEST_FILE = "manifest.json"
+LOG_FILE = "records.ndjson"
+
+# Compact when the log holds this many times more lines than live records
+COMPACT_RATIO = 2.0
+
+# Members holding the children of a node, as walked by the export (see tree_walk.iter_elements)
+CHILD_MEMBERS = frozenset({"@elements", "elements", "collections"})
+
+
+def _key(obj_id: str, depth: int) -> str:
+    return f"{obj_id}:{depth}"
+
+
+def _children(node: Base) -> list:
+    """Element children of a node: inline Base objects or LazyReferences."""
+    members = vars(node)
+    items = list(members.get("@elements") or members.get("elements") or [])
+    items.extend(members.get("collections") or [])
+    return [item for item in items if isinstance(item, (Base, LazyReference))]
+
+
+class ExportStore:
+    """Records of the last export, updated by appending what changed."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest_path = os.path.join(path, MANIFEST_FILE)
+        self.log_path = os.path.join(path, LOG_FILE)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    @property
+    def version_id(self):
+        return self.manifest.get("version_id")
+
+    def __len__(self) -> int:
+        return len(self.manifest.get("children", {}))
+
+    def update(self, receiver, root_id: str, header: dict, to_record) -> dict:
+        """
+        Bring the store to the tree under `root_id`.
+
+        `receiver` is a LazyReceiver that leaves element children as proxies
+        (skip=CHILD_MEMBERS | HEAVY_MEMBERS), so each changed node is read
+        without its subtree; `to_record(node, depth)` builds its record.
+        Returns counts of added, removed and reused records.
+        """
+        old = self.manifest.get("children", {})
+        new = {}
+        added = {}
+        anonymous = 0
+
+        # One eviction check at the end instead of one per received node
+        with instrument.span("export.scan", root=root_id) as s, receiver.cache.hold_eviction():
+            # Items are object ids (detached nodes) or inline Base objects
+            frontier = [(root_id, _key(root_id, 0), 0)]
+            while frontier:
+                receiver.prefetch({item for item, key, _ in frontier
+                                   if isinstance(item, str) and key not in old})
+                next_frontier = []
+                for item, key, depth in frontier:
+                    if key in new:
+                        continue
+                    if key in old:
+                        # Same id: the whole subtree is unchanged
+                        _copy_subtree(key, old, new)
+                        continue
+                    node = receiver.receive(item) if isinstance(item, str) else item
+                    added[key] = to_record(node, depth)
+                    new[key] = []
+                    for child in _children(node):
+                        if isinstance(child, LazyReference):
+                            child = child.referenced_id
+                            child_id = child
+                        else:
+                            child_id = getattr(child, "id", None)
+                        if child_id is None:
+                            anonymous += 1
+                            child_id = f"~{anonymous}"
+                        child_key = _key(child_id, depth + 1)
+                        new[key].append(child_key)
+                        next_frontier.append((child, child_key, depth + 1))
+                frontier = next_frontier
+            removed = [key for key in old if key not in new]
+            s.set(added=len(added), removed=len(removed), reused=len(new) - len(added))
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            for key, record in added.items():
+                f.write(json.dumps({"op": "add", "key": key, "record": record}, default=str))
+                f.write("\n")
+            for key in removed:
+                f.write(json.dumps({"op": "remove", "key": key}))
+                f.write("\n")
+
+        self.manifest = {
+            "version_id": header.get("version_id"),
+            "header": header,
+            "root": _key(root_id, 0),
+            "children": new,
+            "log_lines": self.manifest.get("log_lines", 0) + len(added) + len(removed),
+        }
+        self._write_manifest()
+        return {"added": len(added), "removed": len(removed), "reused": len(new) - len(added)}
+
+    def _write_manifest(self):
+        temp = self.manifest_path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, default=str)
+        os.replace(temp, self.manifest_path)
+
+    def records(self) -> dict:
+        """Live records by key (the manifest decides what is live)."""
+        live = self.manifest.get("children", {})
+        found = {}
+        if not os.path.exists(self.log_path):
+            return found
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["op"] == "add" and entry["key"] in live:
+                    found[entry["key"]] = entry["record"]
+        return found
+
+    def iter_records(self):
+        """
+        Yield the live records in tree order. As in a full export, a subtree
+        referenced twice is yielded twice (object ids are hashes, so the
+        manifest has no cycles).
+        """
+        children = self.manifest.get("children", {})
+        records = self.records()
+        stack = [self.manifest["root"]] if "root" in self.manifest else []
+        while stack:
+            key = stack.pop()
+            if key in records:
+                yield records[key]
+            stack.extend(reversed(children.get(key, [])))
+
+    def needs_compaction(self) -> bool:
+        return self.manifest.get("log_lines", 0) > COMPACT_RATIO * max(len(self), 1)
+
+    def compact(self) -> int:
+        """Rewrite the log with one line per live record. Returns the line count."""
+        with instrument.span("export.compact") as s:
+            records = self.records()
+            temp = self.log_path + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                for key, record in records.items():
+                    f.write(json.dumps({"op": "add", "key": key, "record": record}, default=str))
+                    f.write("\n")
+            os.replace(temp, self.log_path)
+            self.manifest["log_lines"] = len(records)
+            self._write_manifest()
+            s.set(records=len(records))
+        return len(records)
+
+    def write_ndjson(self, output_file: str) -> int:
+        """Write the store as an ndjson export: a header line, then one line per object."""
+        count = 0
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"header": self.manifest.get("header", {})}, default=str))
+            f.write("\n")
+            for record in self.iter_records():
+                f.write(json.dumps(record, default=str))
+                f.write("\n")
+                count += 1
+        return count
+
+
+def _copy_subtree(key: str, old: dict, new: dict):
+    stack = [key]
+    while stack:
+        key = stack.pop()
+        if key in new or key not in old:
+            continue
+        new[key] = old[key]
+        stack.extend(old[key])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain an incremental export store.")
+    parser.add_argument("store", help="store folder, e.g. model_objects.store")
+    parser.add_argument("--compact", action="store_true", help="rewrite the log with the live records only")
+    parser.add_argument("--ndjson", help="write the store as an ndjson export to this file")
+    args = parser.parse_args()
+
+    store = ExportStore(args.store)
+    if not store.manifest:
+        print(f"✗ No export store at {args.store}")
+        raise SystemExit(1)
+    print(f"✓ Store at version {store.version_id}: {len(store)} records, "
+          f"{store.manifest.get('log_lines', 0)} log lines")
+    if args.compact:
+        print(f"✓ Compacted to {store.compact()} lines")
+    if args.ndjson:
+        print(f"✓ Wrote {store.write_ndjson(args.ndjson)} objects to {args.ndjson}")
+
+
+if __name__ == "__main__":
+    main()
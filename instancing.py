@@ -0,0 +1,224 @@
+"""
+Instance-based duplication for Speckle models.
+
+Duplicating an object as geometry uploads its meshes again for every copy.
+Placing instances instead stores the object once as a definition and adds
+one small InstanceProxy per copy carrying a 4x4 transform, the way Speckle
+connectors write blocks and families:
+
+    root.instanceDefinitionProxies  -- InstanceDefinitionProxy per definition,
+                                       listing the applicationIds of its objects
+    "definitionGeometry" collection -- the definition's objects
+    InstanceProxy                   -- definitionId + row-major transform
+
+Each definition records the applicationId (or id) of the object it was made
+from in `sourceObject`, and placing instances of that object again reuses it.
+
+The payload of N copies is one definition plus N proxies of a few hundred
+bytes. expand_instances() turns proxies back into real (moved) geometry for
+consumers that do not understand instances.
+
+Usage:
+    from instancing import expand_instances, place_instances
+    from transform import translation
+    place_instances(root, floor, [translation(z=4000 * n) for n in range(1, 21)])
+    expand_instances(root)    # optional: back to plain geometry
+"""
+
+import uuid
+
+from specklepy.objects import Base
+from specklepy.objects.proxies import InstanceDefinitionProxy, InstanceProxy
+
+from cloning import clone
+from transform import compose, from_flat, iter_meshes, to_flat, transform_node
+from tree_index import TreeIndex
+
+COLLECTION_TYPE = "Speckle.Core.Models.Collection"
+DEFINITIONS_MEMBER = "instanceDefinitionProxies"
+DEFINITION_COLLECTION = "definitionGeometry"
+SOURCE_MEMBER = "sourceObject"
+
+
+def _collection(name: str) -> Base:
+    collection = Base()
+    # Base ignores `speckle_type` assignment, so write the member directly
+    collection["speckle_type"] = COLLECTION_TYPE
+    collection.name = name
+    collection.elements = []
+    return collection
+
+
+def _elements_key(node: Base) -> str:
+    return "@elements" if "@elements" in vars(node) else "elements"
+
+
+def _append_child(parent: Base, child: Base):
+    # Replace the list rather than appending, so the change tracker sees it
+    key = _elements_key(parent)
+    parent[key] = list(vars(parent).get(key) or []) + [child]
+
+
+def _units(obj: Base) -> str:
+    units = getattr(obj, "units", None)
+    if units:
+        return units
+    for mesh in iter_meshes(obj):
+        if getattr(mesh, "units", None):
+            return mesh.units
+    return "m"
+
+
+def definitions(root: Base) -> list:
+    """The instance definitions stored on the root."""
+    return list(vars(root).get(DEFINITIONS_MEMBER) or [])
+
+
+def source_key(obj: Base):
+    """The key a definition is reused by: the object's applicationId, else its id."""
+    return getattr(obj, "applicationId", None) or getattr(obj, "id", None)
+
+
+def definition_for(root: Base, obj: Base):
+    """Return the definition made from `obj` (see add_definition), or None."""
+    key = source_key(obj)
+    if key is None:
+        return None
+    for definition in definitions(root):
+        if getattr(definition, SOURCE_MEMBER, None) == key:
+            return definition
+    return None
+
+
+def find_definition(root: Base, name: str):
+    """Return the definition with this name (or applicationId), or None."""
+    for definition in definitions(root):
+        if name in (getattr(definition, "name", None), definition.applicationId):
+            return definition
+    return None
+
+
+def add_definition(root: Base, obj: Base, name: str) -> InstanceDefinitionProxy:
+    """
+    Store a copy of `obj` as the geometry of a new definition.
+
+    The copy shares its buffers with `obj` (see cloning.clone), so its meshes
+    hash to the same ids and are not stored twice.
+    """
+    geometry = clone(obj)
+    geometry.id = None
+    geometry.applicationId = str(uuid.uuid4())
+
+    members = vars(root)
+    holder = next((c for c in members.get(_elements_key(root)) or []
+                   if getattr(c, "name", None) == DEFINITION_COLLECTION), None)
+    if holder is None:
+        holder = _collection(DEFINITION_COLLECTION)
+        _append_child(root, holder)
+    _append_child(holder, geometry)
+
+    definition = InstanceDefinitionProxy(
+        objects=[geometry.applicationId],
+        maxDepth=0,
+        name=name,
+        applicationId=str(uuid.uuid4()),
+    )
+    definition[SOURCE_MEMBER] = source_key(obj)
+    root[DEFINITIONS_MEMBER] = definitions(root) + [definition]
+    return definition
+
+
+def place_instances(root: Base, obj: Base, matrices, name: str = None,
+                    collection: str = "instances") -> list:
+    """
+    Place one instance of `obj` per 4x4 matrix in a new collection on the root.
+
+    A definition made from the same object (same applicationId or id) is
+    reused if the root already has one, so repeated runs add instances without
+    re-uploading the geometry. `name` (default: the object's name) only labels
+    a new definition. Returns the new InstanceProxy objects.
+    """
+    name = name or getattr(obj, "name", None) or obj.applicationId or "definition"
+    definition = definition_for(root, obj) or add_definition(root, obj, name)
+    units = _units(obj)
+
+    instances = [
+        InstanceProxy(
+            definitionId=definition.applicationId,
+            transform=to_flat(matrix),
+            maxDepth=0,
+            units=units,
+            applicationId=str(uuid.uuid4()),
+        )
+        for matrix in matrices
+    ]
+
+    holder = _collection(collection)
+    holder.elements = instances
+    _append_child(root, holder)
+    return instances
+
+
+def expand_instances(root: Base, index: TreeIndex = None, drop_definitions: bool = True) -> int:
+    """
+    Replace every InstanceProxy in the tree by moved copies of its definition's
+    objects (nested instances included). With `drop_definitions`, the
+    definitions and the definition geometry collection are removed afterwards.
+    Returns the number of instances expanded.
+    """
+    index = index or TreeIndex(root)
+    by_definition = {d.applicationId: d for d in definitions(root)}
+    proxies = [n for n in index if isinstance(n, InstanceProxy)]
+    # Instances inside definition geometry are expanded with their outer instance
+    placed = [p for p in proxies if not _in_definition(p, index)]
+
+    for proxy in placed:
+        copies = _expand(proxy, None, by_definition, index)
+        _replace_child(index.parent(proxy), proxy, copies)
+
+    if drop_definitions and by_definition:
+        vars(root).pop(DEFINITIONS_MEMBER, None)
+        key = _elements_key(root)
+        root[key] = [c for c in vars(root).get(key) or []
+                     if getattr(c, "name", None) != DEFINITION_COLLECTION]
+    index.reindex()
+    return len(placed)
+
+
+def _in_definition(node: Base, index: TreeIndex) -> bool:
+    return any(getattr(a, "name", None) == DEFINITION_COLLECTION for a in index.ancestors(node))
+
+
+def _expand(proxy: InstanceProxy, outer, by_definition: dict, index: TreeIndex) -> list:
+    definition = by_definition.get(proxy.definitionId)
+    if definition is None:
+        raise ValueError(f"Instance {proxy.applicationId} refers to a missing definition {proxy.definitionId}")
+    matrix = from_flat(proxy.transform)
+    if outer is not None:
+        matrix = compose(matrix, outer)
+
+    copies = []
+    for app_id in definition.objects:
+        source = index.by_application_id(app_id)
+        if source is None:
+            raise ValueError(f"Definition {definition.name!r} refers to a missing object {app_id}")
+        if isinstance(source, InstanceProxy):
+            copies.extend(_expand(source, matrix, by_definition, index))
+            continue
+        new_obj = clone(source)
+        new_obj.id = None
+        new_obj.applicationId = str(uuid.uuid4())
+        transform_node(new_obj, matrix)
+        copies.append(new_obj)
+    return copies
+
+
+def _replace_child(parent: Base, old: Base, new: list):
+    """Put `new` in place of `old` in whichever list member of `parent` holds it."""
+    for key, value in list(vars(parent).items()):
+        if isinstance(value, list) and any(item is old for item in value):
+            items = []
+            for item in value:
+                items.extend(new if item is old else [item])
+            parent[key] = items
+            return
@@ -0,0 +1,212 @@
+"""
+Per-phase timing instrumentation.
+
+Wraps the phases of a run -- authentication, GraphQL calls such as
+version.get_versions / version.create, receive, indexing, send -- in timed
+spans that also carry counts (objects, bytes, cache hits). Results can be
+written as a JSON summary per phase and as a Chrome trace that opens in
+chrome://tracing or https://ui.perfetto.dev.
+
+One switch turns it on: set SPECKLE_TRACE=1 (environment or .env), or call
+enable(). When it is off, span() returns a shared no-op object, so the
+instrumented code pays one flag check per span. With SPECKLE_TRACE set, the
+summary and trace are written to SPECKLE_TRACE_DIR (default: the current
+folder) when the process exits.
+
+Usage:
+    from instrument import span
+    with span("receive", object_id=obj_id) as s:
+        data = cached_receive(obj_id, transport)
+        s.set(objects=count)
+
+    SPECKLE_TRACE=1 python 09_export_json.py
+    # -> speckle_summary.json, speckle_trace.json
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_records = []
+_lock = threading.Lock()
+_epoch = time.perf_counter_ns()
+
+
+def configure():
+    """Turn instrumentation on if SPECKLE_TRACE is set (e.g. after .env was loaded)."""
+    global _enabled
+    if os.environ.get("SPECKLE_TRACE", "").lower() not in ("", "0", "false", "no"):
+        _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    """Forget all recorded spans."""
+    with _lock:
+        _records.clear()
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, **counts):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Span:
+    """One timed phase. Attributes set on it end up in the summary and trace."""
+
+    __slots__ = ("name", "attrs", "start", "end", "thread")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.start = self.end = 0
+        self.thread = 0
+
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        with _lock:
+            _records.append(self)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+    @property
+    def seconds(self) -> float:
+        return (self.end - self.start) / 1e9
+
+
+def span(name: str, **attrs):
+    """Time a block as phase `name`; a no-op unless instrumentation is on."""
+    if not _enabled:
+        return _NO_SPAN
+    return Span(name, attrs)
+
+
+def traced(name: str):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def trace_methods(obj, prefix: str, names):
+    """Wrap methods of an object (e.g. a client resource) in spans named prefix.method."""
+    for method_name in names:
+        method = getattr(obj, method_name, None)
+        if method is not None:
+            setattr(obj, method_name, traced(f"{prefix}.{method_name}")(method))
+    return obj
+
+
+def spans() -> list:
+    with _lock:
+        return list(_records)
+
+
+def summary() -> dict:
+    """Per phase: call count, total / mean / max seconds and summed numeric attributes."""
+    phases = {}
+    for s in spans():
+        phase = phases.setdefault(s.name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        phase["count"] += 1
+        phase["total_s"] += s.seconds
+        phase["max_s"] = max(phase["max_s"], s.seconds)
+        for key, value in s.attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                phase[key] = phase.get(key, 0) + value
+    for phase in phases.values():
+        phase["mean_s"] = phase["total_s"] / phase["count"]
+    return dict(sorted(phases.items(), key=lambda item: -item[1]["total_s"]))
+
+
+def write_summary(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary(), f, indent=2, default=str)
+
+
+def write_chrome_trace(path: str):
+    """Write the spans in Chrome trace event format (complete "X" events)."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": s.name,
+            "ph": "X",
+            "ts": (s.start - _epoch) / 1000,
+            "dur": (s.end - s.start) / 1000,
+            "pid": pid,
+            "tid": s.thread,
+            "args": s.attrs,
+        }
+        for s in spans()
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+def print_summary():
+    print("\n--- Phases ---")
+    for name, phase in summary().items():
+        print(f"  {name:28s} {phase['count']:5d}x {phase['total_s'] * 1000:10.1f} ms")
+
+
+def _write_on_exit():
+    if not _enabled or not _records:
+        return
+    folder = os.environ.get("SPECKLE_TRACE_DIR", ".")
+    os.makedirs(folder, exist_ok=True)
+    write_summary(os.path.join(folder, "speckle_summary.json"))
+    write_chrome_trace(os.path.join(folder, "speckle_trace.json"))
+    print_summary()
+
+
+configure()
+atexit.register(_write_on_exit)
@@ -0,0 +1,328 @@
+"""
+Lazy / partial receive for Speckle.
+
+A full receive downloads and deserializes every displayValue mesh, even for
+scripts that only rename collections or look up one object. A LazyReceiver
+downloads the structural tree and leaves the detached children of heavy
+members (displayValue, mesh buffers, ...) on the server. In their place it
+puts lightweight proxies:
+
+    LazyReference -- stands in for one detached object; reading an attribute
+                     downloads it (with its children) and swaps the real
+                     object into the tree
+    LazyList      -- stands in for a chunked list such as `vertices`; reading
+                     it downloads the chunks
+
+The tree can be sent with delta_send: proxies that were never loaded are
+written as references to their existing objects, so renaming collections on
+a heavy model never downloads geometry.
+
+Usage:
+    from lazy_receive import LazyReceiver
+    receiver = LazyReceiver(transport)
+    root = receiver.receive(version.referenced_object)
+    tracker = ChangeTracker(root)
+    receiver.on_load(tracker.track)    # keep delta sends incremental
+"""
+
+import copy
+import json
+
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.objects import Base
+from specklepy.serialization.base_object_serializer import BaseObjectSerializer
+
+import instrument
+from object_cache import closure_ids, default_cache
+from parallel_fetch import fetch_objects, supports_parallel
+
+# Members whose detached children are not downloaded up front
+HEAVY_MEMBERS = frozenset({
+    "displayValue", "@displayValue",
+    "vertices", "faces", "colors", "textureCoordinates", "vertexNormals",
+})
+
+
+class LazyReference:
+    """A detached object that is downloaded the first time it is used."""
+
+    __slots__ = ("referenced_id", "_receiver", "_owner", "_key", "_target")
+
+    def __init__(self, referenced_id: str, receiver, owner, key):
+        object.__setattr__(self, "referenced_id", referenced_id)
+        object.__setattr__(self, "_receiver", receiver)
+        object.__setattr__(self, "_owner", owner)
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_target", None)
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    @property
+    def receiver(self):
+        """The LazyReceiver that downloads this object."""
+        return self._receiver
+
+    def resolve(self) -> Base:
+        """Download the object if needed and put it in place of the proxy."""
+        if self._target is None:
+            target = self._receiver.load(self.referenced_id)
+            object.__setattr__(self, "_target", target)
+            owner, key = self._owner, self._key
+            if isinstance(owner, list):
+                if key < len(owner) and owner[key] is self:
+                    owner[key] = target
+            elif owner.__dict__.get(key) is self:
+                owner.__dict__[key] = target
+            self._receiver._loaded(target)
+        return self._target
+
+    def object_string(self) -> str:
+        """The stored object (without its children), e.g. to read its closure."""
+        return self._receiver.object_string(self.referenced_id)
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.resolve(), name, value)
+
+    def __getitem__(self, name):
+        return self.resolve()[name]
+
+    def __setitem__(self, name, value):
+        self.resolve()[name] = value
+
+    def __copy__(self):
+        return copy.copy(self.resolve())
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.resolve(), memo)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"LazyReference({self.referenced_id}, {state})"
+
+
+class LazyList:
+    """A chunked list (e.g. mesh vertices) that is downloaded on first use."""
+
+    __slots__ = ("chunk_ids", "_receiver", "_data")
+
+    def __init__(self, chunk_ids: list, receiver):
+        self.chunk_ids = chunk_ids
+        self._receiver = receiver
+        self._data = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def resolve(self) -> list:
+        if self._data is None:
+            self._data = self._receiver.load_chunks(self.chunk_ids)
+        return self._data
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __iter__(self):
+        return iter(self.resolve())
+
+    def __getitem__(self, index):
+        return self.resolve()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        import numpy as np
+        return np.asarray(self.resolve(), dtype=dtype)
+
+    def __eq__(self, other):
+        return self.resolve() == other
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.resolve(), memo)
+
+    def __repr__(self) -> str:
+        state = f"{len(self._data)} values" if self.loaded else "not loaded"
+        return f"LazyList({len(self.chunk_ids)} chunks, {state})"
+
+
+def _is_reference(value) -> bool:
+    return isinstance(value, dict) and value.get("speckle_type") == "reference"
+
+
+def _has_references(value) -> bool:
+    if _is_reference(value):
+        return True
+    return isinstance(value, list) and any(_is_reference(item) for item in value)
+
+
+def _structural_references(obj, skip) -> list:
+    """Ids referenced by an object dict, ignoring members in `skip`."""
+    found = []
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, dict):
+            if _is_reference(value):
+                found.append(value["referencedId"])
+                continue
+            is_base = "speckle_type" in value
+            for key, item in value.items():
+                if key == "__closure" or (is_base and key in skip):
+                    continue
+                if isinstance(item, (list, dict)):
+                    stack.append(item)
+    return found
+
+
+class _LazySerializer(BaseObjectSerializer):
+    """Deserializer that puts proxies in the heavy members instead of reading them."""
+
+    def __init__(self, receiver):
+        super().__init__(read_transport=receiver.cache)
+        self.receiver = receiver
+
+    def recompose_base(self, obj: dict) -> Base:
+        if isinstance(obj, str):
+            obj = json.loads(obj)
+        if not obj:
+            return obj
+        if _is_reference(obj):
+            obj = self.get_child(obj=obj)
+        if "id" in obj and obj["id"] in self.deserialized:
+            return self.deserialized[obj["id"]]
+
+        deferred = {}
+        if obj.get("speckle_type"):
+            for key in self.receiver.skip:
+                if key in obj and _has_references(obj[key]):
+                    deferred[key] = obj.pop(key)
+
+        base = super().recompose_base(obj)
+        for key, value in deferred.items():
+            # Written to __dict__ directly: typed members would reject a proxy
+            base.__dict__[key] = self._proxy(base, key, value)
+        return base
+
+    def _proxy(self, base: Base, key: str, value):
+        if _is_reference(value):
+            return LazyReference(value["referencedId"], self.receiver, base, key)
+        if key in getattr(base, "_chunkable", {}) and all(_is_reference(v) for v in value):
+            return LazyList([v["referencedId"] for v in value], self.receiver)
+        items = []
+        for i, item in enumerate(value):
+            if _is_reference(item):
+                items.append(LazyReference(item["referencedId"], self.receiver, items, i))
+            else:
+                items.append(self.handle_value(item))
+        return items
+
+
+class LazyReceiver:
+    """Receives a tree without the heavy members and downloads them on demand."""
+
+    def __init__(self, remote_transport=None, cache=None, skip=HEAVY_MEMBERS,
+                 workers: int = None, chunk_size: int = None):
+        self.remote = remote_transport
+        self.cache = cache or default_cache()
+        self.skip = frozenset(skip)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.objects_downloaded = 0
+        self.proxies_loaded = 0
+        self._listeners = []
+
+    def on_load(self, callback):
+        """Call `callback(node)` whenever a proxy is replaced by its object."""
+        self._listeners.append(callback)
+
+    def _loaded(self, node: Base):
+        self.proxies_loaded += 1
+        for callback in self._listeners:
+            callback(node)
+
+    def _fetch(self, ids: list):
+        """Make sure the given objects are in the cache."""
+        if not ids:
+            return
+        found = self.cache.has_objects(ids)
+        missing = [i for i in ids if not found[i]]
+        if not missing:
+            return
+        if self.remote is None:
+            raise SpeckleException(f"{len(missing)} objects are not cached and no remote transport was given.")
+        self.cache.begin_write()
+        try:
+            if supports_parallel(self.remote):
+                fetch_objects(self.remote, missing, self.cache, self.workers, self.chunk_size)
+            else:
+                for obj_id in missing:
+                    self.cache.save_object(obj_id, self.remote.get_object(obj_id))
+        finally:
+            self.cache.end_write()
+        self.objects_downloaded += len(missing)
+
+    def prefetch(self, ids) -> None:
+        """Download the given objects (without their children) in one batch."""
+        with self.cache.hold_eviction():
+            self._fetch(list(ids))
+
+    def object_string(self, obj_id: str) -> str:
+        """One stored object, downloaded without its children if needed."""
+        obj_string = self.cache.get_object(obj_id)
+        if obj_string is None:
+            self._fetch([obj_id])
+            obj_string = self.cache.get_object(obj_id)
+        if obj_string is None:
+            raise SpeckleException(f"Object {obj_id} was not found")
+        return obj_string
+
+    def receive(self, obj_id: str) -> Base:
+        """Download and rebuild the tree, leaving heavy members as proxies."""
+        with instrument.span("receive.lazy", object_id=obj_id) as s, self.cache.hold_eviction():
+            root_string = self.object_string(obj_id)
+            # One batched download per tree level
+            frontier = [root_string]
+            seen = {obj_id}
+            while frontier:
+                ids = []
+                for obj_string in frontier:
+                    for ref in _structural_references(json.loads(obj_string), self.skip):
+                        if ref not in seen:
+                            seen.add(ref)
+                            ids.append(ref)
+                self._fetch(ids)
+                frontier = [self.cache.get_object(i) for i in ids]
+                frontier = [s for s in frontier if s is not None]
+            self.cache.touch(list(seen))
+            s.set(objects=len(seen))
+
+        with instrument.span("receive.deserialize", object_id=obj_id):
+            return _LazySerializer(self).read_json(obj_string=root_string)
+
+    def load(self, obj_id: str) -> Base:
+        """Download an object with all its children and deserialize it fully."""
+        with instrument.span("lazy.load", object_id=obj_id), self.cache.hold_eviction():
+            obj_string = self.object_string(obj_id)
+            children = closure_ids(obj_string)
+            self._fetch(children)
+            self.cache.touch(children)
+        return BaseObjectSerializer(read_transport=self.cache).read_json(obj_string=obj_string)
+
+    def load_chunks(self, chunk_ids: list) -> list:
+        """Download data chunks and return their values as one flat list."""
+        with self.cache.hold_eviction():
+            self._fetch(chunk_ids)
+        data = []
+        for chunk_id in chunk_ids:
+            data.extend(json.loads(self.cache.get_object(chunk_id))["data"])
+        return data
+
+
+def lazy_receive(obj_id: str, remote_transport=None, cache=None, skip=HEAVY_MEMBERS) -> Base:
+    """Receive a tree without its heavy members (see LazyReceiver)."""
+    return LazyReceiver(remote_transport, cache, skip).receive(obj_id)
@@ -2,42 +2,157 @@
 Authentication module for Speckle.
 This module provides a reusable get_client() function for all other scripts.
 
+Clients are kept in a process-wide registry keyed by (server, token): the
+first call for a key authenticates, every later call returns the same client
+without another handshake. GraphQL requests of a registered client share one
+pooled HTTP session instead of opening a new connection per query. The
+registry is thread-safe; drop entries with invalidate_client() or
+clear_clients() (e.g. after a token was revoked).
+
 Usage:
     from main import get_client
     client = get_client()
 """
 
 import os
+import threading
+
 from dotenv import load_dotenv
+from gql.transport.requests import RequestsHTTPTransport
 from specklepy.api.client import SpeckleClient
 
+import instrument
+
+DEFAULT_SERVER = "app.speckle.systems"
+
+
+class _PooledHTTPTransport(RequestsHTTPTransport):
+    """
+    GraphQL transport that keeps its requests.Session (and its connection
+    pool) open between queries. gql connects and closes the transport around
+    every query, so both become no-ops once the session exists. Threads
+    sharing a client share the session.
+    """
+
+    _connect_lock = threading.Lock()
+
+    def connect(self):
+        with self._connect_lock:
+            if self.session is None:
+                super().connect()
+
+    def close(self):
+        pass
+
+    def shutdown(self):
+        """Really close the pooled session."""
+        super().close()
+
+
+class _PooledSpeckleClient(SpeckleClient):
+    """SpeckleClient whose GraphQL client reuses one HTTP session."""
+
+    def _set_up_client(self) -> None:
+        super()._set_up_client()
+        t = self.httpclient.transport
+        self.httpclient.transport = _PooledHTTPTransport(
+            url=t.url, headers=t.headers, verify=t.verify, retries=t.retries,
+            timeout=t.default_timeout,
+        )
+
+    def _init_resources(self) -> None:
+        super()._init_resources()
+        instrument.trace_methods(self.version, "version", ("get", "get_versions", "create"))
+        instrument.trace_methods(self.model, "model", ("get", "get_models"))
+
+    def close(self):
+        transport = self.httpclient.transport
+        if isinstance(transport, _PooledHTTPTransport):
+            transport.shutdown()
+
 
-def get_client() -> SpeckleClient:
+class _Entry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client = None
+
+
+_clients = {}
+_registry_lock = threading.Lock()
+_env_loaded = False
+
+
+def _load_env():
+    """Load the local .env file once per process."""
+    global _env_loaded
+    with _registry_lock:
+        if not _env_loaded:
+            load_dotenv()
+            instrument.configure()
+            _env_loaded = True
+
+
+def _resolve(server: str = None, token: str = None) -> tuple:
+    _load_env()
+    token = token or os.environ.get("SPECKLE_TOKEN")
+    server = server or os.environ.get("SPECKLE_SERVER", DEFAULT_SERVER)
+    if not token:
+        raise ValueError("Set SPECKLE_TOKEN in your .env file and re-run.")
+    return server, token
+
+
+def get_client(server: str = None, token: str = None) -> SpeckleClient:
     """
     Authenticate and return a SpeckleClient instance.
-    
+
     Requires SPECKLE_TOKEN in environment or .env file.
     Optionally set SPECKLE_SERVER (defaults to app.speckle.systems).
+    Both can be passed explicitly instead. The client is authenticated on the
+    first call for a (server, token) pair and reused afterwards.
     """
-    # Load environment variables from a local .env file, if present
-    load_dotenv()
+    key = _resolve(server, token)
 
-    # Get token and server host from environment
-    token = os.environ.get("SPECKLE_TOKEN")
-    server_host = os.environ.get("SPECKLE_SERVER", "app.speckle.systems")
+    with _registry_lock:
+        entry = _clients.setdefault(key, _Entry())
 
-    if not token:
-        raise ValueError("Set SPECKLE_TOKEN in your .env file and re-run.")
+    # Authenticate outside the registry lock, so other servers / tokens are
+    # not blocked; callers waiting for the same key share the one handshake
+    with instrument.span("get_client") as s, entry.lock:
+        if entry.client is None:
+            s.set(authenticated=1)
+            client = _PooledSpeckleClient(host=key[0])
+            client.authenticate_with_token(key[1])
+            entry.client = client
+        return entry.client
+
+
+def invalidate_client(server: str = None, token: str = None) -> bool:
+    """
+    Drop the cached client for a (server, token) pair and close its session.
+    The next get_client() call authenticates again. Returns True if a client
+    was cached.
+    """
+    key = _resolve(server, token)
+    with _registry_lock:
+        entry = _clients.pop(key, None)
+    if entry is None or entry.client is None:
+        return False
+    entry.client.close()
+    return True
 
-    # Authenticate
-    client = SpeckleClient(host=server_host)
-    client.authenticate_with_token(token)
 
-    return client
+def clear_clients():
+    """Drop every cached client and close their sessions."""
+    with _registry_lock:
+        entries = list(_clients.values())
+        _clients.clear()
+    for entry in entries:
+        if entry.client is not None:
+            entry.client.close()
 
 
 if __name__ == "__main__":
     # Test authentication when running this script directly
     client = get_client()
     user = client.active_user.get()
-    print(f"✓ Logged in as {user.name} on {client.url}")
\ No newline at end of file
+    print(f"✓ Logged in as {user.name} on {client.url}")
@@ -0,0 +1,164 @@
+"""
+Compact buffers for mesh vertices and faces.
+
+A received mesh holds `vertices` / `faces` as Python lists: a pointer plus a
+float or int object per number, 24-32 bytes each. pack_meshes() swaps those
+lists for typed `array.array` buffers (8 bytes per vertex coordinate, 4 per
+face index) for as long as a script works on the model. Code that reads
+`mesh.vertices` still gets a sequence that supports len(), indexing, slicing
+and iteration, and NumPy can view it without copying (see as_array()), so
+geometry operations run vectorized on the buffer itself.
+
+Only the chunkable members of Mesh objects (`Mesh._chunkable`) are packed.
+Buffers become lists again when the model is written, on every path: the
+serializer iterates chunkable members into chunks the same way it does
+lists, and elsewhere (e.g. `operations.serialize()` without transports) it
+asks unknown values for `.dict()`, which a Buffer answers with its list.
+Object ids are therefore unchanged. A list holding mixed ints and floats is
+left as a list, since packing it would turn its ints into floats and change
+the id of the mesh.
+
+Usage:
+    from mesh_buffers import pack_meshes, unpack_meshes, as_array
+    stats = pack_meshes(root)
+    points = as_array(mesh.vertices).reshape(-1, 3)
+    receiver.on_load(pack_meshes)      # pack geometry loaded by a lazy receive
+    unpack_meshes(root)                # plain lists again, e.g. for other libraries
+"""
+
+import sys
+from array import array
+
+from specklepy.objects import Base
+from specklepy.objects.geometry import Mesh
+
+from tree_walk import iter_nodes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path is used instead
+    np = None
+
+# Mesh members held as buffers, with their array type code
+BUFFER_TYPES = {
+    "vertices": "d",
+    "faces": "i",
+    "colors": "i",
+    "textureCoordinates": "d",
+    "vertexNormals": "d",
+}
+
+# Python type each array type code holds
+_ITEM_TYPES = {"d": float, "i": int}
+
+
+class Buffer(array):
+    """A packed mesh member: an array.array that serializes as a list."""
+
+    __slots__ = ()
+
+    def dict(self) -> list:
+        # BaseObjectSerializer.traverse_value calls .dict() on values it does
+        # not know, instead of writing them as str()
+        return self.tolist()
+
+
+def is_buffer(value) -> bool:
+    """True for a packed buffer (array.array or NumPy array) rather than a list."""
+    return isinstance(value, array) or (np is not None and isinstance(value, np.ndarray))
+
+
+def to_list(value):
+    """A plain list for a buffer; any other value is returned as is."""
+    return value.tolist() if is_buffer(value) else value
+
+
+def as_array(values, dtype=float):
+    """
+    A NumPy view of a buffer (no copy) or a new array for a list.
+    Requires NumPy.
+    """
+    return np.asarray(values, dtype=dtype)
+
+
+def pack(values, typecode: str):
+    """
+    `values` as an array of `typecode`, or unchanged if they are not all of
+    the matching Python type (or do not fit the type).
+    """
+    if not isinstance(values, list) or not values:
+        return values
+    if set(map(type, values)) != {_ITEM_TYPES[typecode]}:
+        return values
+    try:
+        return Buffer(typecode, values)
+    except OverflowError:
+        return values
+
+
+def set_buffer(mesh: Base, name: str, values):
+    """
+    Replace a mesh buffer (e.g. with moved vertices). A packed member stays
+    packed; a list member gets a list, as before.
+    """
+    current = mesh.__dict__.get(name)
+    if isinstance(current, array):
+        if np is not None and isinstance(values, np.ndarray):
+            packed = Buffer(current.typecode, values.astype(current.typecode, copy=False).tobytes())
+        else:
+            packed = Buffer(current.typecode, values)
+        # Written to __dict__ directly: typed members only accept lists
+        mesh.__dict__[name] = packed
+    else:
+        setattr(mesh, name, to_list(values))
+
+
+def _mesh_candidates(root: Base):
+    """Every loaded Mesh under root, including displayValue meshes."""
+    seen = set()
+    for node in iter_nodes(root, key=id):
+        candidates = [node]
+        # vars() and not getattr(): unloaded lazy proxies are skipped, not downloaded
+        display_value = vars(node).get("displayValue") or vars(node).get("@displayValue")
+        if display_value:
+            candidates.extend(display_value if isinstance(display_value, list) else [display_value])
+        for mesh in candidates:
+            if isinstance(mesh, Mesh) and id(mesh) not in seen:
+                seen.add(id(mesh))
+                yield mesh
+
+
+def pack_meshes(root: Base) -> dict:
+    """
+    Pack the chunkable buffers of every Mesh under root. Returns the number
+    of buffers packed, the values they hold and their size in bytes.
+    """
+    stats = {"buffers": 0, "values": 0, "bytes": 0}
+    for mesh in _mesh_candidates(root):
+        members = mesh.__dict__
+        for name, typecode in BUFFER_TYPES.items():
+            values = members.get(name)
+            if name not in mesh._chunkable:
+                continue
+            if not isinstance(values, list):
+                continue
+            packed = pack(values, typecode)
+            if packed is values:
+                continue
+            members[name] = packed
+            stats["buffers"] += 1
+            stats["values"] += len(packed)
+            stats["bytes"] += sys.getsizeof(packed)
+    return stats
+
+
+def unpack_meshes(root: Base) -> int:
+    """Turn the packed buffers under root back into lists. Returns the count."""
+    count = 0
+    for mesh in _mesh_candidates(root):
+        for name in BUFFER_TYPES:
+            values = mesh.__dict__.get(name)
+            if is_buffer(values):
+                mesh.__dict__[name] = values.tolist()
+                count += 1
+    return count
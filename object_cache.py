@@ -0,0 +1,384 @@
+"""
+Persistent local object cache for Speckle.
+
+A read-through, content-addressed cache that sits in front of ServerTransport.
+Object ids are hashes of their content, so a cached object never needs to be
+revalidated: if a version's root object and its whole closure are cached,
+receiving it again makes no requests to the server's object endpoints.
+
+The cache is a SQLite database with a size bound; when it grows past the
+limit the least recently used objects are evicted. Hit/miss statistics are
+kept on `cache.stats`.
+
+Configuration (environment or .env):
+    SPECKLE_CACHE_DIR  -- folder for the cache database
+                          (defaults to the Speckle application data folder)
+    SPECKLE_CACHE_MB   -- size limit in megabytes (defaults to 2048)
+    SPECKLE_RECEIVE_WORKERS / SPECKLE_RECEIVE_CHUNK
+                       -- parallel download settings (see parallel_fetch)
+
+Usage:
+    from object_cache import cached_receive, default_cache
+    data = cached_receive(version.referenced_object, transport)
+    print(default_cache().stats)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.serialization.base_object_serializer import BaseObjectSerializer
+from specklepy.transports.abstract_transport import AbstractTransport
+from specklepy.transports.sqlite import SQLiteTransport
+
+import instrument
+from parallel_fetch import parallel_copy, receive_workers, supports_parallel
+
+DEFAULT_MAX_SIZE_MB = 2048
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 900
+
+
+class CacheStats:
+    """Counters for one ObjectCache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.objects_written = 0
+        self.bytes_written = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "bytes_read": self.bytes_read,
+            "objects_written": self.objects_written,
+            "bytes_written": self.bytes_written,
+            "evictions": self.evictions,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.hit_rate:.0%} hit rate), "
+            f"{self.objects_written} objects / {self.bytes_written / 1e6:.1f} MB written, "
+            f"{self.evictions} evicted"
+        )
+
+
+class ObjectCache(AbstractTransport):
+    """
+    SQLite-backed transport with LRU eviction, used as the local side of a
+    receive. Safe to share between threads.
+    """
+
+    def __init__(self, base_path: str = None, max_size_mb: float = None,
+                 scope: str = "ObjectCache", name: str = "ObjectCache"):
+        super().__init__()
+        self._name = name
+        if base_path is None:
+            base_path = os.environ.get("SPECKLE_CACHE_DIR") or SQLiteTransport.get_base_path("Speckle")
+        if max_size_mb is None:
+            max_size_mb = float(os.environ.get("SPECKLE_CACHE_MB", DEFAULT_MAX_SIZE_MB))
+        self.max_size = int(max_size_mb * 1000 * 1000)
+        self.path = os.path.join(base_path, f"{scope}.db")
+        self.stats = CacheStats()
+
+        self._lock = threading.RLock()
+        self._batch = []
+        self._touched = set()
+        self._holds = 0
+
+        try:
+            os.makedirs(base_path, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._initialise()
+        except Exception as ex:
+            raise SpeckleException(
+                f"ObjectCache could not open {self.path}. Set SPECKLE_CACHE_DIR to a"
+                " writable folder."
+            ) from ex
+
+    def __repr__(self) -> str:
+        return f"ObjectCache(path: '{self.path}', max: {self.max_size / 1e6:.0f} MB)"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def _initialise(self):
+        with closing(self._connection.cursor()) as c:
+            c.execute(
+                """CREATE TABLE IF NOT EXISTS objects(
+                      hash TEXT PRIMARY KEY,
+                      content TEXT,
+                      size INTEGER,
+                      last_access INTEGER
+                    ) WITHOUT ROWID;"""
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS objects_lru ON objects(last_access);")
+            c.execute("PRAGMA journal_mode='wal';")
+            c.execute("PRAGMA synchronous=NORMAL;")
+            c.execute("PRAGMA temp_store=MEMORY;")
+        self._connection.commit()
+
+    # -- reads -------------------------------------------------------------
+
+    def get_object(self, id: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content FROM objects WHERE hash = ? LIMIT 1", (id,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self.stats.bytes_read += len(row[0])
+            self._touched.add(id)
+            if len(self._touched) >= 10000:
+                self.flush_access()
+            return row[0]
+
+    def has_objects(self, id_list):
+        found = set()
+        with self._lock:
+            for i in range(0, len(id_list), _SQL_BATCH):
+                chunk = id_list[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT hash FROM objects WHERE hash IN ({marks})", chunk
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return {id: id in found for id in id_list}
+
+    def has_all(self, id_list) -> bool:
+        return all(self.has_objects(id_list).values())
+
+    def touch(self, id_list):
+        """Mark objects as just used so eviction keeps them."""
+        with self._lock:
+            self._touched.update(id_list)
+            self.flush_access()
+
+    def flush_access(self):
+        """Persist the last-access time of objects read since the last flush."""
+        with self._lock:
+            if not self._touched:
+                return
+            now = time.time_ns()
+            self._connection.executemany(
+                "UPDATE objects SET last_access = ? WHERE hash = ?",
+                [(now, id) for id in self._touched],
+            )
+            self._connection.commit()
+            self._touched.clear()
+
+    # -- writes ------------------------------------------------------------
+
+    def begin_write(self):
+        pass
+
+    def save_object(self, id: str, serialized_object: str):
+        with self._lock:
+            self._batch.append((id, serialized_object, len(serialized_object), time.time_ns()))
+            self.stats.objects_written += 1
+            self.stats.bytes_written += len(serialized_object)
+            if len(self._batch) >= 5000:
+                self._save_batch()
+
+    def save_object_from_transport(self, id: str, source_transport: AbstractTransport):
+        self.save_object(id, source_transport.get_object(id))
+
+    def end_write(self):
+        with self._lock:
+            self._save_batch()
+            self.flush_access()
+            if not self._holds:
+                self.evict()
+
+    @contextmanager
+    def hold_eviction(self):
+        """
+        Postpone eviction while a receive is in progress. On exit, anything
+        read, written or touched inside the block is kept and older objects are
+        evicted if the cache is over its limit.
+        """
+        started = time.time_ns()
+        with self._lock:
+            self._holds += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._holds -= 1
+                self._save_batch()
+                self.flush_access()
+                if not self._holds:
+                    self.evict(protect_since=started)
+
+    def _save_batch(self):
+        if not self._batch:
+            return
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO objects(hash, content, size, last_access) VALUES(?,?,?,?)",
+            self._batch,
+        )
+        self._connection.commit()
+        self._batch = []
+
+    def copy_object_and_children(self, id: str, target_transport: AbstractTransport) -> str:
+        """
+        Copy an object and every object in its closure into `target_transport`,
+        skipping children the target already has. Returns the root's JSON.
+        """
+        obj_string = self.get_object(id)
+        if obj_string is None:
+            raise SpeckleException(f"Object {id} is not in the cache ({self.path}).")
+
+        children = closure_ids(obj_string)
+        found = target_transport.has_objects(children)
+        wanted = [child for child in children if not found[child]]
+
+        target_transport.begin_write()
+        copied = 0
+        for i in range(0, len(wanted), _SQL_BATCH):
+            chunk = wanted[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT hash, content FROM objects WHERE hash IN ({marks})", chunk
+                ).fetchall()
+                self.stats.hits += len(rows)
+                self.stats.misses += len(chunk) - len(rows)
+                self._touched.update(hash for hash, _ in rows)
+            for hash, content in rows:
+                self.stats.bytes_read += len(content)
+                target_transport.save_object(hash, content)
+            copied += len(rows)
+        if copied != len(wanted):
+            target_transport.end_write()
+            raise SpeckleException(
+                f"Object {id} is only partly cached: {len(wanted) - copied} of its"
+                f" children are missing from {self.path}."
+            )
+        target_transport.save_object(id, obj_string)
+        target_transport.end_write()
+        self.flush_access()
+        return obj_string
+
+    # -- eviction ----------------------------------------------------------
+
+    def size(self) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()
+            return row[0]
+
+    def evict(self, protect_since: int = None) -> int:
+        """
+        Delete least recently used objects until the cache fits its size limit.
+        Objects written or read after `protect_since` are kept, so a receive in
+        progress never loses its own children.
+        """
+        with self._lock:
+            excess = self.size() - self.max_size
+            if excess <= 0:
+                return 0
+            cutoff = protect_since if protect_since is not None else time.time_ns()
+            victims = []
+            rows = self._connection.execute(
+                "SELECT hash, size FROM objects WHERE last_access < ? ORDER BY last_access",
+                (cutoff,),
+            )
+            for hash, size in rows:
+                if excess <= 0:
+                    break
+                victims.append((hash,))
+                excess -= size
+            self._connection.executemany("DELETE FROM objects WHERE hash = ?", victims)
+            self._connection.commit()
+            self.stats.evictions += len(victims)
+            return len(victims)
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM objects")
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self.flush_access()
+                self._connection.close()
+                self._connection = None
+
+
+def closure_ids(obj_string: str) -> list:
+    """Return the ids of all children listed in a serialized object's `__closure`."""
+    return list(json.loads(obj_string).get("__closure") or {})
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> ObjectCache:
+    """Return the process-wide cache, creating it on first use."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ObjectCache()
+        return _default_cache
+
+
+def cached_receive(obj_id: str, remote_transport: AbstractTransport = None,
+                   cache: ObjectCache = None, workers: int = None, chunk_size: int = None):
+    """
+    Receive an object through the local cache.
+
+    If the root object and every object in its closure are already cached,
+    the object is rebuilt locally without contacting the server. Otherwise
+    only the missing objects are downloaded into the cache first, over
+    `workers` concurrent connections for ServerTransports (see parallel_fetch).
+    """
+    cache = cache or default_cache()
+    serializer = BaseObjectSerializer(read_transport=cache)
+    hits, misses = cache.stats.hits, cache.stats.misses
+
+    with instrument.span("receive.fetch", object_id=obj_id) as s, cache.hold_eviction():
+        obj_string = cache.get_object(obj_id)
+        if obj_string is None or not cache.has_all(closure_ids(obj_string)):
+            if remote_transport is None:
+                raise SpeckleException(
+                    f"Object {obj_id} is not fully cached and no remote transport was given."
+                )
+            # Both paths ask the cache which children it already has and only
+            # download the rest
+            if supports_parallel(remote_transport) and receive_workers(workers) > 1:
+                obj_string = parallel_copy(remote_transport, obj_id, cache, workers, chunk_size)
+            else:
+                obj_string = remote_transport.copy_object_and_children(id=obj_id, target_transport=cache)
+        # Children that were already cached must survive the eviction at the
+        # end of this block
+        children = closure_ids(obj_string)
+        cache.touch(children)
+        s.set(objects=len(children) + 1)
+
+    with instrument.span("receive.deserialize", object_id=obj_id) as s:
+        try:
+            return serializer.read_json(obj_string=obj_string)
+        finally:
+            cache.flush_access()
+            s.set(cache_hits=cache.stats.hits - hits, cache_misses=cache.stats.misses - misses)
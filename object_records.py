@@ -0,0 +1,174 @@
+"""
+Compact records of exported object metadata.
+
+The export used to build one dict per node plus a nested `properties` dict
+repeating its id, name, speckle_type and applicationId. An ObjectRecord keeps
+those fields once, in slots, and holds the remaining members as two tuples:
+the member names, shared by every record with the same layout, and the
+values. Member names and short string values (types, units, categories such
+as Module = "02") are interned, so each distinct string is stored once per
+process rather than once per object. Buffers stay as they are on the node
+and become lists only when the record is written.
+
+Records read like the export dicts (`record["name"]`, `record.get("properties")`),
+so the columnar writer and other dict consumers take them unchanged.
+`to_dict()` gives the exported shape; pass `default=json_default` to
+json.dumps to write records directly.
+
+Usage:
+    from object_records import ObjectRecord, json_default
+    record = ObjectRecord.from_node(node, depth)
+    record.get_property("Module")
+    json.dumps(record, default=json_default)
+"""
+
+import sys
+
+from specklepy.objects import Base
+from specklepy.objects.base import REMOVE_FROM_DIR
+
+from lazy_receive import LazyList, LazyReference
+from mesh_buffers import is_buffer, to_list
+
+# Fields stored on the record itself and not repeated among its properties
+RECORD_FIELDS = ("id", "speckle_type", "applicationId", "name")
+
+# String values up to this length are interned; longer ones are rarely repeated
+INTERN_MAX_LENGTH = 64
+
+# Member-name tuples by layout, shared by all records with that layout
+_layouts = {}
+
+# Non-method class attributes (typed members, properties) by class
+_class_members = {}
+
+
+def _layout(keys: tuple) -> tuple:
+    layout = _layouts.get(keys)
+    if layout is None:
+        layout = _layouts[keys] = tuple(sys.intern(key) for key in keys)
+    return layout
+
+
+def member_names(node: Base) -> list:
+    """
+    The member names of a node, as Base.get_member_names() returns them, in a
+    stable order (instance members first). The class part is looked up once
+    per class instead of calling dir() on every node.
+    """
+    cls = type(node)
+    inherited = _class_members.get(cls)
+    if inherited is None:
+        inherited = _class_members[cls] = [
+            name for name in dir(cls)
+            if not name.startswith("_") and name not in REMOVE_FROM_DIR
+            and not callable(getattr(cls, name, None))
+        ]
+    names = [name for name in node.__dict__ if not name.startswith("_")]
+    known = set(names)
+    names.extend(name for name in inherited if name not in known)
+    return names
+
+
+def _intern(value):
+    if type(value) is str and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _exported(value) -> bool:
+    """Whether a member value is a plain property (not a child object or an empty list)."""
+    if value is None or isinstance(value, (Base, LazyReference)):
+        return False
+    if isinstance(value, list):
+        return bool(value) and not isinstance(value[0], (Base, LazyReference))
+    if is_buffer(value):
+        return len(value) > 0
+    return True
+
+
+class ObjectRecord:
+    """One exported object: its identifying fields and its plain properties."""
+
+    __slots__ = ("id", "speckle_type", "applicationId", "name", "depth", "_keys", "_values")
+
+    def __init__(self, id=None, speckle_type=None, applicationId=None, name=None, depth: int = 0,
+                 properties: dict = None):
+        self.id = id
+        self.speckle_type = _intern(speckle_type)
+        self.applicationId = applicationId
+        self.name = _intern(name)
+        self.depth = depth
+        properties = properties or {}
+        self._keys = _layout(tuple(properties))
+        self._values = tuple(_intern(value) for value in properties.values())
+
+    @classmethod
+    def from_node(cls, node: Base, depth: int) -> "ObjectRecord":
+        """The record of a node with its plain (non-Base) members as properties."""
+        keys, values = [], []
+        for key in member_names(node):
+            if key in RECORD_FIELDS:
+                continue
+            value = getattr(node, key, None)
+            if callable(value):
+                continue
+            if isinstance(value, LazyList):
+                # Chunked buffers left on the server by a lazy receive
+                value = value.resolve()
+            if _exported(value):
+                keys.append(key)
+                values.append(_intern(value))
+
+        record = cls.__new__(cls)
+        record.id = getattr(node, "id", None)
+        record.speckle_type = _intern(getattr(node, "speckle_type", None))
+        record.applicationId = getattr(node, "applicationId", None)
+        record.name = _intern(getattr(node, "name", None))
+        record.depth = depth
+        record._keys = _layout(tuple(keys))
+        record._values = tuple(values)
+        return record
+
+    @property
+    def properties(self) -> dict:
+        return {key: to_list(value) for key, value in zip(self._keys, self._values)}
+
+    def get_property(self, key: str, default=None):
+        for name, value in zip(self._keys, self._values):
+            if name == key:
+                return value
+        return default
+
+    def get(self, key: str, default=None):
+        if key in self.__slots__ and not key.startswith("_"):
+            return getattr(self, key)
+        if key == "properties":
+            return self.properties
+        return default
+
+    def __getitem__(self, key: str):
+        if key in self.__slots__ and not key.startswith("_") or key == "properties":
+            return self.get(key)
+        raise KeyError(key)
+
+    def to_dict(self) -> dict:
+        """The exported shape: id, speckle_type, applicationId, name, depth, properties."""
+        return {
+            "id": self.id,
+            "speckle_type": self.speckle_type,
+            "applicationId": self.applicationId,
+            "name": self.name,
+            "depth": self.depth,
+            "properties": self.properties,
+        }
+
+    def __repr__(self) -> str:
+        return f"ObjectRecord({self.id}, {self.speckle_type}, {self.name!r}, {len(self._keys)} properties)"
+
+
+def json_default(value):
+    """`default=` for json.dump: records as their dicts, anything else as a string."""
+    if isinstance(value, ObjectRecord):
+        return value.to_dict()
+    return str(value)
@@ -0,0 +1,245 @@
+"""
+Parallel chunked object download.
+
+ServerTransport.copy_object_and_children downloads a version's missing
+children in one streamed request, so a large receive is limited by a single
+connection. `parallel_copy()` splits the missing ids into chunks and fetches
+them from /api/getobjects over several connections at once. Downloaded
+objects go through a bounded queue to a single writer that saves them into
+the target transport, so a slow target throttles the downloads instead of
+letting memory grow.
+
+Configuration (environment or .env):
+    SPECKLE_RECEIVE_WORKERS  -- concurrent connections (defaults to 4, 1 disables)
+    SPECKLE_RECEIVE_CHUNK    -- object ids per request (defaults to 2000)
+
+Usage:
+    from parallel_fetch import parallel_copy, fetch_objects
+    root_string = parallel_copy(server_transport, object_id, cache, workers=8)
+    fetch_objects(server_transport, ids, cache)   # just these objects
+    stored_objects(server_transport, ids)         # which ids the server has
+
+cached_receive() in object_cache uses this automatically for ServerTransports.
+"""
+
+import json
+import os
+import queue
+import threading
+
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.transports.abstract_transport import AbstractTransport
+from specklepy.transports.server.retry_policy import setup_session
+
+import instrument
+
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_SIZE = 2000
+
+# Object ids per /api/diff request
+_DIFF_BATCH = 1000
+
+# Objects handed to the writer at a time, and batches allowed in flight per worker
+_WRITE_BATCH = 500
+_PENDING_PER_WORKER = 4
+
+_DONE = object()
+
+
+def receive_workers(workers: int = None) -> int:
+    if workers is None:
+        workers = int(os.environ.get("SPECKLE_RECEIVE_WORKERS", DEFAULT_WORKERS))
+    return max(1, workers)
+
+
+def receive_chunk_size(chunk_size: int = None) -> int:
+    if chunk_size is None:
+        chunk_size = int(os.environ.get("SPECKLE_RECEIVE_CHUNK", DEFAULT_CHUNK_SIZE))
+    return max(1, chunk_size)
+
+
+def supports_parallel(transport) -> bool:
+    """True for transports that talk to a server's REST endpoints (ServerTransport)."""
+    return all(hasattr(transport, attr) for attr in ("session", "url", "stream_id"))
+
+
+def stored_objects(transport, id_list: list) -> dict:
+    """
+    Which of the ids a transport already stores, as {id: bool}.
+    ServerTransport.has_objects answers False for every id, so servers are
+    asked through /api/diff instead.
+    """
+    if not supports_parallel(transport):
+        return transport.has_objects(id_list)
+    found = {}
+    for i in range(0, len(id_list), _DIFF_BATCH):
+        batch = id_list[i:i + _DIFF_BATCH]
+        r = transport.session.post(
+            f"{transport.url}/api/diff/{transport.stream_id}",
+            data={"objects": json.dumps(batch)},
+        )
+        if r.status_code != 200:
+            raise SpeckleException(
+                f"Can't check objects on {transport.stream_id}: HTTP error"
+                f" {r.status_code} ({r.text[:1000]})"
+            )
+        found.update(r.json())
+    return {obj_id: bool(found.get(obj_id)) for obj_id in id_list}
+
+
+def _get_root(source, obj_id: str) -> str:
+    r = source.session.get(f"{source.url}/objects/{source.stream_id}/{obj_id}/single")
+    r.encoding = "utf-8"
+    if r.status_code != 200:
+        raise SpeckleException(
+            f"Can't get object {source.stream_id}/{obj_id}: HTTP error"
+            f" {r.status_code} ({r.text[:1000]})"
+        )
+    return r.text
+
+
+def parallel_copy(source, obj_id: str, target: AbstractTransport, workers: int = None,
+                  chunk_size: int = None) -> str:
+    """
+    Copy an object and the children `target` does not have yet from a
+    ServerTransport, using several concurrent requests. Returns the root
+    object's serialized string, like copy_object_and_children.
+    """
+    root_string = _get_root(source, obj_id)
+    children = list(json.loads(root_string).get("__closure") or {})
+    found = target.has_objects(children) if children else {}
+    missing = [child for child in children if not found.get(child)]
+
+    target.begin_write()
+    try:
+        fetch_objects(source, missing, target, workers, chunk_size)
+    except Exception:
+        target.end_write()
+        raise
+    # The root goes in last, once its whole closure is stored
+    target.save_object(obj_id, root_string)
+    target.end_write()
+    return root_string
+
+
+def fetch_objects(source, ids: list, target: AbstractTransport, workers: int = None,
+                  chunk_size: int = None) -> int:
+    """
+    Download the given objects (not their children) from a ServerTransport
+    into `target` over concurrent chunked requests. Returns the number of
+    objects saved. The caller handles begin_write / end_write.
+    """
+    workers = receive_workers(workers)
+    chunk_size = receive_chunk_size(chunk_size)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    if not chunks:
+        return 0
+
+    token = source.account.token if getattr(source, "account", None) is not None else None
+    endpoint = f"{source.url}/api/getobjects/{source.stream_id}"
+    workers = min(workers, len(chunks))
+
+    todo = queue.Queue()
+    for chunk in chunks:
+        todo.put(chunk)
+    # Bounded: workers block here when the writer falls behind
+    results = queue.Queue(maxsize=max(1, workers * _PENDING_PER_WORKER))
+    stop = threading.Event()
+    errors = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def download():
+        session = setup_session(token)
+        try:
+            while not stop.is_set():
+                try:
+                    chunk = todo.get_nowait()
+                except queue.Empty:
+                    break
+                r = session.post(endpoint, data={"objects": json.dumps(chunk)}, stream=True)
+                r.encoding = "utf-8"
+                if r.status_code != 200:
+                    raise SpeckleException(
+                        f"Can't get objects from {source.stream_id}: HTTP error {r.status_code}"
+                    )
+                batch = []
+                for line in r.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    batch.append(line.split("\t", 1))
+                    if len(batch) >= _WRITE_BATCH:
+                        if not put(batch):
+                            return
+                        batch = []
+                if batch and not put(batch):
+                    return
+        except Exception as ex:
+            errors.append(ex)
+            stop.set()
+        finally:
+            session.close()
+            # Wake the writer; if the queue is full it notices the thread has ended
+            try:
+                results.put_nowait(_DONE)
+            except queue.Full:
+                pass
+
+    threads = [threading.Thread(target=download, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    def pending():
+        """Yield queued batches until every worker is done, then what is left."""
+        finished = 0
+        while finished < workers:
+            try:
+                item = results.get(timeout=0.1)
+            except queue.Empty:
+                if not any(thread.is_alive() for thread in threads):
+                    break
+                continue
+            if item is _DONE:
+                finished += 1
+            else:
+                yield item
+        while True:
+            try:
+                item = results.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _DONE:
+                yield item
+
+    saved = downloaded = 0
+    with instrument.span("download", chunks=len(chunks), workers=workers) as s:
+        try:
+            for item in pending():
+                if errors:
+                    continue
+                for hash, obj in item:
+                    target.save_object(hash, obj)
+                    downloaded += len(obj)
+                saved += len(item)
+        finally:
+            # Stop the workers if the writer failed, and free any blocked put()
+            stop.set()
+            for thread in threads:
+                while thread.is_alive():
+                    try:
+                        results.get_nowait()
+                    except queue.Empty:
+                        pass
+                    thread.join(timeout=0.1)
+        s.set(objects=saved, bytes=downloaded)
+
+    if errors:
+        raise SpeckleException(f"Parallel download from {source.stream_id} failed") from errors[0]
+    return saved
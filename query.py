@@ -0,0 +1,566 @@
+"""
+Selector queries over an indexed model tree.
+
+A small selector language, compiled once into predicates and answered from
+the lookup tables of a TreeIndex plus secondary indexes (per property value,
+sorted numeric values, depth) that are built the first time a query needs
+them. Scripts ask questions instead of hand-writing tree walks.
+
+Selector syntax (CSS-like):
+    Collection                         speckle_type (full, or its last part)
+    *                                  any node
+    [name == "Layer 01"]               comparison: == != < <= > >= ~= (contains) ^= (prefix)
+    [properties.Module == "02"]        dotted paths look into members, dicts and Base objects
+    [area in 1000..5000]               numeric range (inclusive)
+    [properties.Module >= 2]           < <= > >= and `in` take numbers and match
+                                       numbers and numeric strings ("02")
+    [depth <= 2]                       depth in the tree (the root is 0)
+    [@displayValue]                    the member is set
+    [displayValue | basePoint]         any of the conditions holds
+    :not(Collection)  :root  :leaf     pseudo-classes
+    A > B                              B is a child of A
+    A B                                B is a descendant of A
+    A, B                               nodes matching either selector
+
+Every query returns its plan (which index produced the candidates and what
+was filtered afterwards) and its timing.
+
+Secondary indexes reflect the tree when they were built. Renames and retypes
+through TreeIndex stay in sync; after other edits call invalidate().
+
+Usage:
+    from query import QueryEngine
+    engine = QueryEngine(TreeIndex(root))
+    result = engine.select('Collection[name == "Layer 01"] > [name == "Layer"]')
+    print(result.plan, result.seconds)
+    modules = engine.select('[properties.Module == "02"][area >= 1e6]').nodes
+"""
+
+import bisect
+import json
+import re
+import time
+
+from specklepy.objects import Base
+
+import instrument
+from tree_index import TreeIndex
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<range>\.\.)
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?(?![\w@]|\.(?!\.)))
+  | (?P<op>==|!=|<=|>=|~=|\^=|<|>)
+  | (?P<punct>[\[\]():,|*])
+  | (?P<ident>[@\w][\w.@-]*)
+""", re.VERBOSE)
+
+_COMPARISONS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+_SPECIAL_FIELDS = ("name", "applicationId", "id", "speckle_type", "depth")
+
+
+class QueryError(ValueError):
+    """A selector that cannot be parsed."""
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+class Condition:
+    """One `[field op value]` test."""
+
+    def __init__(self, field: str, op: str = None, value=None, upper=None):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.upper = upper
+
+    def __repr__(self) -> str:
+        if self.op is None:
+            return self.field
+        if self.op == "in":
+            return f"{self.field} in {self.value}..{self.upper}"
+        return f"{self.field} {self.op} {self.value!r}"
+
+
+class Compound:
+    """A type, conditions and pseudo-classes that one node must all match."""
+
+    def __init__(self):
+        self.type = None
+        self.conditions = []    # AND of single conditions
+        self.any_of = []        # AND of OR-groups (lists of conditions)
+        self.negated = []       # compounds the node must not match
+        self.root = False
+        self.leaf = False
+
+    def __repr__(self) -> str:
+        parts = [self.type or "*"]
+        parts += [f"[{c!r}]" for c in self.conditions]
+        parts += ["[" + " | ".join(repr(c) for c in group) + "]" for group in self.any_of]
+        parts += [f":not({n!r})" for n in self.negated]
+        parts += [":root"] * self.root + [":leaf"] * self.leaf
+        return "".join(parts)
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = []
+        position = 0
+        space = False
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None:
+                raise QueryError(f"Unexpected {text[position]!r} at {position} in {text!r}")
+            position = match.end()
+            if match.lastgroup == "space":
+                space = True
+                continue
+            self.tokens.append((match.lastgroup, match.group(), space))
+            space = False
+        self.position = 0
+
+    def peek(self, offset: int = 0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None, False)
+
+    def take(self, kind: str = None, value: str = None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            expected = value or kind
+            raise QueryError(f"Expected {expected} but found {token[1]!r} in {self.text!r}")
+        self.position += 1
+        return token
+
+    def parse(self) -> list:
+        selectors = self.selector_list()
+        if self.peek()[0] is not None:
+            raise QueryError(f"Unexpected {self.peek()[1]!r} in {self.text!r}")
+        return selectors
+
+    def selector_list(self) -> list:
+        selectors = [self.selector()]
+        while self.peek()[1] == ",":
+            self.take()
+            selectors.append(self.selector())
+        return selectors
+
+    def selector(self) -> list:
+        """A chain [(combinator, compound), ...]; the first combinator is None."""
+        chain = [(None, self.compound())]
+        while True:
+            kind, value, space = self.peek()
+            if value == ">" and kind == "op":
+                self.take()
+                chain.append((">", self.compound()))
+            elif space and kind is not None and value not in (",", ")"):
+                chain.append((" ", self.compound()))
+            else:
+                return chain
+
+    def compound(self) -> Compound:
+        compound = Compound()
+        start = self.position
+        kind, value, _ = self.peek()
+        if value == "*":
+            self.take()
+        elif kind == "ident":
+            compound.type = self.take()[1]
+        elif value not in ("[", ":"):
+            raise QueryError(f"Expected a selector but found {value!r} in {self.text!r}")
+        while True:
+            kind, value, space = self.peek()
+            if space and self.position > start:
+                return compound
+            if value == "[":
+                self.take()
+                group = [self.condition()]
+                while self.peek()[1] == "|":
+                    self.take()
+                    group.append(self.condition())
+                self.take(value="]")
+                if len(group) == 1:
+                    compound.conditions.append(group[0])
+                else:
+                    compound.any_of.append(group)
+            elif value == ":":
+                self.take()
+                name = self.take("ident")[1]
+                if name == "not":
+                    self.take(value="(")
+                    compound.negated.append(self.compound())
+                    self.take(value=")")
+                elif name in ("root", "leaf"):
+                    setattr(compound, name, True)
+                else:
+                    raise QueryError(f"Unknown pseudo-class :{name} in {self.text!r}")
+            else:
+                return compound
+
+    def condition(self) -> Condition:
+        field = self.take("ident")[1]
+        kind, value, _ = self.peek()
+        if kind == "op":
+            op = self.take()[1]
+            operand = self.value()
+            if op in ("<", "<=", ">", ">=") and (isinstance(operand, (bool, str)) or _number(operand) is None):
+                raise QueryError(f"{field} {op} needs a number, not {operand!r}, in {self.text!r}")
+            return Condition(field, op, operand)
+        if kind == "ident" and value == "in":
+            self.take()
+            lower = float(self.take("number")[1])
+            self.take("range")
+            upper = float(self.take("number")[1])
+            return Condition(field, "in", lower, upper)
+        return Condition(field)
+
+    def value(self):
+        kind, value, _ = self.take()
+        if kind == "string":
+            return json.loads(value) if value.startswith('"') else value[1:-1]
+        if kind == "number":
+            return float(value) if any(c in value for c in ".eE") else int(value)
+        if kind == "ident":
+            return {"true": True, "false": False, "null": None}.get(value, value)
+        raise QueryError(f"Expected a value but found {value!r} in {self.text!r}")
+
+
+def parse(selector: str) -> list:
+    """Parse a selector into a list of chains (one per comma-separated part)."""
+    return _Parser(selector).parse()
+
+
+def quote(value) -> str:
+    """Quote a value for use in a selector, e.g. f'[name == {quote(name)}]'."""
+    return json.dumps(value)
+
+
+# ---------------------------------------------------------------------------
+# Evaluation
+# ---------------------------------------------------------------------------
+
+def type_matches(speckle_type, wanted: str) -> bool:
+    """True if `wanted` is the full speckle_type or the last part of one of its segments."""
+    if not speckle_type:
+        return False
+    if speckle_type == wanted:
+        return True
+    return any(part == wanted or part.endswith("." + wanted) for part in speckle_type.split(":"))
+
+
+def _member(obj, name: str):
+    if isinstance(obj, dict):
+        return obj.get(name)
+    members = getattr(obj, "__dict__", None)
+    if members is not None and name in members:
+        return members[name]
+    return getattr(obj, name, None)
+
+
+class QueryResult:
+    """Matched nodes (in tree order) with the plan that produced them."""
+
+    def __init__(self, selector: str, nodes: list, plan: list, seconds: float):
+        self.selector = selector
+        self.nodes = nodes
+        self.plan = plan
+        self.seconds = seconds
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def first(self):
+        return self.nodes[0] if self.nodes else None
+
+    def explain(self) -> str:
+        lines = [f"{self.selector}  ->  {len(self.nodes)} nodes in {self.seconds * 1000:.2f} ms"]
+        lines += [f"  {step}" for step in self.plan]
+        return "\n".join(lines)
+
+
+class QueryEngine:
+    """Runs selectors against a TreeIndex, building secondary indexes on demand."""
+
+    def __init__(self, index: TreeIndex):
+        self.index = index
+        self._values = {}   # field -> {value: [nodes]}
+        self._sorted = {}   # field -> (sorted numbers, nodes in the same order)
+        self._compiled = {}
+
+    def invalidate(self):
+        """Drop the secondary indexes (after edits made outside TreeIndex)."""
+        self._values.clear()
+        self._sorted.clear()
+
+    # -- field access ------------------------------------------------------
+
+    def value(self, node: Base, field: str):
+        if field == "depth":
+            return self.index.depth(node)
+        if field == "speckle_type":
+            return getattr(node, "speckle_type", getattr(node, "_speckle_type", None))
+        value = node
+        for name in field.split("."):
+            value = _member(value, name)
+            if value is None:
+                return None
+        return value
+
+    def _value_index(self, field: str) -> dict:
+        table = self._values.get(field)
+        if table is None:
+            table = {}
+            for node in self.index:
+                value = self.value(node, field)
+                try:
+                    table.setdefault(value, []).append(node)
+                except TypeError:
+                    continue  # unhashable values are only filtered, not indexed
+            self._values[field] = table
+        return table
+
+    def _sorted_index(self, field: str) -> tuple:
+        entry = self._sorted.get(field)
+        if entry is None:
+            pairs = []
+            for node in self.index:
+                number = _number(self.value(node, field))
+                if number is not None:
+                    pairs.append((number, self.index.position(node), node))
+            pairs.sort(key=lambda p: (p[0], p[1]))
+            entry = ([p[0] for p in pairs], [p[2] for p in pairs])
+            self._sorted[field] = entry
+        return entry
+
+    # -- compilation -------------------------------------------------------
+
+    def compile(self, selector: str) -> list:
+        chains = self._compiled.get(selector)
+        if chains is None:
+            chains = parse(selector)
+            self._compiled[selector] = chains
+        return chains
+
+    def _condition_predicate(self, condition: Condition):
+        field, op, expected = condition.field, condition.op, condition.value
+        value = self.value
+        if op is None:
+            return lambda node: value(node, field) is not None
+        if op == "in":
+            lower, upper = condition.value, condition.upper
+            return lambda node: _in_range(value(node, field), lower, upper)
+        if op == "~=":
+            return lambda node: expected in str(value(node, field) or "")
+        if op == "^=":
+            return lambda node: str(value(node, field) or "").startswith(str(expected))
+        compare = _COMPARISONS[op]
+        if op in ("==", "!="):
+            return lambda node: compare(value(node, field), expected)
+        return lambda node: _ordered(compare, value(node, field), expected)
+
+    def _predicate(self, compound: Compound, skip: Condition = None):
+        tests = []
+        if compound.type is not None and not (skip is not None and skip.field == ":type"):
+            wanted = compound.type
+            tests.append(lambda node: type_matches(self.value(node, "speckle_type"), wanted))
+        for condition in compound.conditions:
+            if condition is not skip:
+                tests.append(self._condition_predicate(condition))
+        for group in compound.any_of:
+            options = [self._condition_predicate(c) for c in group]
+            tests.append(lambda node, options=options: any(test(node) for test in options))
+        for negated in compound.negated:
+            inner = self._predicate(negated)
+            tests.append(lambda node, inner=inner: not inner(node))
+        if compound.root:
+            tests.append(lambda node: self.index.parent(node) is None)
+        if compound.leaf:
+            tests.append(lambda node: not self.index.children(node))
+        return lambda node: all(test(node) for test in tests)
+
+    # -- planning ----------------------------------------------------------
+
+    def _index_lookup(self, compound: Compound):
+        """
+        Candidates from the most selective indexed condition of a compound:
+        (nodes, condition used, description), or None for a full scan.
+        """
+        options = []
+        index = self.index
+        if compound.type is not None:
+            nodes = []
+            for speckle_type in index.types():
+                if type_matches(speckle_type, compound.type):
+                    nodes.extend(index.by_type(speckle_type))
+            options.append((nodes, Condition(":type"), f"type index {compound.type!r}"))
+        for condition in compound.conditions:
+            field, op = condition.field, condition.op
+            if op == "==":
+                if field == "name":
+                    nodes = index.by_name(condition.value)
+                    source = "name index"
+                elif field == "applicationId":
+                    node = index.by_application_id(condition.value)
+                    nodes, source = ([node] if node is not None else []), "applicationId index"
+                elif field == "id":
+                    node = index.by_id(condition.value)
+                    nodes, source = ([node] if node is not None else []), "id index"
+                else:
+                    try:
+                        nodes = list(self._value_index(field).get(condition.value, []))
+                    except TypeError:
+                        continue
+                    source = f"value index {field}"
+                options.append((nodes, condition, f"{source} {condition!r}"))
+            elif op in ("<", "<=", ">", ">=", "in") and field not in ("name", "applicationId", "id", "speckle_type"):
+                values, nodes = self._sorted_index(field)
+                lower, upper, inclusive = _bounds(condition)
+                start = 0 if lower is None else (
+                    bisect.bisect_left(values, lower) if inclusive[0] else bisect.bisect_right(values, lower))
+                end = len(values) if upper is None else (
+                    bisect.bisect_right(values, upper) if inclusive[1] else bisect.bisect_left(values, upper))
+                options.append((nodes[start:end], condition, f"range index {condition!r}"))
+        if not options:
+            return None
+        return min(options, key=lambda option: len(option[0]))
+
+    def select(self, selector: str) -> QueryResult:
+        """Run a selector and return the matching nodes in tree order."""
+        start = time.perf_counter()
+        plan = []
+        with instrument.span("query", selector=selector) as s:
+            found = {}
+            for chain in self.compile(selector):
+                for node in self._run_chain(chain, plan):
+                    found[id(node)] = node
+            position = self.index.position
+            nodes = sorted(found.values(), key=lambda n: position(n) if position(n) is not None else -1)
+            s.set(nodes=len(nodes))
+        return QueryResult(selector, nodes, plan, time.perf_counter() - start)
+
+    def first(self, selector: str):
+        return self.select(selector).first()
+
+    def _run_chain(self, chain: list, plan: list) -> list:
+        combinator, subject = chain[-1]
+        lookup = self._index_lookup(subject)
+
+        if lookup is None and len(chain) > 1:
+            # Nothing indexes the subject: start from the nodes matching the
+            # rest of the chain and look only below them
+            context = self._run_chain(chain[:-1], plan)
+            candidates = []
+            seen = set()
+            for node in context:
+                below = self.index.children(node) if combinator == ">" else self._descendants(node)
+                for child in below:
+                    if id(child) not in seen:
+                        seen.add(id(child))
+                        candidates.append(child)
+            test = self._predicate(subject)
+            matches = [node for node in candidates if test(node)]
+            relation = "children" if combinator == ">" else "descendants"
+            plan.append(f"{relation} of {len(context)} context nodes ({len(candidates)}) "
+                        f"-> filter {subject!r} -> {len(matches)}")
+            return matches
+
+        if lookup is None:
+            candidates, used, source = list(self.index), None, "full scan"
+        else:
+            candidates, used, source = lookup
+        test = self._predicate(subject, skip=used)
+        matches = [node for node in candidates if test(node)]
+        step = f"{source} ({len(candidates)}) -> filter {subject!r} -> {len(matches)}"
+
+        if len(chain) > 1:
+            matches = [node for node in matches if self._matches_chain(node, chain)]
+            step += f" -> relations {_chain_text(chain[:-1])} -> {len(matches)}"
+        plan.append(step)
+        return matches
+
+    def _descendants(self, node: Base):
+        stack = list(reversed(self.index.children(node)))
+        while stack:
+            child = stack.pop()
+            yield child
+            stack.extend(reversed(self.index.children(child)))
+
+    def _matches_chain(self, node: Base, chain: list) -> bool:
+        """True if the ancestors of `node` satisfy chain[:-1] (checked right to left)."""
+        if len(chain) == 1:
+            return True
+        combinator = chain[-1][0]
+        compound = chain[-2][1]
+        test = self._predicate(compound)
+        parent = self.index.parent(node)
+        if combinator == ">":
+            return parent is not None and test(parent) and self._matches_chain(parent, chain[:-1])
+        while parent is not None:
+            if test(parent) and self._matches_chain(parent, chain[:-1]):
+                return True
+            parent = self.index.parent(parent)
+        return False
+
+
+def _chain_text(chain: list) -> str:
+    text = ""
+    for combinator, compound in chain:
+        if combinator == ">":
+            text += " > "
+        elif combinator == " ":
+            text += " "
+        text += repr(compound)
+    return text
+
+
+def _number(value):
+    """
+    The numeric value used by range conditions and the range index: numbers
+    and numeric strings (such as "02") as floats; None for anything else,
+    including booleans and NaN.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return None if number != number else number
+
+
+def _ordered(compare, actual, expected) -> bool:
+    number = _number(actual)
+    return number is not None and compare(number, float(expected))
+
+
+def _in_range(actual, lower: float, upper: float) -> bool:
+    number = _number(actual)
+    return number is not None and lower <= number <= upper
+
+
+def _bounds(condition: Condition):
+    """(lower, upper, (lower inclusive, upper inclusive)) of a numeric condition."""
+    op, value = condition.op, condition.value
+    if op == "in":
+        return condition.value, condition.upper, (True, True)
+    value = float(value)
+    return {
+        "<": (None, value, (True, False)),
+        "<=": (None, value, (True, True)),
+        ">": (value, None, (False, True)),
+        ">=": (value, None, (True, True)),
+    }[op]
@@ -0,0 +1,216 @@
+"""
+Concurrent runner for the model scripts.
+
+Applies one of the existing operations -- the JSON export (09), the tree
+print (05) or the property assignment (08) -- to many models or versions at
+once. Items run on a thread pool with a configurable concurrency limit, so
+processing every model of a project takes about as long as the slowest
+model. Each item gets its own result or error; one failing model does not
+stop the others.
+
+All workers share the cached client from main.get_client() and the local
+object cache, both of which are thread-safe.
+
+Usage:
+    python runner.py export --project 128262a20c --all-models --workers 4
+    python runner.py tree --project 128262a20c --models a1014e4b32 0763ad7d28
+    python runner.py export --project 128262a20c --models 0763ad7d28 --versions 5
+
+    from runner import run_concurrently, project_items
+    results = run_concurrently(fn, project_items(client, project_id), max_workers=4)
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from main import get_client
+from version_history import VersionHistory
+
+DEFAULT_WORKERS = 4
+
+# Models per request when listing a project's models (the server's largest page)
+MODELS_PAGE_SIZE = 100
+
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename: str):
+    """Import a numbered script (the file names are not valid module names)."""
+    path = os.path.join(_SCRIPT_DIR, filename)
+    name = "script_" + os.path.splitext(filename)[0].replace(" ", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class WorkItem:
+    """One model version to process (the latest if `version` is None)."""
+
+    def __init__(self, project_id: str, model_id: str, version=None, label: str = None):
+        self.project_id = project_id
+        self.model_id = model_id
+        self.version = version
+        self.label = label or (f"{model_id}@{version.id}" if version is not None else model_id)
+
+    def __repr__(self) -> str:
+        return f"WorkItem({self.project_id}/{self.label})"
+
+
+class ItemResult:
+    """Outcome of one work item: a value or the exception it raised."""
+
+    def __init__(self, item: WorkItem, value=None, error: Exception = None, seconds: float = 0.0):
+        self.item = item
+        self.value = value
+        self.error = error
+        self.seconds = seconds
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_concurrently(fn, items, max_workers: int = DEFAULT_WORKERS) -> list:
+    """
+    Call fn(item) for every item on a pool of at most `max_workers` threads.
+    Returns one ItemResult per item, in the order of `items`.
+    """
+    items = list(items)
+
+    def run(item):
+        start = time.perf_counter()
+        try:
+            return ItemResult(item, value=fn(item), seconds=time.perf_counter() - start)
+        except Exception as e:
+            return ItemResult(item, error=e, seconds=time.perf_counter() - start)
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as pool:
+        return list(pool.map(run, items))
+
+
+def iter_model_ids(client, project_id: str):
+    """Yield the id of every model in a project, following the page cursors."""
+    cursor = None
+    while True:
+        page = client.model.get_models(project_id, models_limit=MODELS_PAGE_SIZE, models_cursor=cursor)
+        for model in page.items:
+            yield model.id
+        cursor = page.cursor
+        if not page.items or not cursor:
+            return
+
+
+def project_items(client, project_id: str, model_ids=None, versions: int = 0) -> list:
+    """
+    Work items for a project: the given models (all models if None), either
+    their latest version (versions=0) or their `versions` most recent ones.
+    """
+    if model_ids is None:
+        model_ids = list(iter_model_ids(client, project_id))
+
+    items = []
+    for model_id in model_ids:
+        if not versions:
+            items.append(WorkItem(project_id, model_id))
+            continue
+        found = islice(VersionHistory(client, project_id, model_id), versions)
+        items.extend(WorkItem(project_id, model_id, v) for v in found)
+    return items
+
+
+# -- operations -------------------------------------------------------------
+
+def export_operation(output_dir: str, export_format: str = None):
+    """Export each item with 09 to its own file in `output_dir`."""
+    script = load_script("09_export_json.py")
+    export_format = script.check_format(export_format or script.EXPORT_FORMAT)
+    extension = {"ndjson": "ndjson", "columnar": "spkcol"}.get(export_format, "json")
+    os.makedirs(output_dir, exist_ok=True)
+
+    def run(item: WorkItem):
+        client = get_client()
+        version = item.version or script.latest_version(client, item.project_id, item.model_id)
+        if version is None:
+            raise ValueError(f"No versions found in model {item.model_id}")
+        output_file = os.path.join(output_dir, f"{item.model_id}_{version.id}.{extension}")
+        return script.export_version(client, item.project_id, item.model_id, version,
+                                     output_file=output_file, export_format=export_format)
+
+    return run
+
+
+def tree_operation():
+    """Return the 05 tree print of each item as text."""
+    script = load_script("05_print_tree.py")
+
+    def run(item: WorkItem):
+        return script.tree_text(get_client(), item.project_id, item.model_id, item.version)
+
+    return run
+
+
+def properties_operation():
+    """Run the 08 property assignment on each item; returns the new version id."""
+    script = load_script("08_adding new properties.py")
+
+    def run(item: WorkItem):
+        return script.add_properties(get_client(), item.project_id, item.model_id, item.version)
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a model script across many models / versions concurrently.")
+    parser.add_argument("operation", choices=["export", "tree", "properties"])
+    parser.add_argument("--project", required=True, help="project id")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--models", nargs="+", help="model ids")
+    target.add_argument("--all-models", action="store_true", help="every model in the project")
+    parser.add_argument("--versions", type=int, default=0,
+                        help="process the N most recent versions of each model (default: latest only)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrency limit")
+    parser.add_argument("--output-dir", default=os.path.join(_SCRIPT_DIR, "exports"),
+                        help="folder for export files")
+    parser.add_argument("--format", help="export format (defaults to EXPORT_FORMAT in 09)")
+    args = parser.parse_args()
+
+    client = get_client()
+    items = project_items(client, args.project, None if args.all_models else args.models, args.versions)
+    print(f"✓ {len(items)} item(s), {args.workers} worker(s)")
+
+    if args.operation == "export":
+        fn = export_operation(args.output_dir, args.format)
+    elif args.operation == "tree":
+        fn = tree_operation()
+    else:
+        fn = properties_operation()
+
+    start = time.perf_counter()
+    results = run_concurrently(fn, items, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print("\n--- Results ---")
+    for result in results:
+        if not result.ok:
+            print(f"  ✗ {result.item.label}: {result.error} ({result.seconds:.1f} s)")
+        elif args.operation == "tree":
+            print(f"  ✓ {result.item.label} ({result.seconds:.1f} s)")
+            print(result.value)
+        else:
+            print(f"  ✓ {result.item.label}: {result.value} ({result.seconds:.1f} s)")
+
+    failed = sum(1 for r in results if not r.ok)
+    slowest = max((r.seconds for r in results), default=0.0)
+    print(f"\n✓ {len(results) - failed} succeeded, {failed} failed in {elapsed:.1f} s "
+          f"(slowest item {slowest:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Spatial index over element bounding boxes.
+
+Computes every element's axis-aligned bounding box from its displayValue
+vertices in one vectorized pass (see banding.py for the Z-only version) and
+packs the boxes into an R-tree with Sort-Tile-Recursive bulk loading. Queries
+descend the tree one level at a time, testing all candidate nodes of a level
+together, so a box query on 100k elements touches a few hundred boxes
+instead of all of them.
+
+Queries:
+    box(lo, hi)              elements whose box intersects (or lies within) a box
+    slab(zmin, zmax)         elements overlapping a horizontal slab, e.g. a floor
+    nearest(point, k)        the k elements closest to a point
+    clashes(element, offset) elements a copy of `element` moved by `offset` would overlap
+
+Uses NumPy when it is installed (`pip install .[fast]`) and the standard
+library otherwise.
+
+Usage:
+    from spatial import SpatialIndex
+    index = SpatialIndex(elements)
+    floor = index.slab(4000, 8000)
+    hits = index.clashes(floor_b, (0, 0, 16000))
+    closest = index.nearest((0, 0, 0), k=5)
+"""
+
+import heapq
+import math
+
+from banding import element_meshes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path is used instead
+    np = None
+
+# Children per tree node
+DEFAULT_NODE_SIZE = 16
+
+_INF = float("inf")
+
+
+def _point(obj):
+    for attr in ("basePoint", "location"):
+        point = getattr(obj, attr, None)
+        if point is not None and all(hasattr(point, c) for c in ("x", "y", "z")):
+            return [point.x, point.y, point.z]
+    return None
+
+
+def element_bounds(elements) -> tuple:
+    """
+    Bounding boxes of elements as (lo, hi), one (x, y, z) row per element.
+    Elements without vertices get a point box at their basePoint / location,
+    or an empty box (lo = +inf, hi = -inf) that no query matches.
+    """
+    groups = []
+    for obj in elements:
+        meshes = element_meshes(obj)
+        if meshes:
+            groups.append([mesh.vertices for mesh in meshes])
+        else:
+            point = _point(obj)
+            groups.append([point] if point else [])
+
+    if np is not None:
+        lo = np.full((len(groups), 3), _INF)
+        hi = np.full((len(groups), 3), -_INF)
+        counts = np.asarray([sum(len(b) // 3 for b in group) for group in groups], dtype=int)
+        filled = counts > 0
+        if filled.any():
+            # One flat point buffer for all elements, reduced per element segment
+            points = np.concatenate([np.asarray(b, dtype=float)[:len(b) // 3 * 3]
+                                     for group in groups for b in group]).reshape(-1, 3)
+            used = counts[filled]
+            starts = np.concatenate(([0], np.cumsum(used)[:-1]))
+            lo[filled] = np.minimum.reduceat(points, starts, axis=0)
+            hi[filled] = np.maximum.reduceat(points, starts, axis=0)
+        return lo, hi
+
+    lo, hi = [], []
+    for group in groups:
+        coords = [c for b in group for c in b[:len(b) // 3 * 3]]
+        if not coords:
+            lo.append((_INF, _INF, _INF))
+            hi.append((-_INF, -_INF, -_INF))
+            continue
+        xs, ys, zs = coords[0::3], coords[1::3], coords[2::3]
+        lo.append((min(xs), min(ys), min(zs)))
+        hi.append((max(xs), max(ys), max(zs)))
+    return lo, hi
+
+
+def _str_order(centers: list, node_size: int) -> list:
+    """
+    Sort-Tile-Recursive order of boxes given their centers: slice along x,
+    then y, then sort by z, so consecutive runs of `node_size` are compact.
+    """
+    count = len(centers)
+    nodes = math.ceil(count / node_size)
+    slices = max(1, math.ceil(nodes ** (1 / 3)))
+    order = sorted(range(count), key=lambda i: centers[i][0])
+    per_x = math.ceil(count / slices)
+    result = []
+    for x_start in range(0, count, per_x):
+        x_part = sorted(order[x_start:x_start + per_x], key=lambda i: centers[i][1])
+        per_y = math.ceil(len(x_part) / slices)
+        for y_start in range(0, len(x_part), per_y):
+            result.extend(sorted(x_part[y_start:y_start + per_y], key=lambda i: centers[i][2]))
+    return result
+
+
+def _str_order_np(centers, node_size: int):
+    count = len(centers)
+    nodes = math.ceil(count / node_size)
+    slices = max(1, math.ceil(nodes ** (1 / 3)))
+    per_x = math.ceil(count / slices)
+    order = np.argsort(centers[:, 0], kind="stable")
+    parts = []
+    for x_start in range(0, count, per_x):
+        x_part = order[x_start:x_start + per_x]
+        x_part = x_part[np.argsort(centers[x_part, 1], kind="stable")]
+        per_y = math.ceil(len(x_part) / slices)
+        for y_start in range(0, len(x_part), per_y):
+            y_part = x_part[y_start:y_start + per_y]
+            parts.append(y_part[np.argsort(centers[y_part, 2], kind="stable")])
+    return np.concatenate(parts)
+
+
+class SpatialIndex:
+    """An STR-packed R-tree over the bounding boxes of a list of elements."""
+
+    def __init__(self, elements, bounds: tuple = None, node_size: int = DEFAULT_NODE_SIZE):
+        self.elements = list(elements)
+        self.node_size = node_size
+        self._positions = None
+        lo, hi = bounds if bounds is not None else element_bounds(self.elements)
+        # Elements with an empty box are never returned, so they are left out
+        if np is not None:
+            lo, hi = np.asarray(lo, dtype=float).reshape(-1, 3), np.asarray(hi, dtype=float).reshape(-1, 3)
+            self.lo, self.hi = lo, hi
+            keep = np.flatnonzero((lo <= hi).all(axis=1))
+            self._build_np(keep)
+        else:
+            self.lo, self.hi = [tuple(b) for b in lo], [tuple(b) for b in hi]
+            keep = [i for i in range(len(self.lo)) if all(a <= b for a, b in zip(self.lo[i], self.hi[i]))]
+            self._build_py(keep)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    # -- building ----------------------------------------------------------
+
+    def _build_np(self, keep):
+        # Level 0 holds the element boxes themselves; each level above holds
+        # node boxes with the [first, last) range of their children below
+        if not len(keep):
+            self.levels = []
+            return
+        order = keep[_str_order_np((self.lo[keep] + self.hi[keep]) / 2, self.node_size)]
+        self.ids = order
+        lo, hi = self.lo[order], self.hi[order]
+        self.levels = [(lo, hi, None, None)]
+        while len(lo) > 1:
+            starts = np.arange(0, len(lo), self.node_size)
+            first, last = starts, np.minimum(starts + self.node_size, len(lo))
+            node_lo = np.minimum.reduceat(lo, starts, axis=0)
+            node_hi = np.maximum.reduceat(hi, starts, axis=0)
+            # Re-tile the new nodes so siblings above are compact as well; the
+            # children keep their own positions, only the node order changes
+            if len(node_lo) > self.node_size:
+                order = _str_order_np((node_lo + node_hi) / 2, self.node_size)
+                node_lo, node_hi, first, last = node_lo[order], node_hi[order], first[order], last[order]
+            self.levels.append((node_lo, node_hi, first, last))
+            lo, hi = node_lo, node_hi
+
+    def _build_py(self, keep):
+        if not keep:
+            self.levels = []
+            return
+        centers = [tuple((a + b) / 2 for a, b in zip(self.lo[i], self.hi[i])) for i in keep]
+        order = [keep[i] for i in _str_order(centers, self.node_size)]
+        self.ids = order
+        lo, hi = [self.lo[i] for i in order], [self.hi[i] for i in order]
+        self.levels = [(lo, hi, None, None)]
+        while len(lo) > 1:
+            first, last, node_lo, node_hi = [], [], [], []
+            for start in range(0, len(lo), self.node_size):
+                end = min(start + self.node_size, len(lo))
+                first.append(start)
+                last.append(end)
+                node_lo.append(tuple(min(b[axis] for b in lo[start:end]) for axis in range(3)))
+                node_hi.append(tuple(max(b[axis] for b in hi[start:end]) for axis in range(3)))
+            if len(node_lo) > self.node_size:
+                centers = [tuple((a + b) / 2 for a, b in zip(l, h)) for l, h in zip(node_lo, node_hi)]
+                order = _str_order(centers, self.node_size)
+                node_lo = [node_lo[i] for i in order]
+                node_hi = [node_hi[i] for i in order]
+                first = [first[i] for i in order]
+                last = [last[i] for i in order]
+            self.levels.append((node_lo, node_hi, first, last))
+            lo, hi = node_lo, node_hi
+
+    # -- queries -----------------------------------------------------------
+
+    def box_ids(self, lo, hi, within: bool = False) -> list:
+        """Indices (into `elements`) of boxes intersecting [lo, hi], in element order."""
+        if not self.levels:
+            return []
+        if np is not None:
+            return self._box_ids_np(np.asarray(lo, dtype=float), np.asarray(hi, dtype=float), within)
+        return self._box_ids_py(tuple(lo), tuple(hi), within)
+
+    def _box_ids_np(self, qlo, qhi, within: bool) -> list:
+        top = len(self.levels) - 1
+        candidates = np.arange(len(self.levels[top][0]))
+        for level in range(top, -1, -1):
+            lo, hi, first, last = self.levels[level]
+            if level == 0 and within:
+                hit = (lo[candidates] >= qlo).all(axis=1) & (hi[candidates] <= qhi).all(axis=1)
+            else:
+                hit = (lo[candidates] <= qhi).all(axis=1) & (hi[candidates] >= qlo).all(axis=1)
+            candidates = candidates[hit]
+            if level == 0 or not len(candidates):
+                break
+            # Expand the matching nodes into their child ranges in one step
+            starts, ends = first[candidates], last[candidates]
+            counts = ends - starts
+            offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+            candidates = np.arange(counts.sum()) + offsets
+        if level != 0:
+            return []
+        return sorted(self.ids[candidates].tolist())
+
+    def _box_ids_py(self, qlo, qhi, within: bool) -> list:
+        top = len(self.levels) - 1
+        candidates = list(range(len(self.levels[top][0])))
+        for level in range(top, -1, -1):
+            lo, hi, first, last = self.levels[level]
+            if level == 0 and within:
+                candidates = [i for i in candidates
+                              if all(a >= b for a, b in zip(lo[i], qlo)) and all(a <= b for a, b in zip(hi[i], qhi))]
+            else:
+                candidates = [i for i in candidates
+                              if all(a <= b for a, b in zip(lo[i], qhi)) and all(a >= b for a, b in zip(hi[i], qlo))]
+            if level == 0:
+                break
+            candidates = [child for i in candidates for child in range(first[i], last[i])]
+        return sorted(self.ids[i] for i in candidates)
+
+    def box(self, lo, hi, within: bool = False) -> list:
+        """Elements whose box intersects [lo, hi] (or lies inside it, with `within`)."""
+        return [self.elements[i] for i in self.box_ids(lo, hi, within)]
+
+    def slab_ids(self, zmin: float, zmax: float, within: bool = False) -> list:
+        """Indices of elements overlapping the horizontal slab zmin <= z <= zmax."""
+        return self.box_ids((-_INF, -_INF, zmin), (_INF, _INF, zmax), within)
+
+    def slab(self, zmin: float, zmax: float, within: bool = False) -> list:
+        """Elements overlapping the horizontal slab zmin <= z <= zmax."""
+        return [self.elements[i] for i in self.slab_ids(zmin, zmax, within)]
+
+    def nearest(self, point, k: int = 1) -> list:
+        """The k elements nearest to a point, as (element, distance) pairs."""
+        if not self.levels:
+            return []
+        point = tuple(float(c) for c in point)
+        top = len(self.levels) - 1
+        # Best-first search: the heap holds nodes and elements by their box distance
+        heap = [(d, top, i) for i, d in enumerate(self._distances(top, 0, len(self.levels[top][0]), point))]
+        heapq.heapify(heap)
+        found = []
+        while heap and len(found) < k:
+            distance, level, i = heapq.heappop(heap)
+            if level == 0:
+                found.append((self.elements[int(self.ids[i])], distance))
+                continue
+            _, _, first, last = self.levels[level]
+            start = int(first[i])
+            for child, d in enumerate(self._distances(level - 1, start, int(last[i]), point), start):
+                heapq.heappush(heap, (d, level - 1, child))
+        return found
+
+    def _distances(self, level: int, start: int, end: int, point) -> list:
+        """Distances from a point to the boxes [start, end) of a level."""
+        lo, hi = self.levels[level][0][start:end], self.levels[level][1][start:end]
+        if np is not None:
+            gap = np.maximum(np.maximum(lo - point, point - hi), 0.0)
+            return np.sqrt((gap * gap).sum(axis=1)).tolist()
+        distances = []
+        for box_lo, box_hi in zip(lo, hi):
+            gaps = (max(a - c, c - b, 0.0) for a, b, c in zip(box_lo, box_hi, point))
+            distances.append(math.sqrt(sum(g * g for g in gaps)))
+        return distances
+
+    def bounds_of(self, element) -> tuple:
+        """The stored (lo, hi) box of an element, or a freshly computed one."""
+        if self._positions is None:
+            self._positions = {id(e): i for i, e in enumerate(self.elements)}
+        i = self._positions.get(id(element))
+        if i is not None:
+            return tuple(self.lo[i]), tuple(self.hi[i])
+        lo, hi = element_bounds([element])
+        return tuple(lo[0]), tuple(hi[0])
+
+    def clashes(self, element, offset=(0.0, 0.0, 0.0), tolerance: float = 0.0) -> list:
+        """
+        Elements a copy of `element` moved by `offset` would overlap (boxes
+        shrunk by `tolerance`, so touching faces do not count), excluding the
+        element itself.
+        """
+        lo, hi = self.bounds_of(element)
+        qlo = [float(a) + float(o) + tolerance for a, o in zip(lo, offset)]
+        qhi = [float(b) + float(o) - tolerance for b, o in zip(hi, offset)]
+        return [e for e in self.box(qlo, qhi) if e is not element]
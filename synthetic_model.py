@@ -0,0 +1,107 @@
+"""
+Synthetic Speckle model generator.
+
+Builds a model tree with the shapes the scripts expect -- a root with
+'@elements' collections nested `depth` levels deep, and elements with a
+name, applicationId, nested `properties` and an '@displayValue' mesh -- so
+the scripts can be measured without a server or real data.
+
+Usage:
+    from synthetic_model import generate_model
+    root = generate_model(depth=2, fan_out=3, elements=500, vertices=200, properties=8)
+"""
+
+import random
+
+from specklepy.objects import Base
+from specklepy.objects.geometry import Mesh
+
+COLLECTION_TYPE = "Speckle.Core.Models.Collection"
+
+_DESIGNERS = ["Nihan", "Sushmitha", "Marina"]
+
+
+def make_mesh(rng: random.Random, vertices: int, x: float, y: float, z: float, size: float = 1000.0) -> Mesh:
+    """A mesh of `vertices` points scattered in a box at (x, y, z), fanned into triangles."""
+    coords = []
+    for _ in range(vertices):
+        coords.extend((x + rng.random() * size, y + rng.random() * size, z + rng.random() * size))
+    faces = []
+    for i in range(1, vertices - 1):
+        faces.extend((3, 0, i, i + 1))
+    return Mesh(vertices=coords, faces=faces, units="mm")
+
+
+def make_element(rng: random.Random, number: int, vertices: int, properties: int) -> Base:
+    element = Base()
+    element.name = f"Element {number}"
+    element.applicationId = f"element-{number:08d}"
+    level = rng.randrange(3)
+    element.properties = {
+        "Module": f"{level + 1:02d}",
+        "Designer": _DESIGNERS[level],
+        **{f"param_{i}": rng.random() for i in range(max(0, properties - 2))},
+    }
+    element.area = rng.random() * 1e6
+    element.volume = rng.random() * 1e9
+    if vertices:
+        x, y, z = rng.random() * 1e5, rng.random() * 1e5, level * 4000.0
+        element["@displayValue"] = [make_mesh(rng, vertices, x, y, z)]
+    return element
+
+
+def make_collection(name: str) -> Base:
+    collection = Base()
+    # Base ignores `speckle_type` assignment, so write the member directly
+    collection["speckle_type"] = COLLECTION_TYPE
+    collection.name = name
+    collection["@elements"] = []
+    return collection
+
+
+def generate_model(depth: int = 2, fan_out: int = 3, elements: int = 100,
+                   vertices: int = 100, properties: int = 4, seed: int = 0) -> Base:
+    """
+    Build a synthetic model.
+
+    depth      -- collection levels below the root
+    fan_out    -- child collections per collection
+    elements   -- elements in total, spread over the deepest collections
+    vertices   -- mesh vertices per element (0 for no displayValue)
+    properties -- entries in each element's `properties` dict
+    """
+    rng = random.Random(seed)
+    root = make_collection("Synthetic model")
+
+    leaves = [root]
+    for level in range(depth):
+        next_leaves = []
+        for parent in leaves:
+            for i in range(fan_out):
+                child = make_collection(f"Layer {level + 1:02d}-{len(next_leaves) + 1:03d}")
+                parent["@elements"].append(child)
+                next_leaves.append(child)
+        leaves = next_leaves
+
+    for number in range(elements):
+        leaves[number % len(leaves)]["@elements"].append(
+            make_element(rng, number, vertices, properties)
+        )
+    return root
+
+
+def model_size(root: Base) -> dict:
+    """Node, element and vertex counts of a generated model."""
+    nodes = element_count = vertex_count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes += 1
+        children = getattr(node, "@elements", None) or []
+        stack.extend(children)
+        meshes = getattr(node, "@displayValue", None) or []
+        if meshes or getattr(node, "applicationId", None):
+            element_count += 1
+        for mesh in meshes:
+            vertex_count += len(mesh.vertices) // 3
+    return {"nodes": nodes, "elements": element_count, "vertices": vertex_count}
@@ -0,0 +1,26 @@
+"""
+Shared test setup: the scripts' modules are imported from the repository
+root, telemetry is off, and `cache` is an ObjectCache in a temporary folder.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+from specklepy.logging import metrics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from object_cache import ObjectCache  # noqa: E402
+
+metrics.disable()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ObjectCache(base_path=str(tmp_path))
+    yield cache
+    cache.close()
@@ -0,0 +1,46 @@
+"""
+Tests for columnar: every record value lands in exactly one column, and a
+table with live column views refuses to close.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import pytest
+
+from columnar import ColumnarTable, write_columnar
+
+
+def _records():
+    return [
+        {"id": "a", "speckle_type": "Base", "name": "A", "depth": 1,
+         "properties": {"area": 2.5, "Module": "top", "properties": {"Module": "02"}}},
+        {"id": "b", "speckle_type": "Base", "name": "B", "depth": 1,
+         "properties": {"area": 4.0, "properties": {"Module": "03", "Designer": "X"}}},
+    ]
+
+
+def test_member_and_nested_keys_get_separate_columns(tmp_path):
+    path = str(tmp_path / "objects.spkcol")
+    assert write_columnar(path, _records()) == 2
+
+    with ColumnarTable(path) as table:
+        assert "area" not in table.columns
+        assert table.columns.count("properties.area") == 1
+        assert table.sum("properties.area") == 6.5
+        assert table.values("properties.Module") == ["top", None]
+        assert table.values("properties.properties.Module") == ["02", "03"]
+        assert table.where("properties.properties.Module", "03") == [1]
+
+
+def test_close_with_live_view_raises(tmp_path):
+    path = str(tmp_path / "objects.spkcol")
+    write_columnar(path, _records())
+    table = ColumnarTable(path)
+    view = table.column("properties.area")
+
+    with pytest.raises(BufferError):
+        table.close()
+
+    view.release()
+    table.close()
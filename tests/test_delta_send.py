@@ -0,0 +1,76 @@
+"""
+Tests for delta_send: references to unchanged subtrees stay valid on targets
+that did not have them.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import json
+
+import pytest
+from specklepy.api import operations
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.transports.memory import MemoryTransport
+
+from delta_send import ChangeTracker, delta_send
+from object_cache import cached_receive, closure_ids
+from synthetic_model import generate_model
+
+
+def _received(cache):
+    """A model as received from another project: cached, and on its server only."""
+    source = MemoryTransport()
+    obj_id = operations.send(generate_model(elements=30, vertices=5), [source, cache], use_default_cache=False)
+    return cached_receive(obj_id, cache=cache), source
+
+
+def _complete(transport, obj_id) -> bool:
+    root = transport.get_object(obj_id)
+    return root is not None and all(transport.get_object(i) for i in closure_ids(root))
+
+
+def test_other_project_gets_reused_subtrees(cache):
+    root, _ = _received(cache)
+    tracker = ChangeTracker(root)
+    root.name = "Copied"
+    target = MemoryTransport()
+
+    obj_id, report = delta_send(root, [target], tracker, cache=cache)
+
+    assert report.subtrees_reused > 0
+    assert report.objects_copied > 0
+    assert _complete(target, obj_id)
+
+    root.name = "Copied again"
+    obj_id, report = delta_send(root, [target], tracker, cache=cache)
+    assert report.objects_copied == 0
+    assert _complete(target, obj_id)
+
+
+def test_same_project_copies_nothing(cache):
+    root, source = _received(cache)
+    tracker = ChangeTracker(root)
+    root.name = "Renamed"
+
+    obj_id, report = delta_send(root, [source], tracker, cache=cache)
+
+    assert report.objects_copied == 0
+    assert _complete(source, obj_id)
+
+
+def test_uncached_objects_need_a_source(cache):
+    root, source = _received(cache)
+    tracker = ChangeTracker(root)
+    root.name = "Copied"
+    # The deepest child sits inside a subtree that is reused, not re-serialized
+    closure = json.loads(cache.get_object(root.id))["__closure"]
+    child = max(closure, key=closure.get)
+    cache._connection.execute("DELETE FROM objects WHERE hash = ?", (child,))
+
+    with pytest.raises(SpeckleException):
+        delta_send(root, [MemoryTransport()], tracker, cache=cache)
+
+    target = MemoryTransport()
+    obj_id, _ = delta_send(root, [target], ChangeTracker(root), cache=cache, source=source)
+    assert _complete(target, obj_id)
@@ -0,0 +1,25 @@
+"""
+Tests for 09_export_json: the streamed JSON writer produces valid JSON for
+any header.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import json
+
+import pytest
+
+from runner import load_script
+
+export = load_script("09_export_json.py")
+
+
+@pytest.mark.parametrize("header", [{}, {"version_id": "abc", "count": 2}])
+@pytest.mark.parametrize("objects", [[], [{"id": "a"}, {"id": "b"}]])
+def test_json_stream_matches_json(tmp_path, header, objects):
+    path = tmp_path / "export.json"
+
+    assert export.write_json_stream(str(path), header, objects) == len(objects)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == dict(header, objects=objects)
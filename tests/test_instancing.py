@@ -0,0 +1,39 @@
+"""
+Tests for instancing: definitions are reused per source object, not per name.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+from instancing import definitions, expand_instances, place_instances
+from synthetic_model import generate_model
+from transform import translation
+from tree_walk import iter_elements, iter_nodes
+
+
+def _elements(root):
+    return [n for n in iter_nodes(root, children=iter_elements) if (n.applicationId or "").startswith("element-")]
+
+
+def test_same_name_gets_separate_definitions():
+    root = generate_model(elements=10, vertices=5)
+    first, second = _elements(root)[:2]
+    second.name = first.name
+
+    a = place_instances(root, first, [translation(z=1.0)])
+    b = place_instances(root, second, [translation(z=1.0)])
+
+    assert a[0].definitionId != b[0].definitionId
+    assert len(definitions(root)) == 2
+
+
+def test_same_object_reuses_definition():
+    root = generate_model(elements=10, vertices=5)
+    element = _elements(root)[0]
+
+    a = place_instances(root, element, [translation(z=1.0)])
+    b = place_instances(root, element, [translation(z=2.0)], name="Other label")
+
+    assert a[0].definitionId == b[0].definitionId
+    assert len(definitions(root)) == 1
+    assert expand_instances(root) == 2
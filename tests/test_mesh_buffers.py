@@ -0,0 +1,56 @@
+"""
+Tests for mesh_buffers: packed trees keep their object ids however they are
+sent.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import warnings
+
+from specklepy.api import operations
+from specklepy.objects import Base
+from specklepy.transports.memory import MemoryTransport
+
+from delta_send import ChangeTracker, delta_send
+from mesh_buffers import is_buffer, pack_meshes, unpack_meshes
+from synthetic_model import generate_model
+
+
+def _model() -> Base:
+    root = generate_model(elements=20, vertices=10)
+    # Mesh-like members on a node that is not a Mesh stay lists
+    point_cloud = Base()
+    point_cloud.vertices = [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+    root["@elements"].append(point_cloud)
+    return root
+
+
+def _packed() -> Base:
+    root = _model()
+    assert pack_meshes(root)["buffers"] > 0
+    assert not is_buffer(root["@elements"][-1].vertices)
+    return root
+
+
+def test_delta_send_writes_buffers_as_lists(cache):
+    expected = operations.send(_model(), [MemoryTransport()], use_default_cache=False)
+    root = _packed()
+
+    object_id, _ = delta_send(root, [MemoryTransport()], ChangeTracker(root), cache=cache)
+
+    assert object_id == expected
+
+
+def test_plain_send_writes_buffers_as_lists():
+    expected = operations.send(_model(), [MemoryTransport()], use_default_cache=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert operations.send(_packed(), [MemoryTransport()], use_default_cache=False) == expected
+        assert operations.serialize(_packed()) == operations.serialize(_model())
+
+
+def test_unpack_meshes():
+    root = _packed()
+    assert unpack_meshes(root) > 0
+    assert operations.serialize(root) == operations.serialize(_model())
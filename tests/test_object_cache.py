@@ -0,0 +1,37 @@
+"""
+Tests for object_cache.ObjectCache used as a source transport.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import pytest
+from specklepy.api import operations
+from specklepy.logging.exceptions import SpeckleException
+from specklepy.transports.memory import MemoryTransport
+
+from object_cache import closure_ids
+from synthetic_model import generate_model
+
+
+def test_copy_object_and_children(cache):
+    obj_id = operations.send(generate_model(elements=50), [cache], use_default_cache=False)
+    target = MemoryTransport()
+
+    obj_string = cache.copy_object_and_children(obj_id, target)
+
+    assert obj_string == cache.get_object(obj_id)
+    assert set(target.objects) == {obj_id, *closure_ids(obj_string)}
+    received = operations.receive(obj_id, remote_transport=cache, local_transport=MemoryTransport())
+    assert received.id == obj_id
+
+
+def test_copy_missing_objects(cache):
+    obj_id = operations.send(generate_model(elements=50), [cache], use_default_cache=False)
+    child = closure_ids(cache.get_object(obj_id))[0]
+    cache._connection.execute("DELETE FROM objects WHERE hash = ?", (child,))
+
+    with pytest.raises(SpeckleException):
+        cache.copy_object_and_children(obj_id, MemoryTransport())
+    with pytest.raises(SpeckleException):
+        cache.copy_object_and_children("missing", MemoryTransport())
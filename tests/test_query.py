@@ -0,0 +1,48 @@
+"""
+Tests for query: range conditions match the same nodes whichever index the
+planner starts from.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+import pytest
+
+from query import QueryEngine, QueryError
+from synthetic_model import generate_model
+from tree_index import TreeIndex
+
+
+@pytest.fixture
+def engine():
+    root = generate_model(elements=30, vertices=0)
+    index = TreeIndex(root)
+    # Some Modules are numbers, the rest stay strings such as "03"
+    for number in range(5):
+        index.first_by_name(f"Element {number + 10}").properties["Module"] = number
+    return QueryEngine(index)
+
+
+def test_range_matches_numeric_strings(engine):
+    element = engine.index.first_by_name("Element 4")
+    module = float(element.properties["Module"])
+
+    by_range = engine.select(f"[properties.Module >= {module}]").nodes
+    by_name = engine.select(f'[name == "Element 4"][properties.Module >= {module}]').nodes
+
+    assert element in by_range
+    assert by_name == [element]
+    expected = [n for n in engine.index
+                if float(vars(n).get("properties", {}).get("Module", -1)) >= module]
+    assert set(map(id, by_range)) == set(map(id, expected))
+
+
+@pytest.mark.parametrize("selector", [
+    '[properties.Module < "b"]',
+    '[properties.Module >= "3"]',
+    "[area > true]",
+    "[area in a..b]",
+])
+def test_ordering_needs_numbers(engine, selector):
+    with pytest.raises(QueryError):
+        engine.select(selector)
@@ -0,0 +1,32 @@
+"""
+Tests for runner.project_items against an in-memory paged model list.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+from types import SimpleNamespace
+
+from runner import project_items
+
+
+class _FakeModels:
+    """Lists models in pages; the cursor is the index of the next model."""
+
+    def __init__(self, count: int):
+        self.ids = [f"m{i}" for i in range(count)]
+        self.requests = 0
+
+    def get_models(self, project_id, models_limit=25, models_cursor=None):
+        self.requests += 1
+        start = int(models_cursor or 0)
+        end = start + models_limit
+        items = [SimpleNamespace(id=model_id) for model_id in self.ids[start:end]]
+        return SimpleNamespace(items=items, cursor=str(end) if end < len(self.ids) else None)
+
+
+def test_all_models_follow_cursors():
+    client = SimpleNamespace(model=_FakeModels(250))
+    items = project_items(client, "project")
+    assert [item.model_id for item in items] == client.model.ids
+    assert client.model.requests == 3
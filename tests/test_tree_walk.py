@@ -0,0 +1,41 @@
+"""
+Tests for tree_walk.walk: identical subtrees are all visited, cycles are not
+followed.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+from specklepy.objects import Base
+from specklepy.objects.geometry import Point
+
+from tree_walk import iter_nodes, node_key
+
+
+def _element(name: str) -> Base:
+    element = Base()
+    element.name = name
+    element.basePoint = Point(x=0.0, y=0.0, z=0.0, units="m")
+    # As after a receive: identical objects carry the same id
+    element.basePoint.id = element.basePoint.get_id()
+    return element
+
+
+def _root() -> Base:
+    root = Base()
+    root["@elements"] = [_element("A"), _element("B")]
+    return root
+
+
+def test_identical_subtrees_are_all_visited():
+    root = _root()
+    points = [n for n in iter_nodes(root) if isinstance(n, Point)]
+    assert len(points) == 2
+    # Content keys visit each stored object once
+    assert len([n for n in iter_nodes(root, key=node_key) if isinstance(n, Point)]) == 1
+
+
+def test_cycles_are_not_followed():
+    root = _root()
+    root["@elements"][0]["@elements"] = [root]
+    assert len(list(iter_nodes(root))) == 5
@@ -0,0 +1,82 @@
+"""
+Tests for version_history.VersionHistory against an in-memory paged server.
+
+Run from the repository root:
+    python -m pytest -q tests
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from specklepy.core.api.models.current import ResourceCollection, Version
+
+from version_history import VersionHistory
+
+_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _version(number: int) -> Version:
+    return Version.model_validate({
+        "id": f"v{number}",
+        "referencedObject": f"o{number}",
+        "message": None,
+        "sourceApplication": "py",
+        "createdAt": (_START + timedelta(hours=number)).isoformat(),
+        "previewUrl": "http://localhost/preview",
+        "authorUser": None,
+    })
+
+
+class _FakeVersions:
+    """Lists versions newest first; the cursor is the number of the last version returned."""
+
+    def __init__(self, count: int):
+        self.items = [_version(i) for i in range(count)]
+
+    def push(self, count: int = 1):
+        start = len(self.items)
+        self.items.extend(_version(i) for i in range(start, start + count))
+
+    def get_versions(self, model_id, project_id, limit=25, cursor=None):
+        newest = list(reversed(self.items))
+        start = 0
+        if cursor:
+            start = next(i for i, v in enumerate(newest) if int(v.id[1:]) < int(cursor))
+        page = newest[start:start + limit]
+        more = page and start + limit < len(newest)
+        return ResourceCollection[Version](totalCount=len(newest), items=page,
+                                           cursor=page[-1].id[1:] if more else None)
+
+
+class _FakeClient:
+    def __init__(self, count: int):
+        self.version = _FakeVersions(count)
+
+
+def _history(client, cache_dir) -> VersionHistory:
+    return VersionHistory(client, "project", "model", cache_dir=str(cache_dir), page_size=50, prefetch=False)
+
+
+def test_cold_cache_lookups(tmp_path):
+    client = _FakeClient(250)
+    assert _history(client, tmp_path / "a").previous("v249").id == "v248"
+    assert _history(client, tmp_path / "b").previous("v10").id == "v9"
+    assert _history(client, tmp_path / "c").at_or_before(_START + timedelta(hours=24, minutes=30)).id == "v24"
+    assert _history(client, tmp_path / "d").oldest().id == "v0"
+
+
+def test_new_head_after_cached_history(tmp_path):
+    client = _FakeClient(250)
+    _history(client, tmp_path).oldest()
+
+    client.version.push()
+    history = _history(client, tmp_path)
+    assert history.previous("v250").id == "v249"
+    assert history.previous("v249").id == "v248"
+    assert history.at_or_before("2099-01-01T00:00:00Z").id == "v250"
+    assert history.previous("v0") is None
+
+
+def test_unknown_version(tmp_path):
+    with pytest.raises(ValueError):
+        _history(_FakeClient(3), tmp_path).previous("missing")
@@ -0,0 +1,216 @@
+"""
+Affine transforms for Speckle geometry.
+
+Applies translate / rotate / scale / arbitrary 4x4 transforms to every mesh
+under a node in one batched operation: all vertex buffers are gathered into a
+single array, transformed together and written back (packed buffers stay
+packed, see mesh_buffers.py). Uses NumPy when it is installed
+(`pip install .[fast]`) and the standard library otherwise.
+
+Matrices are 4x4 row-major nested lists, the same layout Speckle uses for
+instance transforms (see `to_flat()` / `from_flat()`).
+
+Usage:
+    from transform import translation, rotation_z, compose, transform_node
+    matrix = compose(rotation_z(90, origin=(0, 0, 0)), translation(z=16000))
+    transform_node(floor, matrix)
+"""
+
+import math
+
+from specklepy.objects import Base
+from mesh_buffers import set_buffer
+from tree_walk import iter_nodes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python path is used instead
+    np = None
+
+
+# ---------------------------------------------------------------------------
+# Matrix helpers
+# ---------------------------------------------------------------------------
+
+def identity() -> list:
+    return [[1.0, 0.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0, 0.0],
+            [0.0, 0.0, 1.0, 0.0],
+            [0.0, 0.0, 0.0, 1.0]]
+
+
+def translation(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> list:
+    m = identity()
+    m[0][3], m[1][3], m[2][3] = float(x), float(y), float(z)
+    return m
+
+
+def scaling(sx: float, sy: float = None, sz: float = None, origin=None) -> list:
+    """Scale about `origin` (defaults to 0,0,0). One factor scales uniformly."""
+    sy = sx if sy is None else sy
+    sz = sx if sz is None else sz
+    m = identity()
+    m[0][0], m[1][1], m[2][2] = float(sx), float(sy), float(sz)
+    return _about(m, origin)
+
+
+def rotation(axis, angle_deg: float, origin=None) -> list:
+    """Rotate by `angle_deg` (counter-clockwise) about `axis` through `origin`."""
+    ax, ay, az = axis
+    length = math.sqrt(ax * ax + ay * ay + az * az)
+    if length == 0:
+        raise ValueError("Rotation axis cannot be a zero vector")
+    ax, ay, az = ax / length, ay / length, az / length
+    a = math.radians(angle_deg)
+    c, s, t = math.cos(a), math.sin(a), 1 - math.cos(a)
+    m = [[t * ax * ax + c,      t * ax * ay - s * az, t * ax * az + s * ay, 0.0],
+         [t * ax * ay + s * az, t * ay * ay + c,      t * ay * az - s * ax, 0.0],
+         [t * ax * az - s * ay, t * ay * az + s * ax, t * az * az + c,      0.0],
+         [0.0, 0.0, 0.0, 1.0]]
+    return _about(m, origin)
+
+
+def rotation_z(angle_deg: float, origin=None) -> list:
+    return rotation((0.0, 0.0, 1.0), angle_deg, origin)
+
+
+def multiply(a: list, b: list) -> list:
+    """Matrix product a @ b (apply b first, then a)."""
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)]
+            for i in range(4)]
+
+
+def compose(*matrices) -> list:
+    """Combine transforms in the order they should be applied."""
+    result = identity()
+    for m in matrices:
+        result = multiply(m, result)
+    return result
+
+
+def from_flat(values) -> list:
+    """Build a matrix from 16 row-major values (e.g. an InstanceProxy transform)."""
+    values = [float(v) for v in values]
+    if len(values) != 16:
+        raise ValueError(f"Expected 16 matrix values, got {len(values)}")
+    return [values[i:i + 4] for i in range(0, 16, 4)]
+
+
+def to_flat(matrix: list) -> list:
+    return [float(v) for row in matrix for v in row]
+
+
+def _about(m: list, origin) -> list:
+    if origin is None:
+        return m
+    ox, oy, oz = origin
+    return compose(translation(-ox, -oy, -oz), m, translation(ox, oy, oz))
+
+
+def _is_translation(m: list) -> bool:
+    return all(m[i][j] == (1.0 if i == j else 0.0) for i in range(3) for j in range(3))
+
+
+# ---------------------------------------------------------------------------
+# Vertex buffers
+# ---------------------------------------------------------------------------
+
+def transform_points(flat, matrix: list) -> list:
+    """
+    Transform a flat [x1, y1, z1, x2, ...] buffer and return a new list.
+    """
+    if np is not None:
+        return _transform_array(np.asarray(flat, dtype=float).reshape(-1, 3), matrix).ravel().tolist()
+
+    (a, b, c, tx), (d, e, f, ty), (g, h, i, tz) = matrix[0], matrix[1], matrix[2]
+    xs, ys, zs = flat[0::3], flat[1::3], flat[2::3]
+    out = [0.0] * len(flat)
+    if _is_translation(matrix):
+        out[0::3] = [x + tx for x in xs]
+        out[1::3] = [y + ty for y in ys]
+        out[2::3] = [z + tz for z in zs]
+        return out
+    out[0::3] = [a * x + b * y + c * z + tx for x, y, z in zip(xs, ys, zs)]
+    out[1::3] = [d * x + e * y + f * z + ty for x, y, z in zip(xs, ys, zs)]
+    out[2::3] = [g * x + h * y + i * z + tz for x, y, z in zip(xs, ys, zs)]
+    return out
+
+
+def _transform_array(points, matrix: list):
+    m = np.asarray(matrix, dtype=float)
+    if _is_translation(matrix):
+        return points + m[:3, 3]
+    return points @ m[:3, :3].T + m[:3, 3]
+
+
+def iter_meshes(node: Base):
+    """
+    Yield every mesh-like object (anything with a vertex buffer) under a node:
+    displayValue meshes of the node and its children, and the nodes themselves.
+    Each mesh is yielded once even if it is shared.
+    """
+    seen = set()
+    for obj in iter_nodes(node, key=id):
+        candidates = [obj]
+        display_value = getattr(obj, "displayValue", None) or getattr(obj, "@displayValue", None)
+        if display_value:
+            candidates.extend(display_value if isinstance(display_value, list) else [display_value])
+        for mesh in candidates:
+            if id(mesh) in seen or not getattr(mesh, "vertices", None):
+                continue
+            seen.add(id(mesh))
+            yield mesh
+
+
+def transform_meshes(meshes, matrix: list) -> int:
+    """
+    Transform the vertices of all given meshes in a single batched operation.
+    Returns the number of vertices transformed.
+    """
+    meshes = [m for m in meshes if getattr(m, "vertices", None)]
+    if not meshes:
+        return 0
+
+    if np is None:
+        for mesh in meshes:
+            set_buffer(mesh, "vertices", transform_points(mesh.vertices, matrix))
+        return sum(len(m.vertices) for m in meshes) // 3
+
+    lengths = [len(m.vertices) for m in meshes]
+    buffer = np.concatenate([np.asarray(m.vertices, dtype=float) for m in meshes])
+    moved = _transform_array(buffer.reshape(-1, 3), matrix).ravel()
+    start = 0
+    for mesh, length in zip(meshes, lengths):
+        set_buffer(mesh, "vertices", moved[start:start + length])
+        start += length
+    return len(buffer) // 3
+
+
+def transform_point(point, matrix: list):
+    """Transform a Point-like object (x, y, z attributes) in place."""
+    x, y, z = point.x, point.y, point.z
+    point.x = matrix[0][0] * x + matrix[0][1] * y + matrix[0][2] * z + matrix[0][3]
+    point.y = matrix[1][0] * x + matrix[1][1] * y + matrix[1][2] * z + matrix[1][3]
+    point.z = matrix[2][0] * x + matrix[2][1] * y + matrix[2][2] * z + matrix[2][3]
+
+
+def transform_node(node: Base, matrix: list) -> int:
+    """
+    Apply an affine transform to all geometry under a node: mesh vertices
+    (batched) and any basePoint / location points. Returns the vertex count.
+    """
+    count = transform_meshes(iter_meshes(node), matrix)
+    transform_anchor_points(node, matrix)
+    return count
+
+
+def transform_anchor_points(node: Base, matrix: list):
+    """Transform the basePoint / location points of every node under `node` in place."""
+    moved = set()
+    for obj in iter_nodes(node, key=id):
+        for attr in ("basePoint", "location"):
+            point = getattr(obj, attr, None)
+            if id(point) in moved or not all(hasattr(point, c) for c in ("x", "y", "z")):
+                continue
+            moved.add(id(point))
+            transform_point(point, matrix)
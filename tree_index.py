@@ -0,0 +1,193 @@
+"""
+Tree index for received Speckle data.
+
+Builds lookup tables for a received model tree in a single traversal so that
+scripts can find objects by applicationId, object id, name or speckle_type
+(and move between parents and children) without walking the tree again.
+
+Usage:
+    from tree_index import TreeIndex
+    index = TreeIndex(root)
+    node = index.by_application_id("7173a954-412b-4606-b14c-c2bdb579af98")
+    parent = index.parent(node)
+"""
+
+from specklepy.objects import Base
+
+import instrument
+from tree_walk import iter_children, walk
+
+
+class TreeIndex:
+    """
+    Lookup tables for a Speckle object tree, built in one traversal.
+
+    Nodes are keyed by identity, so the index stays valid after nodes are
+    renamed or retyped as long as the change goes through `rename()` /
+    `retype()` (or `reindex()` is called afterwards).
+
+    `children` chooses which members are followed (see tree_walk); pass
+    `iter_elements` to index only the element / collection hierarchy.
+    """
+
+    def __init__(self, root: Base, children=iter_children):
+        self.root = root
+        self._children_of = children
+        self._by_app_id = {}
+        self._by_id = {}
+        self._by_name = {}
+        self._by_type = {}
+        self._parent = {}
+        self._children = {}
+        self._position = {}
+        self._depth = {}
+        self._order = []
+        with instrument.span("traverse.index") as s:
+            self._build(root)
+            s.set(nodes=len(self._order))
+
+    def _build(self, root: Base, parent: Base = None):
+        # Identity (not object id) keys the index, so edited copies that still
+        # carry a stale id are indexed as the separate nodes they are
+        offset = 0 if parent is None else self._depth.get(id(parent), 0) + 1
+        for node, depth, node_parent, _ in walk(root, children=self._children_of, key=id, parent=parent):
+            key = id(node)
+            if key in self._parent:
+                continue  # already indexed by an earlier build
+
+            self._parent[key] = node_parent
+            self._depth[key] = depth + offset
+            self._children[key] = []
+            if node_parent is not None:
+                self._children[id(node_parent)].append(node)
+            self._position[key] = len(self._order)
+            self._order.append(node)
+            self._add_keys(node)
+
+    def _add_keys(self, node: Base):
+        app_id = getattr(node, "applicationId", None)
+        if app_id is not None:
+            self._by_app_id.setdefault(app_id, node)
+        obj_id = getattr(node, "id", None)
+        if obj_id is not None:
+            self._by_id.setdefault(obj_id, node)
+        self._by_name.setdefault(getattr(node, "name", None), []).append(node)
+        self._by_type.setdefault(_speckle_type(node), []).append(node)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        return iter(self._order)
+
+    def __contains__(self, node) -> bool:
+        return id(node) in self._parent
+
+    def by_application_id(self, app_id: str):
+        """Return the first node with this applicationId, or None."""
+        return self._by_app_id.get(app_id)
+
+    def by_id(self, obj_id: str):
+        """Return the node with this object id (hash), or None."""
+        return self._by_id.get(obj_id)
+
+    def by_name(self, name: str) -> list:
+        """Return all nodes with this name, in tree order."""
+        return list(self._by_name.get(name, []))
+
+    def first_by_name(self, name: str):
+        """Return the first node (in tree order) with this name, or None."""
+        nodes = self._by_name.get(name)
+        return nodes[0] if nodes else None
+
+    def by_type(self, speckle_type: str) -> list:
+        """Return all nodes with this speckle_type, in tree order."""
+        return list(self._by_type.get(speckle_type, []))
+
+    def types(self) -> list:
+        """Return the distinct speckle_types in the tree."""
+        return [t for t, nodes in self._by_type.items() if nodes]
+
+    def parent(self, node: Base):
+        """Return the parent of a node (None for the root)."""
+        return self._parent.get(id(node))
+
+    def children(self, node: Base) -> list:
+        """Return the direct children of a node."""
+        return list(self._children.get(id(node), []))
+
+    def child_by_name(self, parent: Base, name: str):
+        """Return the first direct child of `parent` with this name, or None."""
+        for child in self._children.get(id(parent), []):
+            if getattr(child, "name", None) == name:
+                return child
+        return None
+
+    def depth(self, node: Base) -> int:
+        """Return the depth of a node (0 for the root), or None if it is not indexed."""
+        return self._depth.get(id(node))
+
+    def position(self, node: Base) -> int:
+        """Return the tree-order position of a node, or None if it is not indexed."""
+        return self._position.get(id(node))
+
+    def ancestors(self, node: Base) -> list:
+        """Return the ancestors of a node, nearest first."""
+        result = []
+        parent = self.parent(node)
+        while parent is not None:
+            result.append(parent)
+            parent = self.parent(parent)
+        return result
+
+    def rename(self, node: Base, new_name: str):
+        """Rename a node and keep the name lookup in sync."""
+        old_name = getattr(node, "name", None)
+        _remove(self._by_name, old_name, node)
+        node.name = new_name
+        self._insert_ordered(self._by_name.setdefault(new_name, []), node)
+
+    def retype(self, node: Base, speckle_type: str):
+        """Change a node's speckle_type and keep the type lookup in sync."""
+        _remove(self._by_type, _speckle_type(node), node)
+        # Base ignores `speckle_type` assignment, so write the member directly
+        node["speckle_type"] = speckle_type
+        self._insert_ordered(self._by_type.setdefault(speckle_type, []), node)
+
+    def add(self, node: Base, parent: Base):
+        """Index a subtree that was attached to `parent` after the build."""
+        start = len(self._order)
+        self._build(node, parent)
+        # New nodes go to the end of the tree order; that is fine for lookups
+        return self._order[start:]
+
+    def reindex(self):
+        """Rebuild every lookup after changes made outside this index."""
+        self.__init__(self.root, self._children_of)
+
+    def _insert_ordered(self, nodes: list, node: Base):
+        # Keep name / type buckets in tree order so first-match semantics
+        # match a fresh walk
+        position = self._position
+        target = position.get(id(node), len(self._order))
+        for i, other in enumerate(nodes):
+            if position.get(id(other), len(self._order)) > target:
+                nodes.insert(i, node)
+                return
+        nodes.append(node)
+
+
+def _speckle_type(node: Base):
+    return getattr(node, "speckle_type", getattr(node, "_speckle_type", None))
+
+
+def _remove(table: dict, key, node: Base):
+    nodes = table.get(key)
+    if not nodes:
+        return
+    for i, other in enumerate(nodes):
+        if other is node:
+            del nodes[i]
+            break
+    if not nodes:
+        del table[key]
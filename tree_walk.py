@@ -0,0 +1,127 @@
+"""
+Iterative traversal of received Speckle data.
+
+Provides one stack-based generator that every script can use to visit a model
+tree lazily, instead of each script recursing over '@elements' / 'elements'
+in its own way. Deep trees no longer hit the recursion limit, and first-match
+lookups stop as soon as they find something.
+
+Usage:
+    from tree_walk import walk, find_first
+
+    for node, depth, parent, _ in walk(root):
+        print("  " * depth, node.name)
+
+    for node, _, _, path in walk(root, with_path=True):
+        print(" / ".join(n.name for n in path + (node,)))
+
+    floor = find_first(root, lambda n: n.applicationId == "17cc627f-...")
+"""
+
+from specklepy.objects import Base
+
+
+def iter_elements(node: Base):
+    """
+    Yield the element children of a node: '@elements' / 'elements', then
+    'collections'. This is the tree the property and export scripts walk.
+    """
+    members = vars(node)
+    elements = members.get("@elements") or members.get("elements") or []
+    for el in elements:
+        if isinstance(el, Base):
+            yield el
+
+    for coll in members.get("collections") or []:
+        if isinstance(coll, Base):
+            yield coll
+
+
+def iter_children(node: Base):
+    """
+    Yield all direct Base children of a node: element children first, then
+    any other member holding a single Base object.
+    """
+    yield from iter_elements(node)
+
+    for key, val in vars(node).items():
+        if isinstance(val, Base) and not key.startswith("_"):
+            yield val
+
+
+def node_key(node: Base):
+    """
+    Object id, else identity. Pass as `key` to visit each stored object once,
+    skipping identical subtrees that appear again elsewhere.
+    """
+    return getattr(node, "id", None) or id(node)
+
+
+def walk(root: Base, children=iter_children, prune=None, unique: bool = True,
+         key=id, max_depth: int = None, parent: Base = None, depth: int = 0,
+         with_path: bool = False):
+    """
+    Lazily walk a tree in pre-order, yielding (node, depth, parent, path).
+
+    `path` is a tuple of the ancestors of `node`, from the root down, when
+    `with_path` is true and None otherwise (building it costs a tuple copy
+    per node, so it is only done on request).
+
+    Arguments:
+        children  -- function returning the children of a node
+                     (`iter_children` or `iter_elements`)
+        prune     -- optional predicate; when prune(node) is true the node is
+                     yielded but its subtree is skipped
+        unique    -- skip nodes that were already visited, which protects
+                     against reference cycles and shared objects
+        key       -- function giving the identity used by `unique`
+                     (defaults to identity, so identical but separate
+                     subtrees are all visited; see node_key)
+        max_depth -- do not descend below this depth
+        with_path -- yield the ancestors of each node as `path`
+    """
+    if not isinstance(root, Base):
+        return
+
+    seen = set()
+    start_path = None
+    if with_path:
+        start_path = () if parent is None else (parent,)
+    stack = [(root, depth, parent, start_path)]
+    while stack:
+        node, node_depth, node_parent, path = stack.pop()
+        if unique:
+            node_id = key(node)
+            if node_id in seen:
+                continue
+            seen.add(node_id)
+
+        yield node, node_depth, node_parent, path
+
+        if prune is not None and prune(node):
+            continue
+        if max_depth is not None and node_depth >= max_depth:
+            continue
+
+        # Push in reverse so children come out in their natural order
+        child_path = path + (node,) if with_path else None
+        pending = [
+            (child, node_depth + 1, node, child_path)
+            for child in children(node)
+        ]
+        pending.reverse()
+        stack.extend(pending)
+
+
+def iter_nodes(root: Base, **kwargs):
+    """Walk a tree and yield only the nodes."""
+    for node, _, _, _ in walk(root, **kwargs):
+        yield node
+
+
+def find_first(root: Base, predicate, **kwargs):
+    """Return the first node (in pre-order) matching `predicate`, or None."""
+    for node in iter_nodes(root, **kwargs):
+        if predicate(node):
+            return node
+    return None
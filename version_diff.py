@@ -0,0 +1,306 @@
+"""
+Version-to-version diff for Speckle models.
+
+Compares the stored objects of two versions without deserializing them.
+Object ids are content hashes, so two subtrees with the same id are
+identical and are skipped without being downloaded. The diff walks both
+trees level by level and fetches (in one batch per level) only the objects
+whose ids differ. Work grows with the size of the change, not of the model.
+
+Children in '@elements' and other object lists are matched by applicationId,
+then by type + name. The report lists:
+
+    added / removed  -- subtrees present in only one version
+    renamed          -- matched nodes whose name changed
+    properties       -- changed members and nested `properties` keys
+    geometry         -- nodes whose displayValue / mesh buffers changed
+                        (reported, not downloaded)
+
+Usage:
+    python version_diff.py --project 128262a20c --model 0763ad7d28
+    python version_diff.py --project 128262a20c --model 0763ad7d28 --from 1a2b3c --to 4d5e6f --json diff.json
+
+    from version_diff import diff_objects
+    report = diff_objects(old_version.referenced_object, new_version.referenced_object, LazyReceiver(transport))
+    report.print_report()
+"""
+
+import argparse
+import json
+
+from specklepy.transports.server import ServerTransport
+
+import instrument
+from lazy_receive import HEAVY_MEMBERS, LazyReceiver
+from main import get_client
+from version_history import VersionHistory
+
+# Members that change whenever anything else does
+_DERIVED_MEMBERS = frozenset({"id", "totalChildrenCount", "__closure"})
+
+
+class VersionDiff:
+    """What changed between two object trees."""
+
+    def __init__(self, old_id: str, new_id: str):
+        self.old_id = old_id
+        self.new_id = new_id
+        self.added = []
+        self.removed = []
+        self.renamed = []
+        self.properties = []
+        self.geometry = []
+        self.nodes_compared = 0
+        self.subtrees_unchanged = 0
+        self.objects_read = 0
+        self.new_objects = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed or self.properties or self.geometry)
+
+    def as_dict(self) -> dict:
+        return {
+            "old": self.old_id,
+            "new": self.new_id,
+            "added": self.added,
+            "removed": self.removed,
+            "renamed": self.renamed,
+            "properties": self.properties,
+            "geometry": self.geometry,
+            "stats": {
+                "nodes_compared": self.nodes_compared,
+                "subtrees_unchanged": self.subtrees_unchanged,
+                "objects_read": self.objects_read,
+                "new_objects": self.new_objects,
+            },
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, {len(self.renamed)} renamed, "
+            f"{len(self.properties)} property changes, {len(self.geometry)} geometry changes"
+        )
+
+    def print_report(self):
+        print(f"--- Diff {self.old_id[:10]} -> {self.new_id[:10]} ---")
+        if not self:
+            print("✓ No changes")
+        for entry in self.added:
+            print(f"  + {entry['path']} ({entry['type']}, {entry['objects']} objects)")
+        for entry in self.removed:
+            print(f"  - {entry['path']} ({entry['type']}, {entry['objects']} objects)")
+        for entry in self.renamed:
+            print(f"  ~ {entry['path']}: renamed {entry['old']!r} -> {entry['new']!r}")
+        for entry in self.properties:
+            print(f"  ~ {entry['path']}: {entry['key']} {entry['old']!r} -> {entry['new']!r}")
+        for entry in self.geometry:
+            print(f"  ~ {entry['path']}: geometry changed ({entry['member']})")
+        print(f"✓ {self}")
+        print(f"✓ Compared {self.nodes_compared} nodes, skipped {self.subtrees_unchanged} unchanged subtrees, "
+              f"read {self.objects_read} objects")
+
+
+def _is_reference(value) -> bool:
+    return isinstance(value, dict) and value.get("speckle_type") == "reference"
+
+
+def _references(value) -> list:
+    """The referenced ids of a list of references (empty for anything else)."""
+    if not isinstance(value, list):
+        return []
+    return [item["referencedId"] for item in value if _is_reference(item)]
+
+
+def _label(obj: dict) -> str:
+    return str(obj.get("name") or obj.get("applicationId") or obj.get("speckle_type", "?").split(".")[-1])
+
+
+def _match_key(obj: dict):
+    if obj.get("applicationId"):
+        return ("applicationId", obj["applicationId"])
+    return ("name", obj.get("speckle_type"), obj.get("name"))
+
+
+def _flat_changes(key: str, old, new, out: list):
+    """Append (key path, old, new) for every leaf that differs, looking into dicts."""
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for name in list(old) + [k for k in new if k not in old]:
+            if name in _DERIVED_MEMBERS:
+                continue
+            _flat_changes(f"{key}.{name}", old.get(name), new.get(name), out)
+        return
+    out.append((key, old, new))
+
+
+class _Differ:
+    def __init__(self, receiver: LazyReceiver, report: VersionDiff):
+        self.receiver = receiver
+        self.report = report
+        self.headers = {}
+
+    def load(self, obj_id: str) -> dict:
+        # Headers read while matching children are compared on the next level
+        obj = self.headers.pop(obj_id, None)
+        if obj is None:
+            self.report.objects_read += 1
+            obj = json.loads(self.receiver.object_string(obj_id))
+        return obj
+
+    def run(self):
+        report = self.report
+        if report.old_id == report.new_id:
+            report.subtrees_unchanged += 1
+            return
+        pairs = [(report.old_id, report.new_id, "")]
+        while pairs:
+            self.receiver.prefetch({i for pair in pairs for i in pair[:2]})
+            lists = []
+            next_pairs = []
+            for old_id, new_id, path in pairs:
+                old, new = self.load(old_id), self.load(new_id)
+                if old_id == report.old_id:
+                    report.new_objects = len(set(new.get("__closure") or {}) - set(old.get("__closure") or {}))
+                path = f"{path}/{_label(new)}" if path else _label(new)
+                self.compare(old, new, path, next_pairs, lists)
+
+            # Children that are not identical are matched by their headers
+            unmatched = {i for old_ids, new_ids, _ in lists for i in old_ids + new_ids}
+            self.receiver.prefetch(unmatched)
+            for old_ids, new_ids, path in lists:
+                self.match(old_ids, new_ids, path, next_pairs)
+            pairs = next_pairs
+
+    def compare(self, old: dict, new: dict, path: str, pairs: list, lists: list):
+        """Record changes of one node; queue changed children for the next level."""
+        report = self.report
+        report.nodes_compared += 1
+        entry = {"path": path, "applicationId": new.get("applicationId"), "type": new.get("speckle_type")}
+        if old.get("name") != new.get("name"):
+            report.renamed.append({**entry, "old": old.get("name"), "new": new.get("name")})
+
+        changes = []
+        for key in list(old) + [k for k in new if k not in old]:
+            if key in _DERIVED_MEMBERS or key == "name":
+                continue
+            a, b = old.get(key), new.get(key)
+            if a == b:
+                continue
+            if key in HEAVY_MEMBERS:
+                report.geometry.append({**entry, "member": key})
+            elif _is_reference(a) and _is_reference(b):
+                pairs.append((a["referencedId"], b["referencedId"], path))
+            elif _references(a) or _references(b):
+                old_ids, new_ids = _references(a), _references(b)
+                common = set(old_ids) & set(new_ids)
+                report.subtrees_unchanged += len(common)
+                lists.append(([i for i in old_ids if i not in common],
+                              [i for i in new_ids if i not in common], path))
+            else:
+                _flat_changes(key, a, b, changes)
+        for key, a, b in changes:
+            report.properties.append({**entry, "key": key, "old": a, "new": b})
+
+    def match(self, old_ids: list, new_ids: list, path: str, pairs: list):
+        report = self.report
+        headers = {obj_id: self.load(obj_id) for obj_id in old_ids + new_ids}
+        candidates = {}
+        for obj_id in old_ids:
+            candidates.setdefault(_match_key(headers[obj_id]), []).append(obj_id)
+
+        unmatched = []
+        for obj_id in new_ids:
+            matches = candidates.get(_match_key(headers[obj_id]))
+            if matches:
+                pairs.append(self._pair(matches.pop(0), obj_id, headers, path))
+            else:
+                unmatched.append(obj_id)
+
+        # Nodes without an applicationId (e.g. renamed collections) are paired
+        # by type, in list order
+        by_type = {}
+        for key, obj_ids in candidates.items():
+            for obj_id in obj_ids:
+                if key[0] == "name":
+                    by_type.setdefault(key[1], []).append(obj_id)
+        removed = {obj_id for obj_ids in candidates.values() for obj_id in obj_ids}
+        for obj_id in unmatched:
+            header = headers[obj_id]
+            matches = None if header.get("applicationId") else by_type.get(header.get("speckle_type"))
+            if matches:
+                old_id = matches.pop(0)
+                removed.discard(old_id)
+                pairs.append(self._pair(old_id, obj_id, headers, path))
+            else:
+                report.added.append(_subtree_entry(header, path))
+        for obj_id in old_ids:
+            if obj_id in removed:
+                report.removed.append(_subtree_entry(headers[obj_id], path))
+
+    def _pair(self, old_id: str, new_id: str, headers: dict, path: str) -> tuple:
+        self.headers[old_id], self.headers[new_id] = headers[old_id], headers[new_id]
+        return old_id, new_id, path
+
+
+def _subtree_entry(header: dict, path: str) -> dict:
+    return {
+        "path": f"{path}/{_label(header)}",
+        "applicationId": header.get("applicationId"),
+        "type": header.get("speckle_type"),
+        "objects": (header.get("totalChildrenCount") or 0) + 1,
+    }
+
+
+def diff_objects(old_id: str, new_id: str, receiver: LazyReceiver) -> VersionDiff:
+    """Diff two stored object trees, downloading only what differs."""
+    report = VersionDiff(old_id, new_id)
+    with instrument.span("diff", old=old_id, new=new_id) as s:
+        _Differ(receiver, report).run()
+        s.set(nodes=report.nodes_compared, objects=report.objects_read)
+    return report
+
+
+def diff_versions(client, project_id: str, model_id: str, old_version=None, new_version=None) -> VersionDiff:
+    """
+    Diff two versions of a model (version objects or ids). The new version
+    defaults to the latest, the old one to the version before the new one.
+    """
+    if old_version is None or new_version is None:
+        history = VersionHistory(client, project_id, model_id)
+        new_version = new_version or history.latest()
+        if new_version is None:
+            raise ValueError(f"No versions found in model {model_id}")
+        if old_version is None:
+            old_version = history.previous(new_version)
+            if old_version is None:
+                raise ValueError(f"No version before {getattr(new_version, 'id', new_version)} in model {model_id}")
+    if isinstance(old_version, str):
+        old_version = client.version.get(old_version, project_id)
+    if isinstance(new_version, str):
+        new_version = client.version.get(new_version, project_id)
+
+    receiver = LazyReceiver(ServerTransport(client=client, stream_id=project_id))
+    return diff_objects(old_version.referenced_object, new_version.referenced_object, receiver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show what changed between two versions of a model.")
+    parser.add_argument("--project", required=True, help="project id")
+    parser.add_argument("--model", required=True, help="model id")
+    parser.add_argument("--from", dest="old", help="older version id (defaults to the one before --to)")
+    parser.add_argument("--to", dest="new", help="newer version id (defaults to the latest)")
+    parser.add_argument("--json", help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    client = get_client()
+    report = diff_versions(client, args.project, args.model, args.old, args.new)
+    report.print_report()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.as_dict(), f, indent=2, default=str)
+        print(f"✓ Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Paged, locally cached access to the versions of a model.
+
+The server lists versions newest first, in pages chained by cursors. Scripts
+used to ask for one page of 100 and treat its last item as the oldest
+version, which is wrong for longer histories and reads 100 records to use
+one. A VersionHistory streams the versions page by page and fetches the next
+page in a background thread while the current one is being used.
+
+Version metadata does not change once created, so every page read is kept
+in a small JSON file per model. On the next run, one request for the latest
+version tells whether anything was added. If something was, only the new
+versions at the head are read, until they meet the cached ones. Once a
+model's history has been read, oldest() and lookups within the cached
+versions cost that single request.
+
+    latest()             the newest version (one request)
+    oldest()             the first version of the model
+    at_or_before(when)   the version that was current at a point in time
+    previous(version)    the version before a given one
+    iterating            all versions, newest first
+
+Configuration (environment or .env):
+    SPECKLE_CACHE_DIR  -- folder for the cache (versions are kept in its
+                          versions/ subfolder, see object_cache.py)
+
+Usage:
+    from version_history import VersionHistory
+    history = VersionHistory(client, PROJECT_ID, MODEL_ID)
+    first = history.oldest()
+    release = history.at_or_before("2026-02-01T00:00:00Z")
+    for version in history:
+        print(version.id, version.created_at)
+"""
+
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from specklepy.core.api.models.current import Version
+from specklepy.transports.sqlite import SQLiteTransport
+
+# Versions per request when paging (the server's largest page)
+PAGE_SIZE = 100
+
+
+def _default_dir() -> str:
+    base_path = os.environ.get("SPECKLE_CACHE_DIR") or SQLiteTransport.get_base_path("Speckle")
+    return os.path.join(base_path, "versions")
+
+
+def _timestamp(when) -> datetime:
+    """A timezone-aware datetime from a datetime or an ISO 8601 string (UTC if no zone is given)."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when.replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when
+
+
+def _dump(version: Version) -> dict:
+    return version.model_dump(mode="json", by_alias=True)
+
+
+def _empty() -> dict:
+    # versions: newest first; cursor: continues after the last cached version
+    return {"versions": [], "total": 0, "cursor": None, "complete": False}
+
+
+class VersionHistory:
+    """The versions of one model, newest first, read in cursor pages and cached."""
+
+    def __init__(self, client, project_id: str, model_id: str, cache_dir: str = None,
+                 page_size: int = PAGE_SIZE, prefetch: bool = True):
+        self.client = client
+        self.project_id = project_id
+        self.model_id = model_id
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.path = os.path.join(cache_dir or _default_dir(), f"{project_id}_{model_id}.json")
+        self.requests = 0
+        self._state = self._load()
+        self._head = None
+        self._synced = False
+        self._objects = {}
+        self._executor = None
+
+    def __repr__(self) -> str:
+        return f"VersionHistory({self.project_id}/{self.model_id}, {len(self._state['versions'])} cached)"
+
+    # -- cache ---------------------------------------------------------------
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return _empty()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(temp, self.path)
+
+    def _version(self, position: int) -> Version:
+        data = self._state["versions"][position]
+        version = self._objects.get(data["id"])
+        if version is None:
+            version = self._objects[data["id"]] = Version.model_validate(data)
+        return version
+
+    # -- requests ------------------------------------------------------------
+
+    def _page(self, limit: int, cursor: str = None):
+        self.requests += 1
+        return self.client.version.get_versions(self.model_id, self.project_id, limit=limit, cursor=cursor)
+
+    def _submit(self, cursor: str) -> Future:
+        """Request the page after `cursor`, in the background when prefetching."""
+        if self.prefetch:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="versions")
+            return self._executor.submit(self._page, self.page_size, cursor)
+        future = Future()
+        future.set_result(self._page(self.page_size, cursor))
+        return future
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _check(self):
+        """Read the latest version and the version count (one request per instance)."""
+        if self._head is None:
+            self._head = self._page(1)
+        return self._head
+
+    def _sync(self):
+        """Bring the head of the cache up to date with the server."""
+        if self._synced:
+            return
+        head = self._check()
+        self._synced = True
+        state = self._state
+        total = head.total_count
+        if not head.items:
+            self._state = _empty()
+            self._state["complete"] = True
+            self._save()
+            return
+        latest = head.items[0]
+        cached = state["versions"]
+        if cached and cached[0]["id"] == latest.id and state["total"] == total:
+            return
+        if not cached:
+            self._state = {"versions": [_dump(latest)], "total": total,
+                           "cursor": head.cursor, "complete": total <= 1}
+            self._save()
+            return
+
+        # New versions sit in front of the cached ones: read until they meet
+        known = {data["id"]: i for i, data in enumerate(cached)}
+        added = []
+        position = known.get(latest.id)
+        if position is None:
+            added.append(_dump(latest))
+        cursor = head.cursor
+        while position is None and cursor:
+            page = self._page(self.page_size, cursor)
+            for version in page.items:
+                position = known.get(version.id)
+                if position is not None:
+                    break
+                added.append(_dump(version))
+            if not page.items:
+                break
+            cursor = page.cursor
+
+        if position is None:
+            # None of the cached versions are left: what was read is the history
+            self._state = {"versions": added, "total": total, "cursor": cursor,
+                           "complete": not cursor or len(added) >= total}
+            self._save()
+            return
+        versions = added + cached[position:]
+        if len(versions) > total or (state["complete"] and len(versions) != total):
+            # Versions were deleted or the cache no longer lines up: start over
+            self._state = _empty()
+            self._synced = False
+            self._sync()
+            return
+        self._state = {"versions": versions, "total": total,
+                       "cursor": state["cursor"], "complete": state["complete"]}
+        self._save()
+
+    def _more(self):
+        """
+        Read the pages after the cached versions, yielding each page's
+        versions. The next page is requested before the current one is used.
+        """
+        state = self._state
+        if state["complete"] or not state["cursor"]:
+            return
+        pending = self._submit(state["cursor"])
+        try:
+            while pending is not None:
+                page = pending.result()
+                pending = None
+                start = len(state["versions"])
+                state["versions"].extend(_dump(version) for version in page.items)
+                state["cursor"] = page.cursor
+                state["complete"] = not page.items or not page.cursor or len(state["versions"]) >= state["total"]
+                if not state["complete"]:
+                    pending = self._submit(page.cursor)
+                yield range(start, len(state["versions"]))
+        finally:
+            if pending is not None:
+                pending.cancel()
+            self._save()
+
+    # -- queries -------------------------------------------------------------
+
+    def _positions(self):
+        """Positions of all versions in the cache, newest first, reading pages as needed."""
+        self._sync()
+        yield from range(len(self._state["versions"]))
+        for positions in self._more():
+            yield from positions
+
+    def __iter__(self):
+        """All versions, newest first; pages past the cache are fetched as needed."""
+        for position in self._positions():
+            yield self._version(position)
+
+    def __len__(self) -> int:
+        """The number of versions on the server."""
+        return self._check().total_count
+
+    def latest(self):
+        """The newest version, or None if the model has none."""
+        head = self._check()
+        return head.items[0] if head.items else None
+
+    def oldest(self):
+        """The first version of the model, or None if it has none."""
+        self._sync()
+        for _ in self._more():
+            pass
+        return self._version(-1) if self._state["versions"] else None
+
+    def at_or_before(self, when):
+        """The newest version created at or before `when` (datetime or ISO string), or None."""
+        when = _timestamp(when)
+        # _sync() may replace the cached state, so read the list after it
+        self._sync()
+        versions = self._state["versions"]
+        for position in self._positions():
+            if _timestamp(versions[position]["createdAt"]) <= when:
+                return self._version(position)
+        return None
+
+    def previous(self, version):
+        """The version created just before `version` (a version or an id), or None."""
+        version_id = getattr(version, "id", version)
+        self._sync()
+        versions = self._state["versions"]
+        found = False
+        for position in self._positions():
+            if found:
+                return self._version(position)
+            found = versions[position]["id"] == version_id
+        if not found:
+            raise ValueError(f"Version {version_id} was not found in model {self.model_id}")
+        return None